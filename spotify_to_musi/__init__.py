@@ -2,11 +2,6 @@ from __future__ import annotations
 
 import warnings
 
-import rich.traceback
-
-rich.traceback.install()
-
-
 # requests is installed as a sub-dependency of pyfy (& maybe more packages that are sync and async)
 # pyfy imports requests even when it's not being used which will cause a  `RequestsDependencyWarning` to be raised on older versions of python
 # there should be no issue with ignoring this warning as it's only raised through requests which is not actually being used
@@ -4,16 +4,16 @@ from __future__ import annotations
 import asyncio
 import functools
 import sys
+import time
 import typing as t
 
-import pyfy.excs
 import rich
 import rich_click as click
-from rich.prompt import Prompt
 
-from spotify_to_musi import main, oauth, spotify
-from spotify_to_musi.commons import spotify_client_credentials
-from spotify_to_musi.paths import SPOTIFY_CREDENTIALS_PATH
+from spotify_to_musi import paths
+
+# heavier modules (pyfy, httpx, pydantic, sanic) are imported inside the commands that need them,
+# so that `--help` and commands like `transfer` don't pay for the OAuth server's dependencies.
 
 
 def async_cmd(func: t.Callable) -> t.Callable:
@@ -41,8 +41,93 @@ def async_cmd(func: t.Callable) -> t.Callable:
 
 @click.group()
 @async_cmd
-async def cli() -> None:
-    pass
+@click.option(
+    "--data-dir",
+    help="Directory to store the cache and credentials in.",
+    envvar=paths.DATA_DIR_ENV_VAR,
+    type=click.Path(file_okay=False),
+    default=None,
+)
+@click.option(
+    "--cache-max-size",
+    help="Maximum number of tracks to keep in the cache, least recently used tracks are evicted first. [default: 100000]",
+    envvar="SPOTIFY_TO_MUSI_CACHE_MAX_SIZE",
+    type=click.IntRange(min=1),
+    default=None,
+)
+@click.option(
+    "--cache-max-age",
+    help="Evict tracks that were matched more than this many days ago, so they're matched again. [default: never]",
+    envvar="SPOTIFY_TO_MUSI_CACHE_MAX_AGE",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+)
+@click.option(
+    "--cache-url",
+    help="Where to store the cache: `file` (a file in the data directory) or a shared `redis://[:password@]host[:port][/db]`. [default: file]",
+    envvar="SPOTIFY_TO_MUSI_CACHE_URL",
+    type=str,
+    default=None,
+)
+@click.option(
+    "-q",
+    "--quiet",
+    is_flag=True,
+    help="Don't print progress bars or a message per loaded playlist and skipped track, only a summary at the end.",
+    default=False,
+)
+@click.option(
+    "--log-format",
+    help="Print messages w/ rich, or write them as JSON lines to standard error (or --log-file) for log processing.",
+    type=click.Choice(["rich", "jsonl"]),
+    default="rich",
+    show_default=True,
+)
+@click.option(
+    "--log-file",
+    help="File to append --log-format=jsonl messages to. [default: standard error]",
+    type=click.Path(dir_okay=False),
+    default=None,
+)
+async def cli(
+    data_dir: str | None,
+    cache_max_size: int | None,
+    cache_max_age: float | None,
+    cache_url: str | None,
+    quiet: bool,
+    log_format: t.Literal["rich", "jsonl"],
+    log_file: str | None,
+) -> None:
+    import rich.traceback
+
+    rich.traceback.install()
+
+    if data_dir:
+        paths.set_data_dir(data_dir)
+
+    if cache_max_size is not None or cache_max_age is not None:
+        from spotify_to_musi import tracks_cache
+
+        tracks_cache.configure(
+            max_size=cache_max_size or tracks_cache.DEFAULT_MAX_SIZE,
+            max_age=cache_max_age * 24 * 60 * 60 if cache_max_age else None,
+        )
+
+    if cache_url:
+        from spotify_to_musi import cache_backends, tracks_cache
+        from spotify_to_musi.exceptions import UnsupportedCacheUrlError
+
+        try:
+            tracks_cache.set_backend(cache_backends.backend_from_url(cache_url))
+        except UnsupportedCacheUrlError as exc:
+            raise click.BadParameter(str(exc), param_hint="--cache-url") from exc
+
+    if quiet or log_format != "rich":
+        from spotify_to_musi import log
+
+        log.configure(quiet=quiet, log_format=log_format, log_path=log_file)
+        # the log file is closed once the command is done, however it ends
+        click.get_current_context().call_on_close(log.close)  # type: ignore[union-attr]
 
 
 @cli.command()  # type: ignore[arg-type, attr-defined]
@@ -62,15 +147,146 @@ async def cli() -> None:
     multiple=True,
     type=str,
 )
-async def transfer(user: bool, playlist: list[str]) -> None:
+@click.option(
+    "-w",
+    "--workers",
+    help="Number of worker processes to parse and score YouTube Music results in. 0 parses them on the event loop.",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+)
+@click.option(
+    "-m",
+    "--manifest",
+    help="Run the transfer jobs of a TOML manifest, uploading one Musi backup per job.",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+)
+@click.option(
+    "--offline",
+    is_flag=True,
+    help="Rebuild the Musi backup of the last transfer w/ --save-for-offline from its Spotify data and the cache, w/o any network access.",
+    default=False,
+)
+@click.option(
+    "--save-for-offline",
+    is_flag=True,
+    help="Save the songs loaded from Spotify to the data directory, for a later transfer w/ --offline.",
+    default=False,
+)
+@click.option(
+    "--save-spotify-snapshot",
+    help="Save the songs loaded from Spotify to a file, to re-run the transfer w/ --from-spotify-snapshot.",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+)
+@click.option(
+    "--from-spotify-snapshot",
+    help="Transfer the songs of a file saved w/ --save-spotify-snapshot, w/o any Spotify API calls.",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+)
+@click.option(
+    "--force-upload",
+    is_flag=True,
+    help="Upload the Musi backup even if an identical one was already uploaded, instead of reusing its code.",
+    default=False,
+)
+@click.option(
+    "--max-backup-size",
+    help="Split the playlists across several Musi backups of at most about this many megabytes each, for very large libraries.",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+)
+async def transfer(
+    user: bool,
+    playlist: list[str],
+    workers: int,
+    manifest: str | None,
+    offline: bool,
+    save_for_offline: bool,
+    save_spotify_snapshot: str | None,
+    from_spotify_snapshot: str | None,
+    force_upload: bool,
+    max_backup_size: float | None,
+) -> None:
     """
     Transfer songs from Spotify to Musi.
     """
+    import pyfy.excs
+
+    from spotify_to_musi import main, spotify
+    from spotify_to_musi.exceptions import RemoteCacheError, SnapshotFormatError
+
+    max_backup_bytes = int(max_backup_size * 1_000_000) if max_backup_size else None
+
+    if offline:
+        if user or playlist or manifest or save_spotify_snapshot or save_for_offline:
+            rich.print(
+                "[bold red]Failed to transfer. --offline uses the last transfer's songs (or --from-spotify-snapshot), and can't be combined w/ --user, --playlist, --manifest, --save-spotify-snapshot or --save-for-offline.[/bold red]"
+            )
+            return
+
+        if not from_spotify_snapshot and not paths.spotify_snapshot_path().is_file():
+            rich.print(
+                "[bold red]Failed to transfer. No Spotify data saved yet, run a transfer w/ --save-for-offline first.[/bold red]"
+            )
+            return
+
+        try:
+            await main.transfer_offline(from_spotify_snapshot)
+        except (SnapshotFormatError, RemoteCacheError) as exc:
+            rich.print(f"[bold red]Failed to transfer. {exc}[/bold red]")
+        return
+
+    if manifest:
+        from spotify_to_musi.exceptions import ManifestError
+        from spotify_to_musi.manifest import load_manifest
+
+        if user or playlist or save_spotify_snapshot or save_for_offline or from_spotify_snapshot or max_backup_size:
+            rich.print(
+                "[bold red]Failed to transfer. A manifest can't be combined w/ --user, --playlist, Spotify snapshots or --max-backup-size.[/bold red]"
+            )
+            return
+
+        try:
+            jobs = load_manifest(manifest)
+        except ManifestError as exc:
+            rich.print(f"[bold red]Failed to transfer. {exc}[/bold red]")
+            return
+
+        try:
+            await main.transfer_jobs(jobs, workers=workers, force_upload=force_upload)
+        except RemoteCacheError as exc:
+            rich.print(f"[bold red]Failed to transfer. {exc}[/bold red]")
+        return
+
+    if from_spotify_snapshot:
+        if user or playlist:
+            rich.print(
+                "[bold red]Failed to transfer. --from-spotify-snapshot transfers the snapshot's songs, and can't be combined w/ --user or --playlist.[/bold red]"
+            )
+            return
+
+        try:
+            await main.transfer_spotify_to_musi(
+                transfer_user_library=False,
+                extra_playlist_urls=[],
+                workers=workers,
+                from_spotify_snapshot=from_spotify_snapshot,
+                save_spotify_snapshot=save_spotify_snapshot,
+                save_for_offline=save_for_offline,
+                force_upload=force_upload,
+                max_backup_size=max_backup_bytes,
+            )
+        except (SnapshotFormatError, RemoteCacheError) as exc:
+            rich.print(f"[bold red]Failed to transfer. {exc}[/bold red]")
+        return
 
     await spotify.init()
 
     try:
-        await spotify.spotify.me()
+        await spotify.call(spotify.spotify.me)
     except pyfy.excs.SpotifyError:
         rich.print("[bold red]Spotify not authorized. Please run `[white]setup[/white]` first.[/bold red]")
         return
@@ -79,7 +295,76 @@ async def transfer(user: bool, playlist: list[str]) -> None:
         rich.print("[bold red]Failed to transfer. No playlist(s) nor the user's library were specified.[/bold red]")
         return
 
-    await main.transfer_spotify_to_musi(transfer_user_library=user, extra_playlist_urls=playlist)
+    try:
+        await main.transfer_spotify_to_musi(
+            transfer_user_library=user,
+            extra_playlist_urls=playlist,
+            workers=workers,
+            save_spotify_snapshot=save_spotify_snapshot,
+            save_for_offline=save_for_offline,
+            force_upload=force_upload,
+            max_backup_size=max_backup_bytes,
+        )
+    except RemoteCacheError as exc:
+        rich.print(f"[bold red]Failed to transfer. {exc}[/bold red]")
+
+
+@cli.command()  # type: ignore[arg-type, attr-defined]
+@async_cmd
+@click.option(
+    "-u",
+    "--user",
+    is_flag=True,
+    help="Sync liked songs and playlists of authorized user.",
+    default=False,
+    show_default=True,
+)
+@click.option(
+    "-pl",
+    "--playlist",
+    help="Sync Spotify playlist(s) by URL.",
+    multiple=True,
+    type=str,
+)
+@click.option(
+    "-i",
+    "--interval",
+    help="Minutes between checking Spotify for changes.",
+    type=click.FloatRange(min=1),
+    default=30,
+    show_default=True,
+)
+@click.option(
+    "-w",
+    "--workers",
+    help="Number of worker processes to parse and score YouTube Music results in. 0 parses them on the event loop.",
+    type=click.IntRange(min=0),
+    default=0,
+    show_default=True,
+)
+async def watch(user: bool, playlist: list[str], interval: float, workers: int) -> None:
+    """
+    Keep running, and upload a new Musi backup whenever the songs on Spotify change.
+    """
+    import pyfy.excs
+
+    from spotify_to_musi import main, spotify
+
+    await spotify.init()
+
+    try:
+        await spotify.call(spotify.spotify.me)
+    except pyfy.excs.SpotifyError:
+        rich.print("[bold red]Spotify not authorized. Please run `[white]setup[/white]` first.[/bold red]")
+        return
+
+    if not user and not playlist:
+        rich.print("[bold red]Failed to watch. No playlist(s) nor the user's library were specified.[/bold red]")
+        return
+
+    await main.watch_spotify_to_musi(
+        transfer_user_library=user, extra_playlist_urls=playlist, interval=interval * 60, workers=workers
+    )
 
 
 @cli.command()  # type: ignore[attr-defined]
@@ -88,6 +373,13 @@ async def setup() -> None:
     """
     Configure Spotify w/ OAuth.
     """
+    import pyfy.excs
+    from rich.prompt import Prompt
+
+    from spotify_to_musi import oauth, spotify
+    from spotify_to_musi.commons import spotify_client_credentials
+    from spotify_to_musi.paths import spotify_credentials_path
+
     spotify_to_musi_text = "[bold][green]Spotify[/green][white]-to-[/white][dark_orange3]Musi[/dark_orange3][/bold]"
     welcome_text = f"{spotify_to_musi_text} first time setup! [i grey53](Ctrl + C to exit)[/i grey53]\n"
 
@@ -125,13 +417,235 @@ async def setup() -> None:
 
     try:
         await spotify.init()
-        await spotify.spotify.me()
+        await spotify.call(spotify.spotify.me)
     except pyfy.excs.SpotifyError:
-        SPOTIFY_CREDENTIALS_PATH.unlink()
+        spotify_credentials_path().unlink()
         rich.print("[red]Uh Oh? Spotify isn't authorized. Please check your credentials.[/red]")
 
     rich.print("[bold green]Spotify Authorized![/bold green]")
 
 
+@cli.group()  # type: ignore[attr-defined]
+def cache() -> None:
+    """
+    Manage the YouTube track cache.
+    """
+
+
+@cache.command()  # type: ignore[attr-defined]
+@async_cmd
+async def compact() -> None:
+    """
+    Rewrite the cache without evicted and replaced tracks.
+    """
+    from spotify_to_musi import tracks_cache
+
+    entries = await tracks_cache.load()
+    tracks_cache.evict(entries, time.time())
+    await tracks_cache.compact()
+
+    rich.print(f"[bold green]Compacted cache to [white]{len(entries)}[/white] tracks.[/bold green]")
+
+
+@cache.command(name="export")  # type: ignore[attr-defined]
+@async_cmd
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+async def export_(path: str) -> None:
+    """
+    Export the cache to a portable file.
+    """
+    from spotify_to_musi import cache_export
+
+    exported = await cache_export.export_cache(path)
+
+    rich.print(f"[bold green]Exported [white]{exported}[/white] tracks to [white]{path}[/white].[/bold green]")
+
+
+@cache.command(name="import")  # type: ignore[attr-defined]
+@async_cmd
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+async def import_(path: str) -> None:
+    """
+    Merge an exported cache file into the cache.
+    """
+    from spotify_to_musi import cache_export
+    from spotify_to_musi.exceptions import CacheFormatError, RemoteCacheError
+
+    try:
+        imported, merged = await cache_export.import_cache(path)
+    except (CacheFormatError, RemoteCacheError) as exc:
+        rich.print(f"[bold red]Failed to import cache. {exc}[/bold red]")
+        return
+
+    rich.print(
+        f"[bold green]Imported [white]{imported}[/white] tracks, [white]{merged}[/white] of them were new or newer.[/bold green]"
+    )
+
+
+@cli.group()  # type: ignore[attr-defined]
+def archive() -> None:
+    """
+    Manage the archive of uploaded Musi backups.
+    """
+
+
+@archive.command(name="list")  # type: ignore[attr-defined]
+@async_cmd
+async def list_() -> None:
+    """
+    List the archived backups, oldest first.
+    """
+    from spotify_to_musi import backup_ledger, musi_archive
+    from spotify_to_musi.exceptions import ArchiveError
+
+    try:
+        archived_backups = await musi_archive.list_backups()
+    except ArchiveError as exc:
+        rich.print(f"[bold red]Failed to list backups. {exc}[/bold red]")
+        return
+
+    if not archived_backups:
+        rich.print("[grey53]No backups archived yet.[/grey53]")
+        return
+
+    for archived_backup in archived_backups:
+        archived_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(archived_backup.archived_at))
+        code = await backup_ledger.lookup(archived_backup.uuid, archived_backup.layout)
+        rich.print(
+            f"[bold][dark_orange3]{archived_backup.id[:12]}[/dark_orange3][/bold] [grey53]{archived_at}[/grey53] "
+            f"[white]{len(archived_backup.playlists)}[/white] playlists, code [white]{code or '-'}[/white]"
+        )
+
+
+@archive.command()  # type: ignore[attr-defined]
+@async_cmd
+@click.argument("old")
+@click.argument("new")
+async def diff(old: str, new: str) -> None:
+    """
+    Compare the playlists of two archived backups, by id (or a prefix of it).
+    """
+    from spotify_to_musi import musi_archive
+    from spotify_to_musi.exceptions import ArchiveError
+
+    try:
+        backup_diff = musi_archive.diff_backups(
+            await musi_archive.find_backup(old), await musi_archive.find_backup(new)
+        )
+    except ArchiveError as exc:
+        rich.print(f"[bold red]Failed to diff backups. {exc}[/bold red]")
+        return
+
+    if backup_diff.library_changed:
+        rich.print("[bold yellow1]CHANGED:[/bold yellow1] [white]Liked Songs[/white]")
+    for name in backup_diff.added:
+        rich.print(f"[bold green]ADDED:[/bold green] [white]{name}[/white]")
+    for name in backup_diff.removed:
+        rich.print(f"[bold red]REMOVED:[/bold red] [white]{name}[/white]")
+    for name in backup_diff.changed:
+        rich.print(f"[bold yellow1]CHANGED:[/bold yellow1] [white]{name}[/white]")
+    if backup_diff == musi_archive.BackupDiff((), (), (), library_changed=False):
+        rich.print("[grey53]The backups have the same playlists.[/grey53]")
+
+
+@archive.command()  # type: ignore[attr-defined]
+@async_cmd
+@click.argument("backup_id")
+@click.option(
+    "--force-upload",
+    is_flag=True,
+    help="Upload the Musi backup even if it was already uploaded, instead of reusing its code.",
+    default=False,
+)
+async def upload(backup_id: str, force_upload: bool) -> None:
+    """
+    Upload an archived backup to Musi again, by id (or a prefix of it),
+    w/o loading its songs from Spotify and YouTube again.
+    """
+    from spotify_to_musi import main, musi, musi_archive
+    from spotify_to_musi.exceptions import ArchiveError
+
+    try:
+        musi_playlists, musi_library = await musi_archive.restore_backup(await musi_archive.find_backup(backup_id))
+    except ArchiveError as exc:
+        rich.print(f"[bold red]Failed to upload backup. {exc}[/bold red]")
+        return
+
+    # a backup w/ liked songs is (almost always) of the user's library
+    transfer_user_library = bool(musi_library.tracks)
+    backup = await musi.upload_to_musi(musi_playlists, musi_library, force=force_upload)
+    main.print_musi_code(backup, transfer_user_library=transfer_user_library)
+
+
+@cli.command(name="eval")  # type: ignore[arg-type, attr-defined]
+@async_cmd
+@click.argument("corpus", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--record",
+    is_flag=True,
+    help="Search YouTube Music for the tracks of the corpus w/o a recorded response, and save them to the corpus.",
+    default=False,
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    help="How many times to score the corpus, for a steadier throughput.",
+    default=5,
+)
+@click.option(
+    "--show-failures",
+    is_flag=True,
+    help="List the tracks that were matched to the wrong result, or missed.",
+    default=False,
+)
+async def eval_(corpus: str, record: bool, repeat: int, show_failures: bool) -> None:
+    """
+    Evaluate the matching of YouTube Music results against a corpus of recorded searches, w/o network access.
+    """
+    from spotify_to_musi import matcher_eval, youtube
+    from spotify_to_musi.exceptions import CorpusFormatError
+
+    try:
+        cases = await matcher_eval.load_corpus(corpus)
+        if record:
+            async with youtube.create_search_client() as client:
+                recorded = await matcher_eval.record_responses(cases, client)
+            await matcher_eval.save_corpus(corpus, cases)
+            rich.print(f"[bold green]Recorded [white]{recorded}[/white] searches.[/bold green]")
+        report = matcher_eval.evaluate(cases, repeat)
+    except CorpusFormatError as exc:
+        rich.print(f"[bold red]Failed to evaluate. {exc}[/bold red]")
+        return
+
+    if show_failures:
+        for result in report.results:
+            if result.outcome in ("mismatched", "missed"):
+                rich.print(
+                    f"[bold red]{result.outcome.upper()}:[/bold red] {result.case.track.colorized_query} "
+                    f"[grey53]got {result.video_id or '-'} ({round(result.score, 3)}), "
+                    f"expected {', '.join(result.case.expected_video_ids)}[/grey53]"
+                )
+
+    total = len(report.results)
+    rich.print(f"[bold]Accuracy:[/bold] [white]{report.accuracy:.1%}[/white] of [white]{total}[/white] tracks")
+    outcomes: tuple[matcher_eval.Outcome, ...] = ("matched", "skipped", "mismatched", "missed")
+    for outcome in outcomes:
+        rich.print(f"  {outcome}: [white]{report.count(outcome)}[/white]")
+
+    rich.print(f"[bold]Top scores[/bold] [grey53](threshold {youtube.MATCH_THRESHOLD})[/grey53]")
+    for bucket in report.buckets:
+        low = "" if bucket.low is None else bucket.low
+        high = "" if bucket.high is None else bucket.high
+        rich.print(
+            f"  {low:>5}..{high:<5} [green]{bucket.correct:>6}[/green] right [red]{bucket.incorrect:>6}[/red] wrong"
+        )
+
+    rich.print(
+        f"[bold]Throughput:[/bold] [white]{report.tracks_per_second:,.0f}[/white] tracks/s, "
+        f"[white]{report.results_per_second:,.0f}[/white] results/s "
+        f"[grey53](parsed in {report.parse_seconds * 1000:.1f}ms)[/grey53]"
+    )
+
+
 if __name__ == "__main__":
     cli()  # type: ignore[misc]
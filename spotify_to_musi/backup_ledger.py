@@ -0,0 +1,81 @@
+"""
+A ledger of the backups uploaded to Musi, so an unchanged backup isn't uploaded (several MB) again.
+
+Backups are identified by their uuid, which is a hash of their videos, and their layout (see `MusiBackup`).
+The ledger is a JSON lines file in the data directory, w/ a line appended per upload.
+"""
+from __future__ import annotations
+
+import json
+import time
+import typing as t
+
+import aiofiles
+
+from spotify_to_musi.paths import musi_ledger_path
+
+if t.TYPE_CHECKING:
+    import uuid
+
+
+class LedgerEntry(t.NamedTuple):
+    code: str
+    uploaded_at: float
+
+
+# uuid and layout -> the latest upload of that backup
+_entries: dict[tuple[str, str], LedgerEntry] | None = None
+
+
+def unload() -> None:
+    """
+    Forget the in-memory ledger, ie. after changing the data directory.
+    """
+    global _entries
+    _entries = None
+
+
+async def load() -> dict[tuple[str, str], LedgerEntry]:
+    """
+    Load the ledger, the first time it's used.
+    """
+    global _entries
+
+    if _entries is not None:
+        return _entries
+
+    entries: dict[tuple[str, str], LedgerEntry] = {}
+    ledger_path = musi_ledger_path()
+    if ledger_path.is_file():
+        async with aiofiles.open(ledger_path, "r") as f:
+            async for line in f:
+                try:
+                    data = json.loads(line)
+                    entries[data["uuid"], data["layout"]] = LedgerEntry(data["code"], data["uploaded_at"])
+                # the ledger only saves uploads, so an unreadable line is skipped rather than failing the transfer
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+    # another upload could have loaded it in the meantime
+    if _entries is None:
+        _entries = entries
+    return _entries
+
+
+async def lookup(backup_uuid: uuid.UUID | str, layout: str) -> str | None:
+    """
+    Returns the code of the backup, if it was already uploaded.
+    """
+    entries = await load()
+    entry = entries.get((str(backup_uuid), layout))
+    return entry.code if entry else None
+
+
+async def record(backup_uuid: uuid.UUID, layout: str, code: str) -> None:
+    entries = await load()
+    entry = LedgerEntry(code, time.time())
+    entries[str(backup_uuid), layout] = entry
+
+    line = json.dumps({"uuid": str(backup_uuid), "layout": layout, "code": code, "uploaded_at": entry.uploaded_at})
+    async with aiofiles.open(musi_ledger_path(), "a") as f:
+        await f.write(line + "\n")
@@ -0,0 +1,325 @@
+"""
+Storage backends for the track cache.
+
+`tracks_cache` keeps the tracks it has looked up in memory, and uses a backend to load, fetch and store them.
+The default `FileBackend` is a journal on the local disk which is loaded up front,
+while a `KeyValueBackend` is shared by a fleet of machines and is only queried in batches for the tracks of a run.
+"""
+from __future__ import annotations
+
+import abc
+import hashlib
+import json
+import os
+import time
+import typing as t
+import urllib.parse
+
+import aiofiles
+
+from spotify_to_musi.exceptions import UnsupportedCacheUrlError
+from spotify_to_musi.paths import (
+    legacy_youtube_data_cache_path,
+    youtube_data_cache_path,
+)
+from spotify_to_musi.typings.youtube import YouTubeTrack
+
+if t.TYPE_CHECKING:
+    from spotify_to_musi.typings.core import Track
+
+# access stamps are only appended to the journal again once they're this old (in seconds),
+# so a lookup is an in-memory assignment and a cache hit is written at most once a day
+ACCESS_STAMP_RESOLUTION = 24 * 60 * 60
+# compact the journal once more than half of its lines are dead (replaced or evicted)
+COMPACTION_DEAD_RATIO = 0.5
+
+
+class CacheEntry:
+    __slots__ = ("youtube_track", "cached_at", "accessed_at", "stored_accessed_at")
+
+    def __init__(self: CacheEntry, youtube_track: YouTubeTrack, cached_at: float, accessed_at: float) -> None:
+        self.youtube_track = youtube_track
+        self.cached_at = cached_at
+        self.accessed_at = accessed_at
+        # the access stamp as it's currently stored by the backend
+        self.stored_accessed_at = accessed_at
+
+    @classmethod
+    def from_dict(cls: type[CacheEntry], data: dict[str, t.Any], now: float) -> CacheEntry:
+        # caches written before access stamps were stored don't have them
+        cached_at: float = data.pop("cached_at", now)
+        accessed_at: float = data.pop("accessed_at", now)
+        return cls(YouTubeTrack.from_dict(data), cached_at=cached_at, accessed_at=accessed_at)
+
+    def as_dict(self: CacheEntry) -> dict[str, t.Any]:
+        return {**self.youtube_track.as_dict(), "cached_at": self.cached_at, "accessed_at": self.accessed_at}
+
+    def touch(self: CacheEntry, now: float) -> bool:
+        """
+        Refresh the access stamp, returns whether the stored one is stale (and should be stored again).
+        """
+        self.accessed_at = now
+        return now - self.stored_accessed_at >= ACCESS_STAMP_RESOLUTION
+
+
+class CacheBackend(abc.ABC):
+    # whether evicting entries from memory evicts them from the backend as well (by rewriting it),
+    # stores that are shared evict entries on their own instead
+    rewrites_evicted: t.ClassVar[bool] = True
+
+    async def load(self: CacheBackend) -> list[CacheEntry]:
+        """
+        Entries to keep in memory up front.
+        Backends which are too large (or shared) to load return none, and are queried w/ `get_many` instead.
+        """
+        return []
+
+    async def get_many(self: CacheBackend, tracks: t.Collection[Track]) -> list[CacheEntry]:
+        """
+        Fetch the entries of the tracks (by track or by isrc) in as few requests as possible.
+        """
+        return []
+
+    @abc.abstractmethod
+    async def set_many(
+        self: CacheBackend,
+        changed: t.Collection[CacheEntry],
+        cached: t.Mapping[Track, CacheEntry],
+        *,
+        stale: t.Collection[CacheEntry] = (),
+    ) -> None:
+        """
+        Store new or changed entries.
+        `stale` are entries whose stored access stamp is stale (see `CacheEntry.touch`), to store again if need be.
+        `cached` are all the entries in memory, ie. to compact the stored entries.
+        """
+
+    @abc.abstractmethod
+    async def rewrite(self: CacheBackend, cached: t.Mapping[Track, CacheEntry]) -> None:
+        """
+        Replace the stored entries w/ the ones in memory, ie. after evicting entries.
+        """
+
+    @abc.abstractmethod
+    async def close(self: CacheBackend) -> None:
+        """
+        Release the backend's connections, if it has any.
+        """
+
+
+class FileBackend(CacheBackend):
+    """
+    The cache is stored as a journal of JSON lines, one cached YouTube track per line, where a later line for the same
+    track replaces an earlier one. New matches and refreshed access stamps are appended to the journal,
+    while eviction and compaction rewrite it w/o the dead lines.
+    """
+
+    def __init__(self: FileBackend) -> None:
+        self.journal_lines = 0
+
+    async def _read_journal(self: FileBackend) -> list[dict[str, t.Any]]:
+        lines: list[dict[str, t.Any]] = []
+
+        # caches used to be stored as a single json list, it's read first so the journal's lines replace its entries
+        legacy_cache_path = legacy_youtube_data_cache_path()
+        if legacy_cache_path.is_file():
+            async with aiofiles.open(legacy_cache_path, "r") as f:
+                lines.extend(json.loads(await f.read()))
+
+        cache_path = youtube_data_cache_path()
+        if cache_path.is_file():
+            async with aiofiles.open(cache_path, "r") as f:
+                lines.extend([json.loads(line) async for line in f if line.strip()])
+
+        return lines
+
+    async def load(self: FileBackend) -> list[CacheEntry]:
+        now = time.time()
+
+        try:
+            entries = [CacheEntry.from_dict(line, now) for line in await self._read_journal()]
+        except (KeyError, TypeError, ValueError):
+            # unreadable (ie. corrupt or from an incompatible version), start over
+            entries = []
+            youtube_data_cache_path().unlink(missing_ok=True)
+
+        self.journal_lines = len(entries)
+
+        if legacy_youtube_data_cache_path().is_file():
+            # merged into the journal. the legacy cache could have several entries for the same track,
+            # and the journal could have some of its tracks as well, keep the last one of each
+            latest = {(e.youtube_track.name, e.youtube_track.duration, e.youtube_track.artists): e for e in entries}
+            await self.rewrite(latest)
+            legacy_youtube_data_cache_path().unlink()
+
+        return entries
+
+    async def _append(self: FileBackend, entries: t.Iterable[CacheEntry]) -> None:
+        lines: list[str] = []
+        for entry in entries:
+            lines.append(json.dumps(entry.as_dict()) + "\n")
+            entry.stored_accessed_at = entry.accessed_at
+
+        if not lines:
+            return
+
+        async with aiofiles.open(youtube_data_cache_path(), "a") as f:
+            await f.write("".join(lines))
+
+        self.journal_lines += len(lines)
+
+    async def set_many(
+        self: FileBackend,
+        changed: t.Collection[CacheEntry],
+        cached: t.Mapping[Track, CacheEntry],
+        *,
+        stale: t.Collection[CacheEntry] = (),
+    ) -> None:
+        """
+        Append changed entries and stale access stamps to the journal,
+        compacting it instead if it has too many dead lines.
+        """
+        pending = {id(e): e for e in (*changed, *stale)}
+
+        lines = self.journal_lines + len(pending)
+        if lines - len(cached) > lines * COMPACTION_DEAD_RATIO:
+            await self.rewrite(cached)
+        else:
+            await self._append(pending.values())
+
+    async def rewrite(self: FileBackend, cached: t.Mapping[t.Any, CacheEntry]) -> None:
+        """
+        Rewrite the journal w/ one line per cached track, dropping replaced and evicted tracks.
+        """
+        sorted_entries = sorted(cached.values(), key=lambda e: e.youtube_track.primary_artist.name)
+
+        cache_path = youtube_data_cache_path()
+        temp_path = cache_path.with_suffix(".tmp")
+
+        async with aiofiles.open(temp_path, "w") as f:
+            for entry in sorted_entries:
+                await f.write(json.dumps(entry.as_dict()) + "\n")
+                entry.stored_accessed_at = entry.accessed_at
+
+        # atomic, so an interrupted compaction doesn't lose the cache
+        os.replace(temp_path, cache_path)
+        self.journal_lines = len(sorted_entries)
+
+    async def close(self: FileBackend) -> None:
+        """
+        The journal is only opened while it's read or written, so there's nothing to close.
+        """
+
+
+class KeyValueClient(t.Protocol):
+    async def mget(self: KeyValueClient, keys: t.Sequence[str]) -> list[bytes | None]:
+        ...
+
+    async def mset(self: KeyValueClient, items: t.Mapping[str, bytes]) -> None:
+        ...
+
+    async def close(self: KeyValueClient) -> None:
+        ...
+
+
+class KeyValueBackend(CacheBackend):
+    """
+    Stores every entry under a key derived from its track, and under its isrc (if it has one).
+    Eviction is left to the key-value store itself (ie. redis' `maxmemory-policy allkeys-lru`).
+    """
+
+    rewrites_evicted = False
+
+    # keys per request, so a huge library doesn't build a single huge request
+    BATCH_SIZE = 1_000
+
+    def __init__(self: KeyValueBackend, client: KeyValueClient, *, prefix: str = "spotify-to-musi:") -> None:
+        self.client = client
+        self.prefix = prefix
+
+    def track_key(self: KeyValueBackend, track: Track) -> str:
+        identity = json.dumps([track.name, track.duration, [a.name for a in track.artists]])
+        # sha1 is only used to keep keys short, not for security
+        digest = hashlib.sha1(identity.encode()).hexdigest()  # noqa: S324
+        return f"{self.prefix}track:{digest}"
+
+    def isrc_key(self: KeyValueBackend, isrc: str) -> str:
+        return f"{self.prefix}isrc:{isrc}"
+
+    async def get_many(self: KeyValueBackend, tracks: t.Collection[Track]) -> list[CacheEntry]:
+        keys: list[str] = []
+        for track in tracks:
+            keys.append(self.track_key(track))
+            if track.isrc:
+                keys.append(self.isrc_key(track.isrc))
+
+        now = time.time()
+        entries: list[CacheEntry] = []
+
+        for start in range(0, len(keys), self.BATCH_SIZE):
+            values = await self.client.mget(keys[start : start + self.BATCH_SIZE])
+            entries.extend(CacheEntry.from_dict(json.loads(value), now) for value in values if value is not None)
+
+        return entries
+
+    async def set_many(
+        self: KeyValueBackend,
+        changed: t.Collection[CacheEntry],
+        cached: t.Mapping[Track, CacheEntry],
+        *,
+        stale: t.Collection[CacheEntry] = (),
+    ) -> None:
+        # access stamps aren't shared, a shared store tracks its own (ie. for LRU eviction)
+        items: dict[str, bytes] = {}
+
+        for entry in changed:
+            value = json.dumps(entry.as_dict()).encode()
+            youtube_track = entry.youtube_track
+            items[self.track_key(youtube_track)] = value
+            if youtube_track.isrc:
+                items[self.isrc_key(youtube_track.isrc)] = value
+
+            if len(items) >= self.BATCH_SIZE:
+                await self.client.mset(items)
+                items = {}
+
+        if items:
+            await self.client.mset(items)
+
+    async def rewrite(self: KeyValueBackend, cached: t.Mapping[Track, CacheEntry]) -> None:
+        """
+        A shared store can't be replaced by what one worker has in memory, it's compacted by evicting on its own.
+        """
+
+    async def close(self: KeyValueBackend) -> None:
+        await self.client.close()
+
+
+def backend_from_url(url: str | None) -> CacheBackend:
+    """
+    Create a cache backend from a url.
+    `file` (or no url) is the local file cache, `redis://[:password@]host[:port][/db]` is a shared redis cache.
+    """
+    if not url or url == "file":
+        return FileBackend()
+
+    parsed_url = urllib.parse.urlsplit(url)
+
+    if parsed_url.scheme == "redis":
+        from spotify_to_musi.kv_client import RedisClient
+
+        db = int(parsed_url.path.lstrip("/") or 0)
+        client = RedisClient(
+            host=parsed_url.hostname or "localhost",
+            port=parsed_url.port or 6379,
+            db=db,
+            password=parsed_url.password,
+        )
+        return KeyValueBackend(client)
+
+    if parsed_url.scheme == "memory":
+        from spotify_to_musi.kv_client import MemoryKeyValueStore
+
+        return KeyValueBackend(MemoryKeyValueStore())
+
+    raise UnsupportedCacheUrlError(url)
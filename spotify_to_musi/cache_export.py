@@ -0,0 +1,179 @@
+"""
+Portable export and import of the track cache, ie. to pre-seed new machines w/ the matches others have made.
+
+An export file is a header followed by a zlib compressed stream of frames.
+Each frame is a (big-endian, 4 byte) length prefix followed by a JSON array of positional records, one per track.
+Records are positional (instead of the cache's dicts) so field names aren't repeated for every track.
+"""
+from __future__ import annotations
+
+import json
+import struct
+import typing as t
+import zlib
+
+import aiofiles
+
+from spotify_to_musi import tracks_cache
+from spotify_to_musi.exceptions import CacheFormatError
+from spotify_to_musi.typings.core import Artist
+from spotify_to_musi.typings.youtube import YouTubeTrack
+
+if t.TYPE_CHECKING:
+    import os
+
+MAGIC = b"STMCACHE"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">8sH")
+FRAME_LENGTH = struct.Struct(">I")
+
+# records per frame, imports are decoded one frame at a time
+FRAME_SIZE = 1_000
+READ_CHUNK_SIZE = 64 * 1024
+
+ExportRecord = list[t.Any]
+
+
+def entry_to_record(entry: tracks_cache.CacheEntry) -> ExportRecord:
+    yt = entry.youtube_track
+    return [
+        yt.name,
+        yt.duration,
+        [a.name for a in yt.artists],
+        yt.album_name,
+        yt.is_explicit,
+        yt.isrc,
+        yt.youtube_name,
+        yt.youtube_duration,
+        [a.name for a in yt.youtube_artists],
+        yt.video_id,
+        entry.cached_at,
+        entry.accessed_at,
+    ]
+
+
+def record_to_entry(record: ExportRecord) -> tracks_cache.CacheEntry:
+    (
+        name,
+        duration,
+        artists,
+        album_name,
+        is_explicit,
+        isrc,
+        youtube_name,
+        youtube_duration,
+        youtube_artists,
+        video_id,
+        cached_at,
+        accessed_at,
+    ) = record
+
+    youtube_track = YouTubeTrack(
+        name=name,
+        duration=duration,
+        artists=tuple(Artist(name=a) for a in artists),
+        album_name=album_name,
+        is_explicit=is_explicit,
+        isrc=isrc,
+        youtube_name=youtube_name,
+        youtube_duration=youtube_duration,
+        youtube_artists=tuple(Artist(name=a) for a in youtube_artists),
+        video_id=video_id,
+    )
+    return tracks_cache.CacheEntry(youtube_track, cached_at=cached_at, accessed_at=accessed_at)
+
+
+def _frame(records: list[ExportRecord]) -> bytes:
+    payload = json.dumps(records, separators=(",", ":")).encode()
+    return FRAME_LENGTH.pack(len(payload)) + payload
+
+
+async def export_cache(path: str | os.PathLike[str]) -> int:
+    """
+    Export the cache to a file.
+    Returns the number of exported tracks.
+    """
+    entries = await tracks_cache.load()
+    compressor = zlib.compressobj(level=9)
+    records: list[ExportRecord] = []
+
+    async with aiofiles.open(path, "wb") as f:
+        await f.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+
+        for entry in entries.values():
+            records.append(entry_to_record(entry))
+            if len(records) == FRAME_SIZE:
+                await f.write(compressor.compress(_frame(records)))
+                records.clear()
+
+        if records:
+            await f.write(compressor.compress(_frame(records)))
+        await f.write(compressor.flush())
+
+    return len(entries)
+
+
+async def read_frames(path: str | os.PathLike[str]) -> t.AsyncIterator[list[ExportRecord]]:
+    """
+    Stream the frames of an exported cache file, w/o reading the whole file into memory.
+    """
+    decompressor = zlib.decompressobj()
+    buffer = bytearray()
+
+    async with aiofiles.open(path, "rb") as f:
+        header = await f.read(HEADER.size)
+        if len(header) != HEADER.size:
+            reason = "file is too short"
+            raise CacheFormatError(reason)
+
+        magic, version = HEADER.unpack(header)
+        if magic != MAGIC:
+            reason = "not a spotify-to-musi cache export"
+            raise CacheFormatError(reason)
+        if version != FORMAT_VERSION:
+            reason = f"unsupported version {version}, expected {FORMAT_VERSION}"
+            raise CacheFormatError(reason)
+
+        while chunk := await f.read(READ_CHUNK_SIZE):
+            try:
+                buffer += decompressor.decompress(chunk)
+            except zlib.error as exc:
+                reason = "corrupt data"
+                raise CacheFormatError(reason) from exc
+
+            while len(buffer) >= FRAME_LENGTH.size:
+                (length,) = FRAME_LENGTH.unpack_from(buffer)
+                end = FRAME_LENGTH.size + length
+                if len(buffer) < end:
+                    break
+
+                try:
+                    records = json.loads(buffer[FRAME_LENGTH.size : end])
+                except ValueError as exc:
+                    reason = "corrupt frame"
+                    raise CacheFormatError(reason) from exc
+
+                yield records
+                del buffer[:end]
+
+    if buffer or not decompressor.eof:
+        reason = "file is truncated"
+        raise CacheFormatError(reason)
+
+
+async def import_cache(path: str | os.PathLike[str]) -> tuple[int, int]:
+    """
+    Merge an exported cache file into the cache.
+    The file is decoded one frame at a time, and merged (then evicted and stored) once, as a whole.
+    Returns the number of imported tracks and the number of tracks that were added to (or replaced in) the cache.
+    """
+    entries: list[tracks_cache.CacheEntry] = []
+
+    async for records in read_frames(path):
+        try:
+            entries.extend(record_to_entry(record) for record in records)
+        except (TypeError, ValueError) as exc:
+            reason = "invalid record"
+            raise CacheFormatError(reason) from exc
+
+    return len(entries), await tracks_cache.merge_entries(entries)
@@ -8,7 +8,10 @@ import typing as t
 
 import aiofiles
 
-from spotify_to_musi.paths import SPOTIFY_CREDENTIALS_PATH
+from spotify_to_musi.paths import spotify_credentials_path
+
+if t.TYPE_CHECKING:
+    from pathlib import Path
 
 # https://regex101.com/r/r4mp7V/1
 # works on tracks and playlists
@@ -50,11 +53,27 @@ def skipping_message(*, text: str, reason: str) -> str:
     return f"[bold yellow1]SKIPPING:[/bold yellow1] {text} [yellow1][{reason}][/yellow1]"
 
 
-async def load_spotify_credentials() -> dict[str, t.Any] | None:
-    if not SPOTIFY_CREDENTIALS_PATH.is_file():
+def deduplicated_message(*, tracks_count: int, searches_count: int) -> str:
+    return (
+        f"[bold green]DEDUPLICATED:[/bold green] [white]{tracks_count}[/white] [grey53]tracks[/grey53] "
+        f"in [white]{searches_count}[/white] [grey53]searches[/grey53]"
+    )
+
+
+def rate_limited_message(*, seconds: float) -> str:
+    return f"[bold yellow1]RATE LIMITED:[/bold yellow1] Waiting [white]{seconds:g}[/white] seconds."
+
+
+def error_message(*, text: str) -> str:
+    return f"[bold red]ERROR:[/bold red] {text}"
+
+
+async def load_spotify_credentials(credentials_path: Path | None = None) -> dict[str, t.Any] | None:
+    credentials_path = credentials_path or spotify_credentials_path()
+    if not credentials_path.is_file():
         return None
 
-    async with aiofiles.open(SPOTIFY_CREDENTIALS_PATH, "r") as file:
+    async with aiofiles.open(credentials_path, "r") as file:
         spotify_creds_text = await file.read()
 
     return json.loads(spotify_creds_text)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from dataclasses import FrozenInstanceError
+
 
 class UnsupportedPlatformError(RuntimeError):
     """Raised when the platform is not supported."""
@@ -8,6 +10,13 @@ class UnsupportedPlatformError(RuntimeError):
         super().__init__(f"Unsupported platform: {platform}")
 
 
+class UnsupportedCacheUrlError(ValueError):
+    """Raised when a cache url has an unsupported scheme."""
+
+    def __init__(self: UnsupportedCacheUrlError, url: str) -> None:
+        super().__init__(f"Unsupported cache url: {url!r}")
+
+
 class EmptyTupleError(ValueError):
     """Raised when a tuple is empty."""
 
@@ -22,6 +31,13 @@ class BlankNameError(ValueError):
         super().__init__(f"{name.capitalize()!r} name can't be blank")
 
 
+class FrozenRecordError(FrozenInstanceError):
+    """Raised when a field of an immutable core model is assigned or deleted, like a frozen dataclass."""
+
+    def __init__(self: FrozenRecordError, name: str, *, deleting: bool = False) -> None:
+        super().__init__(f"cannot {'delete' if deleting else 'assign to'} field {name!r}")
+
+
 class YouTubeMusicSearchError(Exception):
     def __init__(self: YouTubeMusicSearchError, message: str) -> None:
         super().__init__(f"Error searching YouTube Music: {message!r}")
@@ -30,3 +46,43 @@ class YouTubeMusicSearchError(Exception):
 class YouTubeMusicNoOverlayError(Exception):
     def __init__(self: YouTubeMusicNoOverlayError) -> None:
         super().__init__("No overlay found in song or video data.")
+
+
+class CacheFormatError(ValueError):
+    """Raised when an exported cache file can't be read."""
+
+    def __init__(self: CacheFormatError, reason: str) -> None:
+        super().__init__(f"Invalid cache file: {reason}")
+
+
+class SnapshotFormatError(ValueError):
+    """Raised when a Spotify snapshot file can't be read."""
+
+    def __init__(self: SnapshotFormatError, reason: str) -> None:
+        super().__init__(f"Invalid Spotify snapshot: {reason}")
+
+
+class RemoteCacheError(Exception):
+    def __init__(self: RemoteCacheError, message: str) -> None:
+        super().__init__(f"Error from remote cache: {message}")
+
+
+class ManifestError(ValueError):
+    """Raised when a transfer manifest can't be read."""
+
+    def __init__(self: ManifestError, reason: str) -> None:
+        super().__init__(f"Invalid manifest: {reason}")
+
+
+class ArchiveError(ValueError):
+    """Raised when an archived Musi backup can't be found or read."""
+
+    def __init__(self: ArchiveError, reason: str) -> None:
+        super().__init__(f"Can't read archived backup: {reason}")
+
+
+class CorpusFormatError(ValueError):
+    """Raised when a corpus of recorded searches can't be read."""
+
+    def __init__(self: CorpusFormatError, reason: str) -> None:
+        super().__init__(f"Invalid corpus: {reason}")
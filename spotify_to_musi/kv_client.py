@@ -0,0 +1,157 @@
+"""Clients for key-value stores that can back the track cache (see `cache_backends.KeyValueBackend`)."""
+from __future__ import annotations
+
+import asyncio
+import typing as t
+
+from spotify_to_musi.exceptions import RemoteCacheError
+
+# seconds
+DEFAULT_TIMEOUT = 10.0
+
+
+class MemoryKeyValueStore:
+    """
+    In-process stand-in for a key-value store, ie. for tests.
+    Counts requests, so batching can be checked.
+    """
+
+    def __init__(self: MemoryKeyValueStore) -> None:
+        self.data: dict[str, bytes] = {}
+        self.requests = 0
+
+    async def mget(self: MemoryKeyValueStore, keys: t.Sequence[str]) -> list[bytes | None]:
+        self.requests += 1
+        return [self.data.get(key) for key in keys]
+
+    async def mset(self: MemoryKeyValueStore, items: t.Mapping[str, bytes]) -> None:
+        self.requests += 1
+        self.data.update(items)
+
+    async def close(self: MemoryKeyValueStore) -> None:
+        pass
+
+
+class RedisClient:
+    """
+    Minimal client for the redis protocol (RESP2), only what the cache needs: MGET and MSET.
+    Works w/ redis and compatible stores (valkey, keydb, dragonfly, etc.) w/o an extra dependency.
+    """
+
+    def __init__(
+        self: RedisClient,
+        *,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        password: str | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        # for connecting and for every reply, so a dead server fails the command instead of hanging the transfer
+        self.timeout = timeout
+
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._lock: asyncio.Lock | None = None
+
+    @staticmethod
+    def encode_command(*args: str | bytes) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            arg_bytes = arg.encode() if isinstance(arg, str) else arg
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg_bytes), arg_bytes))
+        return b"".join(parts)
+
+    async def _read_reply(self: RedisClient) -> t.Any:
+        assert self._reader is not None  # noqa: S101
+
+        line = await self._reader.readline()
+        if not line:
+            message = "connection closed"
+            raise RemoteCacheError(message)
+
+        prefix, value = line[:1], line[1:-2]
+
+        if prefix == b"+":
+            return value.decode()
+        if prefix == b"-":
+            raise RemoteCacheError(value.decode())
+        if prefix == b":":
+            return int(value)
+        if prefix == b"$":
+            length = int(value)
+            if length == -1:
+                return None
+            data = await self._reader.readexactly(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            length = int(value)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+
+        message = f"unexpected reply {line!r}"
+        raise RemoteCacheError(message)
+
+    async def _connect(self: RedisClient) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+        if self.password:
+            await self._send("AUTH", self.password)
+        if self.db:
+            await self._send("SELECT", str(self.db))
+
+    async def _send(self: RedisClient, *args: str | bytes) -> t.Any:
+        assert self._writer is not None  # noqa: S101
+
+        self._writer.write(self.encode_command(*args))
+        await self._writer.drain()
+        return await self._read_reply()
+
+    async def execute(self: RedisClient, *args: str | bytes) -> t.Any:
+        # one connection, so commands from concurrent tasks can't interleave
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        # every failure to reach the store is a RemoteCacheError, and drops the connection so the next command reconnects
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    try:
+                        await asyncio.wait_for(self._connect(), self.timeout)
+                    except RemoteCacheError:
+                        # ie. a wrong password, the connection can't be used
+                        await self.close()
+                        raise
+                return await asyncio.wait_for(self._send(*args), self.timeout)
+            # before OSError, which it's a subclass of on python 3.11+
+            except asyncio.TimeoutError as exc:
+                await self.close()
+                message = f"no reply from {self.host}:{self.port} in {self.timeout}s"
+                raise RemoteCacheError(message) from exc
+            except (OSError, asyncio.IncompleteReadError) as exc:
+                await self.close()
+                message = f"can't reach {self.host}:{self.port} ({exc})"
+                raise RemoteCacheError(message) from exc
+
+    async def mget(self: RedisClient, keys: t.Sequence[str]) -> list[bytes | None]:
+        if not keys:
+            return []
+        return await self.execute("MGET", *keys)
+
+    async def mset(self: RedisClient, items: t.Mapping[str, bytes]) -> None:
+        if not items:
+            return
+        args: list[str | bytes] = []
+        for key, value in items.items():
+            args.extend((key, value))
+        await self.execute("MSET", *args)
+
+    async def close(self: RedisClient) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
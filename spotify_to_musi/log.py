@@ -0,0 +1,188 @@
+"""
+Messages of a run (loaded playlists, skipped tracks, rate limits, errors), which can number in the tens of thousands.
+
+By default they're printed w/ rich. w/ `--quiet` they're collected and printed as a summary at the end instead,
+and w/ `--log-format=jsonl` they're written as JSON lines to a log file.
+"""
+from __future__ import annotations
+
+import collections
+import json
+import sys
+import time
+import typing as t
+
+import rich
+from rich.text import Text
+
+from spotify_to_musi.commons import (
+    deduplicated_message,
+    error_message,
+    loaded_message,
+    rate_limited_message,
+    skipping_message,
+)
+
+if t.TYPE_CHECKING:
+    import os
+
+    from rich.progress import Progress, TaskID
+
+LogFormat = t.Literal["rich", "jsonl"]
+
+
+class _Settings:
+    quiet: bool = False
+    log_format: LogFormat = "rich"
+    log_file: t.TextIO | None = None
+
+
+# skipped tracks by reason, and loaded playlists/liked songs by source, for the summary
+skipped: collections.Counter[str] = collections.Counter()
+loaded_counts: collections.Counter[str] = collections.Counter()
+# searches saved by searching for equivalent tracks once, for the summary
+searches_saved: collections.Counter[str] = collections.Counter()
+
+
+def configure(
+    *, quiet: bool = False, log_format: LogFormat = "rich", log_path: str | os.PathLike[str] | None = None
+) -> None:
+    """
+    `log_path` is where jsonl logs are written, standard error by default.
+    """
+    close()
+    _Settings.quiet = quiet
+    _Settings.log_format = log_format
+
+    if log_format == "jsonl":
+        _Settings.log_file = open(log_path, "a", encoding="utf-8") if log_path else sys.stderr  # noqa: SIM115
+
+
+def close() -> None:
+    if _Settings.log_file is not None and _Settings.log_file is not sys.stderr:
+        _Settings.log_file.close()
+    _Settings.log_file = None
+    skipped.clear()
+    loaded_counts.clear()
+    searches_saved.clear()
+
+
+def is_quiet() -> bool:
+    return _Settings.quiet
+
+
+def _plain(markup: str) -> str:
+    return Text.from_markup(markup).plain
+
+
+def _write(event: str, **fields: t.Any) -> None:
+    if _Settings.log_file is not None:
+        _Settings.log_file.write(json.dumps({"time": time.time(), "event": event, **fields}) + "\n")
+
+
+def _print(message: str) -> None:
+    if not _Settings.quiet and _Settings.log_format == "rich":
+        rich.print(message)
+
+
+def skipping(*, text: str, reason: str) -> None:
+    plain_reason = _plain(reason)
+    # ie. 'Low Score: 0.5' -> 'Low Score'
+    skipped[plain_reason.split(":", 1)[0]] += 1
+
+    _write("skipped", text=_plain(text), reason=plain_reason)
+    _print(skipping_message(text=text, reason=reason))
+
+
+def loaded(*, source: str, loaded: str, color: str, name: str | None = None, tracks_count: int | None = None) -> None:
+    loaded_counts[f"{source} {loaded}"] += 1
+
+    _write(
+        "loaded",
+        source=source,
+        loaded=loaded,
+        name=_plain(name) if name is not None else None,
+        tracks_count=tracks_count,
+    )
+    _print(loaded_message(source=source, loaded=loaded, color=color, name=name, tracks_count=tracks_count))
+
+
+def deduplicated(*, tracks_count: int, searches_count: int) -> None:
+    """
+    `tracks_count` distinct tracks are searched for w/ `searches_count` searches.
+    """
+    saved = tracks_count - searches_count
+    if not saved:
+        return
+
+    searches_saved["YouTube"] += saved
+    _write("deduplicated", tracks_count=tracks_count, searches_count=searches_count)
+    _print(deduplicated_message(tracks_count=tracks_count, searches_count=searches_count))
+
+
+def rate_limited(*, seconds: float) -> None:
+    _write("rate_limited", seconds=seconds)
+    _print(rate_limited_message(seconds=seconds))
+
+
+def note(*, event: str, text: str, **fields: t.Any) -> None:
+    """
+    A message about the run itself (ie. a backup that's reused, the time of the next sync).
+    """
+    _write(event, text=_plain(text), **fields)
+    _print(f"[grey53]{text}[/grey53]")
+
+
+def error(*, text: str) -> None:
+    """
+    Unlike the other messages, errors are printed w/ `--quiet` as well, as they aren't in the summary.
+    """
+    _write("error", text=_plain(text))
+    if _Settings.log_format == "rich":
+        rich.print(error_message(text=text))
+
+
+def print_summary() -> None:
+    """
+    Print what was loaded and skipped, when the messages themselves weren't printed.
+    """
+    if not _Settings.quiet and _Settings.log_format == "rich":
+        return
+
+    for name, count in loaded_counts.items():
+        rich.print(f"[bold]LOADED:[/bold] [white]{count}[/white] [grey53]x {name}[/grey53]")
+    for reason, count in skipped.most_common():
+        rich.print(f"[bold yellow1]SKIPPED:[/bold yellow1] [white]{count}[/white] [yellow1][{reason}][/yellow1]")
+    for source, count in searches_saved.items():
+        rich.print(
+            f"[bold green]DEDUPLICATED:[/bold green] [white]{count}[/white] [grey53]{source} searches saved[/grey53]"
+        )
+
+    skipped.clear()
+    loaded_counts.clear()
+    searches_saved.clear()
+
+
+class ThrottledAdvance:
+    """
+    Advances a progress task at most once per `interval` seconds, instead of once per track,
+    as every update to a live progress bar has a cost. Call `flush` once done.
+    """
+
+    def __init__(self: ThrottledAdvance, progress: Progress, task_id: TaskID, interval: float = 0.1) -> None:
+        self.progress = progress
+        self.task_id = task_id
+        self.interval = interval
+        self.pending = 0
+        self.flushed_at = time.monotonic()
+
+    def __call__(self: ThrottledAdvance, advance: int = 1) -> None:
+        self.pending += advance
+        if time.monotonic() - self.flushed_at >= self.interval:
+            self.flush()
+
+    def flush(self: ThrottledAdvance) -> None:
+        if self.pending:
+            self.progress.advance(self.task_id, advance=self.pending)
+            self.pending = 0
+        self.flushed_at = time.monotonic()
@@ -1,19 +1,303 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import time
+import typing as t
+
+import httpx
 import rich
+from rich.markup import escape
 from rich.progress import Progress
 
-from spotify_to_musi import musi, spotify, youtube
+from spotify_to_musi import (
+    log,
+    musi,
+    offload,
+    paths,
+    spotify,
+    spotify_snapshot,
+    tracks_cache,
+    youtube,
+)
 
+if t.TYPE_CHECKING:
+    import os
 
-async def transfer_spotify_to_musi(*, transfer_user_library: bool, extra_playlist_urls: list[str]) -> None:
-    with Progress() as progress:
-        playlists, liked_tracks = await spotify.query_spotify(transfer_user_library, extra_playlist_urls, progress)
-        youtube_playlists, youtube_liked_tracks = await youtube.query_youtube(playlists, liked_tracks, progress)
+    from spotify_to_musi.manifest import TransferJob
+    from spotify_to_musi.typings.core import Playlist, Track
+    from spotify_to_musi.typings.musi import MusiResponse
+    from spotify_to_musi.typings.youtube import YouTubePlaylist, YouTubeTrack
+
+# the video ids of every playlist (and of the liked songs, w/ no playlist id), see `video_ids_snapshot`
+Snapshot = t.FrozenSet[t.Tuple[t.Optional[str], str]]
+
+
+async def transfer_spotify_to_musi(
+    *,
+    transfer_user_library: bool,
+    extra_playlist_urls: list[str],
+    workers: int = 0,
+    from_spotify_snapshot: str | os.PathLike[str] | None = None,
+    save_spotify_snapshot: str | os.PathLike[str] | None = None,
+    save_for_offline: bool = False,
+    force_upload: bool = False,
+    max_backup_size: int | None = None,
+) -> None:
+    """
+    Transfer the user's library and/or playlists from Spotify,
+    or the songs of a Spotify snapshot (w/o any Spotify API calls) if `from_spotify_snapshot` is provided.
+    `save_for_offline` saves the songs to the data directory as well, for `transfer_offline`.
+    `force_upload` uploads the backup even if an identical one was already uploaded.
+    `max_backup_size` (in bytes) splits the playlists across several backups of about that size at most.
+    """
+    with Progress(disable=log.is_quiet()) as progress, offload.executor(workers):
+        if from_spotify_snapshot:
+            snapshot = await spotify_snapshot.load_snapshot(from_spotify_snapshot)
+        else:
+            playlists, liked_tracks = await spotify.query_spotify(transfer_user_library, extra_playlist_urls, progress)
+            snapshot = spotify_snapshot.SpotifySnapshot(playlists, liked_tracks, transfer_user_library)
+
+        if save_for_offline:
+            await spotify_snapshot.save_snapshot(paths.spotify_snapshot_path(), snapshot)
+        if save_spotify_snapshot:
+            await spotify_snapshot.save_snapshot(save_spotify_snapshot, snapshot)
+
+        playlists, liked_tracks, transfer_user_library = snapshot
+
+        try:
+            youtube_playlists, youtube_liked_tracks = await youtube.query_youtube(playlists, liked_tracks, progress)
+        finally:
+            await tracks_cache.close()
+
+        # every stage is a copy of the same tracks, so each one is released once the next one is built from it
+        del snapshot, playlists, liked_tracks
         musi_playlists, musi_library = musi.convert_from_youtube(youtube_playlists, youtube_liked_tracks)
+        del youtube_playlists, youtube_liked_tracks
+
+        if max_backup_size is None:
+            backup = await musi.upload_to_musi(musi_playlists, musi_library, force=force_upload)
+        else:
+            shards = musi.shard_backup(musi_playlists, musi_library, max_size=max_backup_size)
+            async with httpx.AsyncClient() as client:
+                backups = await musi.upload_shards(shards, client, force=force_upload)
+
+    log.print_summary()
+    if max_backup_size is None:
+        print_musi_code(backup, transfer_user_library=transfer_user_library)
+    else:
+        print_shard_codes(shards, backups, transfer_user_library=transfer_user_library)
+
+
+async def transfer_offline(from_spotify_snapshot: str | os.PathLike[str] | None = None) -> None:
+    """
+    Build the Musi backup of the last transfer (or of a Spotify snapshot) w/o any network access:
+    from the Spotify snapshot and the cache, w/o searching YouTube Music (or uploading to Musi).
+    Tracks that aren't cached are reported as misses, and the backup is written to the data directory.
+    """
+    playlists, liked_tracks, transfer_user_library = await spotify_snapshot.load_snapshot(
+        from_spotify_snapshot or paths.spotify_snapshot_path()
+    )
+
+    tracks: list[Track] = list(liked_tracks)
+    for playlist in playlists:
+        tracks.extend(playlist.tracks)
+
+    try:
+        misses = await youtube.match_tracks_offline(tracks)
+    finally:
+        await tracks_cache.close()
+
+    youtube_playlists, youtube_liked_tracks = await youtube.convert_to_youtube(playlists, liked_tracks)
+    musi_playlists, musi_library = musi.convert_from_youtube(youtube_playlists, youtube_liked_tracks)
+    backup = musi.build_backup(musi_playlists, musi_library)
+
+    backup_path = paths.offline_backup_path()
+    # the payload is already JSON, so it's written as is
+    backup_path.write_bytes(
+        b"".join((b'{"uuid": ', json.dumps(str(backup.uuid)).encode(), b', "data": ', backup.payload, b"}"))
+    )
+
+    log.print_summary()
+    total = len(set(tracks))
+    rich.print(
+        f"[bold][dark_orange3]OFFLINE:[/dark_orange3] [white]{total - len(misses)}[/white] of [white]{total}[/white] "
+        f"tracks matched from the cache, [white]{len(misses)}[/white] misses.[/bold]"
+    )
+    import_style = "OVERWRITE" if transfer_user_library else "MERGE"
+    rich.print(f"[bold][dark_orange3]MUSI BACKUP:[/dark_orange3] [white]{backup_path}[/white][/bold]")
+    rich.print(f"[bold][dark_orange3]MUSI IMPORT:[/dark_orange3]: [white]{import_style}[/white][/bold]")
+
+
+async def transfer_jobs(
+    jobs: t.Sequence[TransferJob],
+    *,
+    workers: int = 0,
+    force_upload: bool = False,
+    max_concurrent_uploads: int = musi.MAX_CONCURRENT_UPLOADS,
+) -> None:
+    """
+    Run many transfer jobs in one run, uploading one Musi backup per job, at most `max_concurrent_uploads` at a time.
+    The jobs share the cache, the worker pool and the HTTP clients,
+    and a track that's in several jobs is only searched once.
+    """
+    loaded_jobs: list[tuple[TransferJob, tuple[Playlist, ...], tuple[Track, ...]]] = []
+
+    with Progress(disable=log.is_quiet()) as progress, offload.executor(workers):
+        # the spotify client is logged in to one account at a time, so jobs are loaded from spotify one by one
+        for job in jobs:
+            if not await spotify.use_account(job.spotify_credentials):
+                log.skipping(text=f"[white]{job.name}[/white]", reason="Spotify not authorized.")
+                continue
+
+            playlists, liked_tracks = await spotify.query_spotify(job.user, job.playlists, progress)
+            loaded_jobs.append((job, playlists, liked_tracks))
 
-        backup = await musi.upload_to_musi(musi_playlists, musi_library)
+        if not loaded_jobs:
+            log.print_summary()
+            return
 
+        tracks: list[Track] = []
+        for _, playlists, liked_tracks in loaded_jobs:
+            tracks.extend(liked_tracks)
+            for playlist in playlists:
+                tracks.extend(playlist.tracks)
+
+        try:
+            await youtube.match_tracks(tracks, progress)
+        finally:
+            await tracks_cache.close()
+
+        # a job's backup is only built once it's its turn to upload, so a large manifest isn't all in memory at once
+        semaphore = asyncio.Semaphore(max_concurrent_uploads)
+
+        async def upload(playlists: tuple[Playlist, ...], liked_tracks: tuple[Track, ...]) -> MusiResponse:
+            async with semaphore:
+                return await upload_job(playlists, liked_tracks, client, force=force_upload)
+
+        async with httpx.AsyncClient() as client:
+            backups: list[MusiResponse] = await asyncio.gather(
+                *(upload(playlists, liked_tracks) for _, playlists, liked_tracks in loaded_jobs)
+            )
+
+    log.print_summary()
+    for index, (job, _, _) in enumerate(loaded_jobs):
+        backup = backups[index]
+        rich.print(f"[bold][dark_orange3]JOB:[/dark_orange3] [white]{job.name}[/white][/bold]")
+        print_musi_code(backup, transfer_user_library=job.user)
+
+
+async def upload_job(
+    playlists: tuple[Playlist, ...],
+    liked_tracks: tuple[Track, ...],
+    client: httpx.AsyncClient,
+    *,
+    force: bool = False,
+) -> MusiResponse:
+    youtube_playlists, youtube_liked_tracks = await youtube.convert_to_youtube(playlists, liked_tracks)
+    musi_playlists, musi_library = musi.convert_from_youtube(youtube_playlists, youtube_liked_tracks)
+    del youtube_playlists, youtube_liked_tracks
+    return await musi.upload_to_musi(musi_playlists, musi_library, client=client, force=force)
+
+
+def video_ids_snapshot(
+    youtube_playlists: t.Iterable[YouTubePlaylist], youtube_liked_tracks: t.Iterable[YouTubeTrack]
+) -> Snapshot:
+    snapshot: set[tuple[str | None, str]] = {(None, track.video_id) for track in youtube_liked_tracks}
+    for youtube_playlist in youtube_playlists:
+        snapshot.update((youtube_playlist.id, track.video_id) for track in youtube_playlist.tracks)
+    return frozenset(snapshot)
+
+
+async def sync_spotify_to_musi(
+    *,
+    transfer_user_library: bool,
+    extra_playlist_urls: list[str],
+    client: httpx.AsyncClient,
+    last_snapshot: Snapshot | None,
+) -> Snapshot:
+    """
+    Check Spotify for changes and upload a new Musi backup,
+    only if the video ids are different from the ones of `last_snapshot`.
+    """
+    with Progress(disable=log.is_quiet()) as progress:
+        playlists, liked_tracks = await spotify.query_spotify(transfer_user_library, extra_playlist_urls, progress)
+        youtube_playlists, youtube_liked_tracks = await youtube.query_youtube(
+            playlists, liked_tracks, progress, client
+        )
+
+    log.print_summary()
+    snapshot = video_ids_snapshot(youtube_playlists, youtube_liked_tracks)
+    if snapshot == last_snapshot:
+        log.note(event="unchanged", text="No changes since the last upload.")
+        return snapshot
+
+    backup = await musi.upload_to_musi(
+        *musi.convert_from_youtube(youtube_playlists, youtube_liked_tracks), client=client
+    )
+
+    print_musi_code(backup, transfer_user_library=transfer_user_library)
+    return snapshot
+
+
+async def watch_spotify_to_musi(
+    *, transfer_user_library: bool, extra_playlist_urls: list[str], interval: float, workers: int = 0
+) -> None:
+    """
+    Sync every `interval` seconds until interrupted.
+    The cache, the worker pool and the HTTP client stay warm between syncs,
+    so a sync only searches for tracks that were added since the last one.
+    """
+    snapshot: Snapshot | None = None
+
+    with offload.executor(workers):
+        async with youtube.create_search_client() as client:
+            try:
+                while True:
+                    try:
+                        snapshot = await sync_spotify_to_musi(
+                            transfer_user_library=transfer_user_library,
+                            extra_playlist_urls=extra_playlist_urls,
+                            client=client,
+                            last_snapshot=snapshot,
+                        )
+                    # a failed sync (ie. the network is down, or Musi sent back garbage) is retried on the next one,
+                    # the daemon only stops when interrupted
+                    except Exception as exc:
+                        log.error(text=f"Sync failed. {type(exc).__name__}: {escape(str(exc))}")
+
+                    next_sync = time.time() + interval
+                    log.note(
+                        event="next_sync",
+                        text=f"Next sync at [white]{time.strftime('%H:%M', time.localtime(next_sync))}[/white].",
+                        at=next_sync,
+                    )
+                    await asyncio.sleep(interval)
+            finally:
+                await tracks_cache.close()
+
+
+def print_musi_code(backup: MusiResponse, *, transfer_user_library: bool) -> None:
     import_style = "OVERWRITE" if transfer_user_library else "MERGE"
     rich.print(f"[bold][dark_orange3]MUSI CODE:[/dark_orange3] [white]{backup.code}[/white][/bold]")
     rich.print(f"[bold][dark_orange3]MUSI IMPORT:[/dark_orange3]: [white]{import_style}[/white][/bold]")
+
+
+def print_shard_codes(
+    shards: t.Sequence[musi.BackupShard], backups: t.Sequence[MusiResponse], *, transfer_user_library: bool
+) -> None:
+    """
+    Print the code of every backup w/ the playlists it contains.
+    Only the first backup has the library, so it's the one imported first (w/ OVERWRITE for the user's library).
+    """
+    for index, (musi_playlists, musi_library) in enumerate(shards):
+        backup = backups[index]
+        names = [musi_playlist.name for musi_playlist in musi_playlists]
+        if musi_library.tracks:
+            names.insert(0, "Liked Songs")
+
+        rich.print(
+            f"[bold][dark_orange3]BACKUP {index + 1}/{len(shards)}:[/dark_orange3] "
+            f"[white]{', '.join(names)}[/white][/bold]"
+        )
+        print_musi_code(backup, transfer_user_library=transfer_user_library and index == 0)
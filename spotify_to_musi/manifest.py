@@ -0,0 +1,81 @@
+"""
+Manifests of transfer jobs, to transfer many users' libraries and playlists in a single run.
+
+```toml
+[[jobs]]
+name = "alice"
+user = true
+spotify_credentials = "alice/spotify-credentials.json"  # relative to the manifest
+
+[[jobs]]
+name = "workout mixes"
+playlists = ["https://open.spotify.com/playlist/37i9dQZF1DX76Wlfdnj7AP"]
+```
+"""
+from __future__ import annotations
+
+import sys
+import typing as t
+from pathlib import Path
+
+import pydantic
+from pydantic import BaseModel, field_validator, model_validator
+
+from spotify_to_musi.exceptions import ManifestError
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+
+class TransferJob(BaseModel):
+    name: str
+    # transfer liked songs and playlists of the job's account
+    user: bool = False
+    playlists: t.List[str] = []
+    # credentials of the job's Spotify account, defaults to the ones from `setup`
+    spotify_credentials: t.Optional[Path] = None
+
+    @model_validator(mode="after")
+    def check_has_something_to_transfer(self: TransferJob) -> TransferJob:
+        if not self.user and not self.playlists:
+            msg = "no playlist(s) nor the user's library were specified"
+            raise ValueError(msg)
+        return self
+
+
+class Manifest(BaseModel):
+    jobs: t.List[TransferJob]
+
+    @field_validator("jobs")
+    @classmethod
+    def check_unique_names(cls: type[Manifest], jobs: list[TransferJob]) -> list[TransferJob]:
+        names = [job.name for job in jobs]
+        if len(names) != len(set(names)):
+            msg = "job names must be unique"
+            raise ValueError(msg)
+        return jobs
+
+
+def load_manifest(path: str | Path) -> list[TransferJob]:
+    """
+    Load the transfer jobs of a TOML manifest.
+    Raises `ManifestError` if the manifest can't be parsed or is invalid.
+    """
+    path = Path(path)
+
+    try:
+        manifest = Manifest(**tomllib.loads(path.read_text(encoding="utf-8")))
+    except (OSError, tomllib.TOMLDecodeError) as exc:
+        raise ManifestError(str(exc)) from exc
+    except pydantic.ValidationError as exc:
+        reasons = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+        raise ManifestError(reasons) from exc
+
+    jobs = manifest.jobs
+    for job in jobs:
+        if job.spotify_credentials is not None:
+            job.spotify_credentials = path.parent / job.spotify_credentials
+
+    return jobs
@@ -0,0 +1,240 @@
+"""
+Offline evaluation of how YouTube Music results are matched to tracks, against a corpus of recorded searches.
+
+A corpus is a JSON lines file, w/ a line per track:
+{"track": <the track>, "expected_video_ids": [...], "response": <the raw YouTube Music search response>}
+An empty `expected_video_ids` means no result is right, so the track should be skipped.
+Lines w/o a response are searched for (and recorded) w/ `record_responses`.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import time
+import typing as t
+
+import aiofiles
+
+from spotify_to_musi import ytmusic
+from spotify_to_musi.exceptions import CorpusFormatError, YouTubeMusicSearchError
+from spotify_to_musi.typings.core import Track
+from spotify_to_musi.youtube import (
+    MATCH_THRESHOLD,
+    youtube_music_search_options,
+    youtube_result_score,
+)
+
+if t.TYPE_CHECKING:
+    import os
+
+    import httpx
+
+    from spotify_to_musi.typings.youtube import YouTubeMusicSearch
+
+# the edges of the top score buckets, finer around the threshold
+SCORE_BUCKET_EDGES = (0.5, 0.75, 0.9, MATCH_THRESHOLD, 1.1, 1.25, 1.5, 2)
+
+Outcome = t.Literal["matched", "mismatched", "missed", "skipped"]
+
+
+class EvalCase(t.NamedTuple):
+    track: Track
+    expected_video_ids: tuple[str, ...]
+    # the raw search response, None until it's recorded
+    response: bytes | None
+
+
+class EvalResult(t.NamedTuple):
+    case: EvalCase
+    # the best scoring result
+    video_id: str | None
+    score: float
+    outcome: Outcome
+
+    @property
+    def top_pick_correct(self: EvalResult) -> bool:
+        """
+        Whether the best scoring result is the right one (or there's none, when there shouldn't be), threshold aside.
+        """
+        if not self.case.expected_video_ids:
+            return self.video_id is None
+        return self.video_id in self.case.expected_video_ids
+
+
+class ScoreBucket(t.NamedTuple):
+    # None when unbounded
+    low: float | None
+    high: float | None
+    correct: int
+    incorrect: int
+
+
+class EvalReport(t.NamedTuple):
+    results: tuple[EvalResult, ...]
+    buckets: tuple[ScoreBucket, ...]
+    # the time it took to parse every response once
+    parse_seconds: float
+    # the time it took to score every response `repeat` times
+    score_seconds: float
+    repeat: int
+    # the number of results scored per repeat
+    results_scored: int
+
+    def count(self: EvalReport, outcome: Outcome) -> int:
+        return sum(1 for result in self.results if result.outcome == outcome)
+
+    @property
+    def accuracy(self: EvalReport) -> float:
+        """
+        The share of tracks that were matched to the right result, or rightly skipped.
+        """
+        if not self.results:
+            return 0
+        return (self.count("matched") + self.count("skipped")) / len(self.results)
+
+    @property
+    def tracks_per_second(self: EvalReport) -> float:
+        if not self.score_seconds:
+            return 0
+        return len(self.results) * self.repeat / self.score_seconds
+
+    @property
+    def results_per_second(self: EvalReport) -> float:
+        if not self.score_seconds:
+            return 0
+        return self.results_scored * self.repeat / self.score_seconds
+
+
+def decode_case(line: str) -> EvalCase:
+    data = json.loads(line)
+    response = data.get("response")
+    return EvalCase(
+        track=Track.from_dict(data["track"]),
+        expected_video_ids=tuple(data["expected_video_ids"]),
+        response=json.dumps(response).encode() if response is not None else None,
+    )
+
+
+def encode_case(case: EvalCase) -> str:
+    document: dict[str, t.Any] = {"track": case.track.as_dict(), "expected_video_ids": list(case.expected_video_ids)}
+    if case.response is not None:
+        document["response"] = json.loads(case.response)
+    return json.dumps(document)
+
+
+async def load_corpus(path: str | os.PathLike[str]) -> list[EvalCase]:
+    """
+    Load a corpus of recorded searches.
+    Raises `CorpusFormatError` if the file can't be read.
+    """
+    cases: list[EvalCase] = []
+    try:
+        async with aiofiles.open(path, "r") as f:
+            line_number = 0
+            async for line in f:
+                line_number += 1
+                if not line.strip():
+                    continue
+                try:
+                    cases.append(decode_case(line))
+                except (KeyError, TypeError, ValueError) as exc:
+                    reason = f"line {line_number} is invalid"
+                    raise CorpusFormatError(reason) from exc
+    except OSError as exc:
+        raise CorpusFormatError(str(exc)) from exc
+
+    return cases
+
+
+async def save_corpus(path: str | os.PathLike[str], cases: t.Iterable[EvalCase]) -> None:
+    async with aiofiles.open(path, "w") as f:
+        await f.write("".join(encode_case(case) + "\n" for case in cases))
+
+
+async def record_responses(cases: list[EvalCase], client: httpx.AsyncClient) -> int:
+    """
+    Search YouTube Music for the cases w/o a recorded response, in place.
+    Returns the number of responses recorded.
+    """
+    recorded = 0
+    for index, case in enumerate(cases):
+        if case.response is not None:
+            continue
+        response = await ytmusic.search_music_raw(case.track.query, client)
+        cases[index] = case._replace(response=response)
+        recorded += 1
+    return recorded
+
+
+def score_buckets(results: t.Iterable[EvalResult]) -> tuple[ScoreBucket, ...]:
+    """
+    Count the top scores per bucket, split by whether the top pick is right.
+    A score on an edge is in the bucket above it, ie. a score of exactly the threshold is in the first matched bucket.
+    """
+    correct = [0] * (len(SCORE_BUCKET_EDGES) + 1)
+    incorrect = [0] * (len(SCORE_BUCKET_EDGES) + 1)
+    for result in results:
+        index = bisect.bisect_right(SCORE_BUCKET_EDGES, result.score)
+        if result.top_pick_correct:
+            correct[index] += 1
+        else:
+            incorrect[index] += 1
+
+    lows = (None, *SCORE_BUCKET_EDGES)
+    highs = (*SCORE_BUCKET_EDGES, None)
+    return tuple(ScoreBucket(lows[i], highs[i], correct[i], incorrect[i]) for i in range(len(lows)))
+
+
+def evaluate(cases: t.Sequence[EvalCase], repeat: int = 1) -> EvalReport:
+    """
+    Replay the recorded responses through the matcher, like a transfer would (see `best_youtube_music_result`).
+    Scoring is timed on its own and repeated `repeat` times, so the throughput isn't skewed by parsing.
+    """
+    # every case w/ its parsed response
+    parsed: list[tuple[EvalCase, YouTubeMusicSearch | None]] = []
+    start = time.perf_counter()
+    for case in cases:
+        if case.response is None:
+            reason = f"no recorded response for {case.track.query!r}"
+            raise CorpusFormatError(reason)
+        try:
+            parsed.append((case, ytmusic.parse_search_response(case.response)))
+        except YouTubeMusicSearchError as exc:
+            reason = f"the response for {case.track.query!r} is an error"
+            raise CorpusFormatError(reason) from exc
+    parse_seconds = time.perf_counter() - start
+
+    results: list[EvalResult] = []
+    results_scored = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results.clear()
+        results_scored = 0
+        for case, search in parsed:
+            options = youtube_music_search_options(case.track, search)
+            results_scored += len(options)
+            if options:
+                results.append(result_of(case, options[0].video_id, youtube_result_score(options[0], case.track)))
+            else:
+                results.append(result_of(case, None, 0))
+    score_seconds = time.perf_counter() - start
+
+    return EvalReport(
+        results=tuple(results),
+        buckets=score_buckets(results),
+        parse_seconds=parse_seconds,
+        score_seconds=score_seconds,
+        repeat=repeat,
+        results_scored=results_scored,
+    )
+
+
+def result_of(case: EvalCase, video_id: str | None, score: float) -> EvalResult:
+    outcome: Outcome
+    if video_id is None or score < MATCH_THRESHOLD:
+        outcome = "missed" if case.expected_video_ids else "skipped"
+    elif video_id in case.expected_video_ids:
+        outcome = "matched"
+    else:
+        outcome = "mismatched"
+    return EvalResult(case, video_id, score, outcome)
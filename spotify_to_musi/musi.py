@@ -1,20 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import json
+import operator
 import typing as t
 import uuid
 
 import httpx
 import pydantic.error_wrappers
 import pydantic.json
-import rich
+from rich.markup import escape
 
+from spotify_to_musi import backup_ledger, log, musi_archive
 from spotify_to_musi.typings.musi import (
+    MusiBackup,
     MusiLibrary,
-    MusiLibraryDict,
     MusiPlaylist,
-    MusiPlaylistDict,
     MusiResponse,
     MusiTrack,
     MusiVideo,
@@ -24,23 +26,44 @@ from spotify_to_musi.typings.musi import (
 if t.TYPE_CHECKING:
     from spotify_to_musi.typings.youtube import YouTubePlaylist, YouTubeTrack
 
+# a backup's playlists (and library), see `shard_backup`
+BackupShard = t.Tuple[t.Tuple[MusiPlaylist, ...], MusiLibrary]
+
+# about how many bytes a track takes up in a payload, besides its name, creator and video id:
+# its item in a playlist, and the rest of its video in playlist_items
+TRACK_SIZE_OVERHEAD = 150
+MAX_CONCURRENT_UPLOADS = 3
+
 
 def convert_from_youtube(
     youtube_playlists: t.Iterable[YouTubePlaylist],
     youtube_liked_tracks: t.Iterable[YouTubeTrack],
 ) -> tuple[tuple[MusiPlaylist, ...], MusiLibrary]:
-    musi_playlists = convert_playlists_to_musi_playlists(youtube_playlists)
-    musi_library = covert_youtube_tracks_to_musi_library(youtube_liked_tracks)
+    # a track that's in several playlists (and the liked songs) is converted once, and shared
+    musi_tracks: dict[YouTubeTrack, MusiTrack] = {}
+    musi_playlists = convert_playlists_to_musi_playlists(youtube_playlists, musi_tracks)
+    musi_library = covert_youtube_tracks_to_musi_library(youtube_liked_tracks, musi_tracks)
 
     return musi_playlists, musi_library
 
 
 def covert_youtube_tracks_to_musi_tracks(
     youtube_tracks: t.Iterable[YouTubeTrack],
+    converted: dict[YouTubeTrack, MusiTrack] | None = None,
 ) -> tuple[MusiTrack, ...]:
+    """
+    `converted` is used to reuse the MusiTrack of a YouTube track that was already converted.
+    """
+    if converted is None:
+        converted = {}
     musi_tracks: list[MusiTrack] = []
 
     for youtube_track in youtube_tracks:
+        musi_track = converted.get(youtube_track)
+        if musi_track is not None:
+            musi_tracks.append(musi_track)
+            continue
+
         # a little verbose
         musi_track = MusiTrack(
             name=youtube_track.name,
@@ -48,11 +71,13 @@ def covert_youtube_tracks_to_musi_tracks(
             artists=youtube_track.artists,
             album_name=youtube_track.album_name,
             is_explicit=youtube_track.is_explicit,
+            isrc=youtube_track.isrc,
             youtube_name=youtube_track.youtube_name,
             youtube_duration=youtube_track.youtube_duration,
             youtube_artists=youtube_track.youtube_artists,
             video_id=youtube_track.video_id,
         )
+        converted[youtube_track] = musi_track
         musi_tracks.append(musi_track)
 
     return tuple(musi_tracks)
@@ -60,18 +85,22 @@ def covert_youtube_tracks_to_musi_tracks(
 
 def covert_youtube_tracks_to_musi_library(
     youtube_tracks: t.Iterable[YouTubeTrack],
+    converted: dict[YouTubeTrack, MusiTrack] | None = None,
 ) -> MusiLibrary:
-    musi_tracks = covert_youtube_tracks_to_musi_tracks(youtube_tracks)
+    musi_tracks = covert_youtube_tracks_to_musi_tracks(youtube_tracks, converted)
     return MusiLibrary(tracks=musi_tracks)
 
 
 def convert_playlists_to_musi_playlists(
     youtube_playlists: t.Iterable[YouTubePlaylist],
+    converted: dict[YouTubeTrack, MusiTrack] | None = None,
 ) -> tuple[MusiPlaylist, ...]:
+    if converted is None:
+        converted = {}
     musi_playlists: list[MusiPlaylist] = []
 
     for youtube_playlist in youtube_playlists:
-        musi_tracks = covert_youtube_tracks_to_musi_tracks(youtube_playlist.tracks)
+        musi_tracks = covert_youtube_tracks_to_musi_tracks(youtube_playlist.tracks, converted)
         musi_playlist = MusiPlaylist(
             name=youtube_playlist.name,
             tracks=musi_tracks,
@@ -82,88 +111,270 @@ def convert_playlists_to_musi_playlists(
     return tuple(musi_playlists)
 
 
-def generate_musi_uuid(musi_videos: list[MusiVideo]) -> uuid.UUID:
+def encode_musi_video(musi_video_dict: MusiVideoDict) -> tuple[str, bytes]:
     """
-    Generate a deterministic UUID based on the video IDs of the provided MusiVideo-s.
+    Encode a video for the uuid of a backup (w/o its created date), returns its sort key and its encoding.
     """
-    musi_video_dicts = [musi_video.dict(exclude={"created_date": True}) for musi_video in musi_videos]
-    musi_video_dicts.sort(key=lambda item: item["video_creator"])
+    uuid_dict = {key: value for key, value in musi_video_dict.items() if key != "created_date"}
+    return musi_video_dict["video_creator"], json.dumps(uuid_dict, default=pydantic.json.pydantic_encoder).encode()
+
 
-    musi_videos_json = json.dumps(musi_video_dicts, default=pydantic.json.pydantic_encoder)
-    musi_videos_json_bytes = musi_videos_json.encode("utf-8")
+def hash_musi_videos(encoded_videos: list[tuple[str, bytes]]) -> uuid.UUID:
+    """
+    Generate a deterministic UUID from videos encoded w/ `encode_musi_video`, sorts `encoded_videos` in place.
+    Hashed one video at a time, which is the same as hashing the JSON list of them.
+    """
+    # by the creator only, like a sort of the video dicts (the sort is stable, so the encoding never breaks a tie)
+    encoded_videos.sort(key=operator.itemgetter(0))
 
     # md5 is not a very secure hash function,
     # but it's not hashing sensitive data here, so it's okay.
-    md5_hash = hashlib.md5(musi_videos_json_bytes)  # noqa: S324
-    md5_hash_hexdigest = md5_hash.hexdigest()
+    md5_hash = hashlib.md5(b"[")  # noqa: S324
+    separator = b""
+    for _, encoded_video in encoded_videos:
+        md5_hash.update(separator)
+        md5_hash.update(encoded_video)
+        separator = b", "
+    md5_hash.update(b"]")
 
-    return uuid.uuid3(uuid.NAMESPACE_OID, md5_hash_hexdigest)
+    return uuid.uuid3(uuid.NAMESPACE_OID, md5_hash.hexdigest())
 
 
-async def upload_to_musi(
+def generate_musi_uuid(musi_videos: list[MusiVideo]) -> uuid.UUID:
+    """
+    Generate a deterministic UUID based on the video IDs of the provided MusiVideo-s.
+    """
+    return hash_musi_videos([encode_musi_video(musi_video.dict()) for musi_video in musi_videos])  # type: ignore
+
+
+def build_backup(
     musi_playlists: t.Iterable[MusiPlaylist],
     musi_library: MusiLibrary,
-) -> MusiResponse:
-    # sourcery skip: for-append-to-extend, list-comprehension
-    musi_videos: list[MusiVideo] = []
-
-    for musi_track in musi_library.tracks:
-        musi_videos.append(musi_track.musi_video())
-    for musi_playlist in musi_playlists:
-        for musi_track in musi_playlist.tracks:
-            musi_videos.append(musi_track.musi_video())
+) -> MusiBackup:
+    """
+    Build the uuid, the JSON payload and the layout of a Musi backup, in a single pass over the tracks.
+    The payload is the same as json.dumps of a dict of the library, the playlist items and the playlists.
+    """
+    # a track is encoded once (for the uuid, and its video id), and listed for the uuid once per occurrence
+    encoded_tracks: dict[MusiTrack, tuple[tuple[str, bytes], bytes]] = {}
+    encoded_videos: list[tuple[str, bytes]] = []
+    musi_video_ids: set[str] = set()
 
-    musi_library_dict: MusiLibraryDict = musi_library.dict()
-    musi_playlist_dicts: list[MusiPlaylistDict] = [musi_item.dict() for musi_item in musi_playlists]  # type: ignore
-    musi_video_dicts: list[MusiVideoDict] = []
+    # the payload's parts, which are written to in the order the tracks are walked
+    library_buffer = bytearray()
+    playlist_items_buffer = bytearray()
+    playlists_buffer = bytearray()
+    layout_hash = hashlib.md5()  # noqa: S324
+
+    def write_items(buffer: bytearray, name: str, ciu: str | None, musi_tracks: t.Iterable[MusiTrack]) -> None:
+        layout_hash.update(b"\n%s %s:" % (json.dumps(name).encode(), json.dumps(ciu).encode()))
+        buffer += b"["
+        for index, musi_track in enumerate(musi_tracks):
+            encoded_track = encoded_tracks.get(musi_track)
+            if encoded_track is None:
+                musi_video_dict: MusiVideoDict = {
+                    "video_id": musi_track.video_id,
+                    "video_name": musi_track.name,
+                    "video_creator": musi_track.artists[0].name,
+                    "video_duration": musi_track.youtube_duration,
+                    "created_date": musi_track.created_date,
+                }
+                encoded_track = encoded_tracks[musi_track] = (
+                    encode_musi_video(musi_video_dict),
+                    json.dumps(musi_track.video_id).encode(),
+                )
+
+                if musi_track.video_id not in musi_video_ids:
+                    if musi_video_ids:
+                        playlist_items_buffer.extend(b", ")
+                    playlist_items_buffer.extend(json.dumps(musi_video_dict).encode())
+                    musi_video_ids.add(musi_track.video_id)
+
+            encoded_video, video_id_json = encoded_track
+            encoded_videos.append(encoded_video)
+            layout_hash.update(video_id_json)
+
+            # a MusiItemDict
+            if index:
+                buffer += b", "
+            buffer += b'{"cd": %d, "pos": %d, "video_id": %s}' % (int(musi_track.created_date), index, video_id_json)
+        buffer += b"]"
+
+    def write_field(buffer: bytearray, name: str, value: t.Any) -> None:
+        buffer += b', "%s": %s' % (name.encode(), json.dumps(value).encode())
+
+    # a MusiLibraryDict
+    library_buffer += b'{"ot": %s, "items": ' % json.dumps(musi_library.ot).encode()
+    write_items(library_buffer, musi_library.name, None, musi_library.tracks)
+    write_field(library_buffer, "name", musi_library.name)
+    write_field(library_buffer, "date", musi_library.date)
+    library_buffer += b"}"
+
+    for index, musi_playlist in enumerate(musi_playlists):
+        # a MusiPlaylistDict
+        if index:
+            playlists_buffer += b", "
+        playlists_buffer += b'{"ot": %s, "items": ' % json.dumps(musi_playlist.ot).encode()
+        write_items(playlists_buffer, musi_playlist.name, musi_playlist.ciu, musi_playlist.tracks)
+        write_field(playlists_buffer, "name", musi_playlist.name)
+        write_field(playlists_buffer, "type", musi_playlist.type)
+        write_field(playlists_buffer, "date", musi_playlist.date)
+        if musi_playlist.ciu:
+            write_field(playlists_buffer, "ciu", musi_playlist.ciu)
+        playlists_buffer += b"}"
+
+    musi_uuid = hash_musi_videos(encoded_videos)
+    payload = b"".join(
+        (
+            b'{"library": ',
+            library_buffer,
+            b', "playlist_items": [',
+            playlist_items_buffer,
+            b'], "playlists": [',
+            playlists_buffer,
+            b"]}",
+        )
+    )
+    return MusiBackup(musi_uuid, payload, layout_hash.hexdigest())
 
-    musi_video_ids: set[str] = set()
-    for musi_video in musi_videos:
-        if musi_video.video_id not in musi_video_ids:
-            musi_video_dicts.append(musi_video.dict())  # type: ignore
-            musi_video_ids.add(musi_video.video_id)
-
-    musi_uuid = generate_musi_uuid(musi_videos)
-    payload = {
-        "library": musi_library_dict,
-        "playlist_items": musi_video_dicts,
-        "playlists": musi_playlist_dicts,
-    }
 
+def encode_backup(musi_uuid: uuid.UUID, payload: bytes) -> tuple[str, bytes]:
+    """
+    Encode a backup as multipart form data, returns the boundary and the content.
+    """
     boundary_str = f"Boundary+Musi{musi_uuid}"
     boundary = f"--{boundary_str}".encode()
 
+    # hack because httpx doesn't appear to support custom boundaries like requests does.
+    # joined at once, as the payload can be tens of megabytes, and each `+` would copy it
+    content = b"".join(
+        (
+            boundary,
+            b"\n",
+            b'Content-Disposition: form-data; name="data"',
+            b"\n\n",
+            payload,
+            b"\n",
+            boundary,
+            b"\n",
+            b'Content-Disposition: form-data; name="uuid"',
+            b"\n\n",
+            str(musi_uuid).encode(),
+            b"\n",
+            boundary,
+            b"--\n",
+        )
+    )
+    return boundary_str, content
+
+
+async def upload_to_musi(
+    musi_playlists: t.Iterable[MusiPlaylist],
+    musi_library: MusiLibrary,
+    client: httpx.AsyncClient | None = None,
+    *,
+    force: bool = False,
+) -> MusiResponse:
+    """
+    Upload a backup to Musi.
+    `client` is used to share a connection pool between uploads, otherwise a client is created for the upload.
+
+    The code of an identical backup that was already uploaded (see `backup_ledger`) is reused,
+    unless `force` is set. Every backup that made it to Musi is archived (see `musi_archive`),
+    so it can be uploaded again later.
+    """
+    backup = build_backup(musi_playlists, musi_library)
+
+    if not force:
+        code = await backup_ledger.lookup(backup.uuid, backup.layout)
+        if code is not None:
+            await musi_archive.archive_backup(musi_playlists, musi_library, backup)
+            log.note(event="reused", text="Unchanged since it was last uploaded, reusing its code.", code=code)
+            return MusiResponse(code=code, diff=False, success="Reused the code of an identical backup.")
+
+    boundary_str, content = encode_backup(backup.uuid, backup.payload)
+    # only the uuid and layout are needed from here on, the payload is in the encoded content
+    backup = backup._replace(payload=b"")
+
     headers = {
         "Content-Type": f"multipart/form-data; boundary={boundary_str};",
         "User-Agent": "Musi/25691 CFNetwork/1206 Darwin/20.1.0",
     }
 
-    # hack because httpx doesn't appear to support custom boundaries like requests does.
-    content = (
-        boundary
-        + b"\n"
-        + b'Content-Disposition: form-data; name="data"'
-        + b"\n\n"
-        + json.dumps(payload).encode()
-        + b"\n"
-        + boundary
-        + b"\n"
-        + b'Content-Disposition: form-data; name="uuid"'
-        + b"\n\n"
-        + str(musi_uuid).encode()
-        + b"\n"
-        + boundary
-        + b"--\n"
-    )
-
-    async with httpx.AsyncClient(headers=headers) as client:
-        url = "https://feelthemusi.com/api/v4/backups/create"
-        resp = await client.post(url, content=content)
+    url = "https://feelthemusi.com/api/v4/backups/create"
+    if client is None:
+        async with httpx.AsyncClient() as new_client:
+            resp = await new_client.post(url, content=content, headers=headers)
+    else:
+        resp = await client.post(url, content=content, headers=headers)
 
     try:
-        backup = MusiResponse(**resp.json())
+        musi_response = MusiResponse(**resp.json())
     except (pydantic.error_wrappers.ValidationError, json.decoder.JSONDecodeError):
-        rich.print(f"[bold red]ERROR:[/bold red] {resp.text}]")
+        log.error(text=escape(resp.text))
         raise
 
-    return backup
+    await backup_ledger.record(backup.uuid, backup.layout, musi_response.code)
+    # archived once uploaded, so a failed upload isn't listed as a backup that can be imported
+    await musi_archive.archive_backup(musi_playlists, musi_library, backup)
+    return musi_response
+
+
+def estimate_tracks_size(musi_tracks: t.Iterable[MusiTrack]) -> int:
+    """
+    Estimate how many bytes the tracks take up in a payload, as if every track was a separate video.
+    """
+    return sum(
+        TRACK_SIZE_OVERHEAD + len(musi_track.name) + len(musi_track.artists[0].name) + 2 * len(musi_track.video_id)
+        for musi_track in musi_tracks
+    )
+
+
+def shard_backup(
+    musi_playlists: t.Iterable[MusiPlaylist],
+    musi_library: MusiLibrary,
+    max_size: int,
+) -> list[BackupShard]:
+    """
+    Split a backup into backups whose payloads are at most about `max_size` bytes each.
+    A playlist (or the library) is never split, so one that's larger than `max_size` gets a backup of its own.
+    The library is in the first backup, the others have an empty library (and are imported w/ MERGE).
+    """
+    shards: list[BackupShard] = []
+    shard_playlists: list[MusiPlaylist] = []
+    shard_library = musi_library
+    shard_size = estimate_tracks_size(musi_library.tracks)
+
+    for musi_playlist in musi_playlists:
+        playlist_size = estimate_tracks_size(musi_playlist.tracks)
+        if shard_size + playlist_size > max_size and (shard_playlists or shard_library.tracks):
+            shards.append((tuple(shard_playlists), shard_library))
+            shard_playlists = []
+            shard_library = MusiLibrary(tracks=())
+            shard_size = 0
+
+        shard_playlists.append(musi_playlist)
+        shard_size += playlist_size
+
+    shards.append((tuple(shard_playlists), shard_library))
+    return shards
+
+
+async def upload_shards(
+    shards: t.Sequence[BackupShard],
+    client: httpx.AsyncClient | None = None,
+    *,
+    force: bool = False,
+    max_concurrent_uploads: int = MAX_CONCURRENT_UPLOADS,
+) -> list[MusiResponse]:
+    """
+    Upload the backups of `shard_backup` concurrently, at most `max_concurrent_uploads` at a time.
+    Returns their responses, in order.
+    """
+    semaphore = asyncio.Semaphore(max_concurrent_uploads)
+
+    async def upload_shard(shard: BackupShard) -> MusiResponse:
+        async with semaphore:
+            return await upload_to_musi(*shard, client, force=force)
+
+    return await asyncio.gather(*(upload_shard(shard) for shard in shards))
@@ -0,0 +1,246 @@
+"""
+A local archive of the backups uploaded to Musi,
+so they can be uploaded again (or compared) w/o loading the songs from Spotify and YouTube again.
+
+The archive is content-addressed: the library and every playlist are stored as separate objects,
+named by the sha256 of their content, so a playlist that didn't change between backups is only stored once.
+Objects are zlib compressed JSON w/o the dates of the backup, which change on every upload.
+An archived backup is a small JSON file that lists its objects.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+import typing as t
+import uuid
+import zlib
+
+import aiofiles
+
+from spotify_to_musi.exceptions import ArchiveError
+from spotify_to_musi.paths import musi_archive_path
+from spotify_to_musi.typings.core import Artist
+from spotify_to_musi.typings.musi import MusiLibrary, MusiPlaylist, MusiTrack
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+    from spotify_to_musi.typings.musi import MusiBackup
+
+# ids can be shortened to a prefix (like git commits), down to this many characters
+MIN_ID_PREFIX = 4
+
+
+class ArchivedBackup(t.NamedTuple):
+    id: str
+    archived_at: float
+    uuid: str
+    layout: str
+    # the object of the library
+    library: str
+    # the names and objects of the playlists
+    playlists: tuple[tuple[str, str], ...]
+
+
+class BackupDiff(t.NamedTuple):
+    added: tuple[str, ...]
+    removed: tuple[str, ...]
+    changed: tuple[str, ...]
+    library_changed: bool
+
+
+def _objects_path() -> pathlib.Path:
+    return musi_archive_path() / "objects"
+
+
+def _backups_path() -> pathlib.Path:
+    return musi_archive_path() / "backups"
+
+
+def _object_path(digest: str) -> pathlib.Path:
+    return _objects_path() / digest[:2] / digest[2:]
+
+
+def encode_object(name: str, cover_image_url: str | None, musi_tracks: t.Iterable[MusiTrack]) -> bytes:
+    """
+    Encode the library or a playlist, w/ what's needed to build its backup again.
+    """
+    videos = [
+        [musi_track.video_id, musi_track.name, musi_track.artists[0].name, musi_track.youtube_duration]
+        for musi_track in musi_tracks
+    ]
+    document = {"name": name, "cover_image_url": cover_image_url, "videos": videos}
+    return json.dumps(document, separators=(",", ":")).encode()
+
+
+async def _write_atomic(path: pathlib.Path, data: bytes) -> None:
+    """
+    Write a file all at once, so an interrupted write never leaves a partial object behind.
+    Concurrent uploads can write the same object, so each write has its own temporary file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    async with aiofiles.open(temp_path, "wb") as f:
+        await f.write(data)
+    os.replace(temp_path, path)
+
+
+async def _store_object(data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    path = _object_path(digest)
+    if not path.is_file():
+        await _write_atomic(path, zlib.compress(data))
+    return digest
+
+
+async def _load_object(digest: str) -> dict[str, t.Any]:
+    try:
+        async with aiofiles.open(_object_path(digest), "rb") as f:
+            return json.loads(zlib.decompress(await f.read()))
+    except (OSError, zlib.error, ValueError) as exc:
+        reason = f"object {digest} is missing or corrupt"
+        raise ArchiveError(reason) from exc
+
+
+async def archive_backup(
+    musi_playlists: t.Iterable[MusiPlaylist], musi_library: MusiLibrary, backup: MusiBackup
+) -> str:
+    """
+    Archive a backup, returns its id.
+    Archiving the same backup again (even w/ other dates) stores nothing new.
+    """
+    library = await _store_object(encode_object(musi_library.name, None, musi_library.tracks))
+    playlists: list[tuple[str, str]] = []
+    for musi_playlist in musi_playlists:
+        digest = await _store_object(encode_object(musi_playlist.name, musi_playlist.ciu, musi_playlist.tracks))
+        playlists.append((musi_playlist.name, digest))
+
+    contents = {"uuid": str(backup.uuid), "layout": backup.layout, "library": library, "playlists": playlists}
+    backup_id = hashlib.sha256(json.dumps(contents, separators=(",", ":")).encode()).hexdigest()
+
+    path = _backups_path() / f"{backup_id}.json"
+    if not path.is_file():
+        await _write_atomic(path, json.dumps({**contents, "archived_at": time.time()}).encode())
+
+    return backup_id
+
+
+async def _read_backup(path: pathlib.Path) -> ArchivedBackup:
+    try:
+        async with aiofiles.open(path, "r") as f:
+            data = json.loads(await f.read())
+        return ArchivedBackup(
+            id=path.stem,
+            archived_at=data["archived_at"],
+            uuid=data["uuid"],
+            layout=data["layout"],
+            library=data["library"],
+            playlists=tuple((name, digest) for name, digest in data["playlists"]),
+        )
+    except (OSError, KeyError, TypeError, ValueError) as exc:
+        reason = f"{path.stem} is corrupt"
+        raise ArchiveError(reason) from exc
+
+
+async def list_backups() -> list[ArchivedBackup]:
+    """
+    Returns the archived backups, oldest first.
+    """
+    backups_path = _backups_path()
+    if not backups_path.is_dir():
+        return []
+
+    backups = [await _read_backup(path) for path in backups_path.glob("*.json")]
+    backups.sort(key=lambda backup: backup.archived_at)
+    return backups
+
+
+async def find_backup(id_prefix: str) -> ArchivedBackup:
+    """
+    Find an archived backup by its id, or a prefix of it.
+    """
+    if len(id_prefix) < MIN_ID_PREFIX:
+        reason = f"an id needs at least {MIN_ID_PREFIX} characters"
+        raise ArchiveError(reason)
+
+    backups_path = _backups_path()
+    paths = list(backups_path.glob(f"{id_prefix}*.json")) if backups_path.is_dir() else []
+    if not paths:
+        reason = f"no backup id starts w/ {id_prefix!r}"
+        raise ArchiveError(reason)
+    if len(paths) > 1:
+        reason = f"several backup ids start w/ {id_prefix!r}"
+        raise ArchiveError(reason)
+
+    return await _read_backup(paths[0])
+
+
+async def restore_backup(archived_backup: ArchivedBackup) -> tuple[tuple[MusiPlaylist, ...], MusiLibrary]:
+    """
+    Build the playlists and library of an archived backup again, w/ new dates.
+    Their backup has the same uuid and layout as the archived one.
+    """
+    musi_tracks: dict[tuple[str, str, str, int], MusiTrack] = {}
+
+    def restore_tracks(videos: list[list[t.Any]]) -> tuple[MusiTrack, ...]:
+        restored: list[MusiTrack] = []
+        for video_id, name, creator, duration in videos:
+            key = (video_id, name, creator, duration)
+            musi_track = musi_tracks.get(key)
+            if musi_track is None:
+                # only the fields that make up a backup are archived
+                artists = (Artist(name=creator),)
+                musi_track = musi_tracks[key] = MusiTrack(
+                    name=name,
+                    duration=duration,
+                    artists=artists,
+                    album_name=None,
+                    is_explicit=None,
+                    youtube_name=name,
+                    youtube_duration=duration,
+                    youtube_artists=artists,
+                    video_id=video_id,
+                )
+            restored.append(musi_track)
+        return tuple(restored)
+
+    try:
+        library = await _load_object(archived_backup.library)
+        musi_library = MusiLibrary(tracks=restore_tracks(library["videos"]))
+
+        musi_playlists: list[MusiPlaylist] = []
+        for _, digest in archived_backup.playlists:
+            playlist = await _load_object(digest)
+            musi_playlists.append(
+                MusiPlaylist(
+                    name=playlist["name"],
+                    tracks=restore_tracks(playlist["videos"]),
+                    cover_image_url=playlist["cover_image_url"],
+                )
+            )
+    except ArchiveError:
+        raise
+    except (KeyError, TypeError, ValueError) as exc:
+        reason = f"{archived_backup.id} is corrupt"
+        raise ArchiveError(reason) from exc
+
+    return tuple(musi_playlists), musi_library
+
+
+def diff_backups(old: ArchivedBackup, new: ArchivedBackup) -> BackupDiff:
+    """
+    Compare the playlists of two archived backups, by name.
+    """
+    old_playlists = dict(old.playlists)
+    new_playlists = dict(new.playlists)
+
+    return BackupDiff(
+        added=tuple(name for name in new_playlists if name not in old_playlists),
+        removed=tuple(name for name in old_playlists if name not in new_playlists),
+        changed=tuple(
+            name for name, digest in new_playlists.items() if name in old_playlists and old_playlists[name] != digest
+        ),
+        library_changed=old.library != new.library,
+    )
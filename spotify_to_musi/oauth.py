@@ -13,7 +13,7 @@ from pyfy import AsyncSpotify, AuthError, ClientCreds
 from sanic import SanicException, response
 from sanic.worker.loader import AppLoader
 
-from spotify_to_musi.paths import SPOTIFY_CREDENTIALS_PATH
+from spotify_to_musi.paths import spotify_credentials_path
 
 ADDRESS = "localhost"
 PORT = 5000
@@ -124,7 +124,7 @@ def attach_endpoints(
         user_creds_json["client_id"] = spotify_client_id
         user_creds_json["client_secret"] = spotify_client_secret
 
-        async with aiofiles.open(SPOTIFY_CREDENTIALS_PATH, "w") as file:
+        async with aiofiles.open(spotify_credentials_path(), "w") as file:
             await file.write(json.dumps(user_creds_json))
 
         await spotify.populate_user_creds()
@@ -0,0 +1,60 @@
+"""Optional offloading of CPU-bound work (parsing & scoring search responses) off of the event loop."""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import multiprocessing
+import sys
+import typing as t
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+T = t.TypeVar("T")
+
+_executor: Executor | None = None
+
+
+def gil_enabled() -> bool:
+    # `sys._is_gil_enabled` only exists on 3.13+, older versions always have the GIL
+    is_gil_enabled: t.Callable[[], bool] | None = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled() if is_gil_enabled else True
+
+
+def create_executor(max_workers: int) -> Executor:
+    if not gil_enabled():
+        # threads run in parallel on free-threaded builds and don't need to pickle anything
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+    # spawn instead of fork, forking a process w/ a running event loop (and its threads) isn't safe
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+@contextlib.contextmanager
+def executor(max_workers: int | None) -> t.Iterator[None]:
+    """
+    Run work submitted through `run` in a pool of `max_workers` workers for the duration of the context.
+    Without any workers (None or 0) the work is run directly on the event loop.
+    """
+    global _executor
+
+    if not max_workers or _executor is not None:
+        yield
+        return
+
+    _executor = create_executor(max_workers)
+    try:
+        yield
+    finally:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def run(func: t.Callable[..., T], *args: t.Any) -> T:
+    """
+    Run `func` in the configured executor.
+    `func` has to be a module level function and `args` have to be picklable.
+    """
+    if _executor is None:
+        return func(*args)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
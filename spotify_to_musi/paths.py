@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 import pathlib
 import sys
 
@@ -28,9 +29,69 @@ def _app_data() -> pathlib.Path:
     raise UnsupportedPlatformError(sys.platform)
 
 
-APP_DATA = _app_data()
+# overrides the default data directory, ie. to keep the cache on a faster disk
+# or to give each worker on a machine its own cache root.
+DATA_DIR_ENV_VAR = "SPOTIFY_TO_MUSI_DATA_DIR"
 
-STM_PATH = APP_DATA / "spotify-to-musi"
-STM_PATH.mkdir(exist_ok=True)
-YOUTUBE_DATA_CACHE_PATH = STM_PATH / "youtube-data-cache.json"
-SPOTIFY_CREDENTIALS_PATH = STM_PATH / "spotify-credentials.json"
+_data_dir: pathlib.Path | None = None
+# the data directory in use, resolved and created the first time it's used
+_stm_path: pathlib.Path | None = None
+
+
+def set_data_dir(path: str | os.PathLike[str] | None) -> None:
+    """
+    Set the directory where the cache and credentials are stored.
+    Takes precedence over the `SPOTIFY_TO_MUSI_DATA_DIR` environment variable.
+    Passing None restores the default behavior.
+    """
+    global _data_dir, _stm_path
+    _data_dir = pathlib.Path(path).expanduser() if path is not None else None
+    _stm_path = None
+
+
+def stm_path() -> pathlib.Path:
+    """
+    Returns the spotify-to-musi data directory,
+    creating it the first time it's used.
+    """
+    global _stm_path
+
+    if _stm_path is not None:
+        return _stm_path
+
+    path = _data_dir
+    if path is None:
+        env_data_dir = os.environ.get(DATA_DIR_ENV_VAR)
+        path = pathlib.Path(env_data_dir).expanduser() if env_data_dir else _app_data() / "spotify-to-musi"
+
+    path.mkdir(parents=True, exist_ok=True)
+    _stm_path = path
+    return path
+
+
+def youtube_data_cache_path() -> pathlib.Path:
+    return stm_path() / "youtube-data-cache.jsonl"
+
+
+def legacy_youtube_data_cache_path() -> pathlib.Path:
+    return stm_path() / "youtube-data-cache.json"
+
+
+def spotify_credentials_path() -> pathlib.Path:
+    return stm_path() / "spotify-credentials.json"
+
+
+def spotify_snapshot_path() -> pathlib.Path:
+    return stm_path() / "spotify-snapshot.bin"
+
+
+def offline_backup_path() -> pathlib.Path:
+    return stm_path() / "musi-backup.json"
+
+
+def musi_ledger_path() -> pathlib.Path:
+    return stm_path() / "musi-backups.jsonl"
+
+
+def musi_archive_path() -> pathlib.Path:
+    return stm_path() / "musi-archive"
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Rate limiter for an API: `rate` calls per second on average, in bursts of up to `burst` calls.
+
+    Calls reserve their turn up front (the bucket can go into debt), so thousands of waiting calls
+    each sleep once, instead of all of them waking up for every token.
+    `pause` holds back every call, ie. for the Retry-After of a 429 response.
+    """
+
+    def __init__(self: TokenBucket, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        # bumped by every pause, reservations made before a pause are made again after it
+        self.generation = 0
+
+    def _refill(self: TokenBucket, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def _reserve(self: TokenBucket) -> float:
+        """
+        Take a token, returns how long to wait (in seconds) until it's actually available.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self: TokenBucket) -> None:
+        while True:
+            generation = self.generation
+            wait = self._reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if generation == self.generation:
+                return
+
+    def pause(self: TokenBucket, seconds: float) -> bool:
+        """
+        Hold back every call for `seconds`.
+        Returns whether this started a new pause (rather than extending or overlapping one).
+        """
+        now = time.monotonic()
+        started = now >= self.paused_until
+
+        self.paused_until = max(self.paused_until, now + seconds)
+        # the bucket's debt is how long it takes to refill, so a pause is a debt that lasts until its end.
+        # calls that were already waiting reserve their turn again (see `generation`), so their debt is dropped
+        self.tokens = -(self.paused_until - now) * self.rate
+        self.updated_at = now
+        self.generation += 1
+
+        return started
@@ -4,30 +4,33 @@ import asyncio
 import math
 import typing as t
 
+import aiohttp
 import pydantic
 import pyfy.excs
-import rich
 from pyfy import AsyncSpotify, ClientCreds
 
+from spotify_to_musi import log
 from spotify_to_musi.commons import (
     SPOTIFY_ID_REGEX,
     load_spotify_credentials,
-    loaded_message,
-    skipping_message,
     spotify_client_credentials_from_file,
     task_description,
 )
+from spotify_to_musi.rate_limit import TokenBucket
 from spotify_to_musi.typings.core import Artist, Playlist, Track
 from spotify_to_musi.typings.spotify import (
     BasicSpotifyPlaylist,
-    SpotifyPlaylist,
     SpotifyResponse,
     SpotifyTrack,
 )
 
 if t.TYPE_CHECKING:
+    from pathlib import Path
+
     from rich.progress import Progress, TaskID
 
+T = t.TypeVar("T")
+
 
 client_creds = ClientCreds(
     redirect_uri="http://localhost:5000/callback/spotify",
@@ -38,14 +41,64 @@ client_creds = ClientCreds(
     ],
 )
 
-spotify = AsyncSpotify(client_creds=client_creds)
+# retries are done by `call` instead of by pyfy, which backs off every request on its own (w/o reading Retry-After)
+spotify = AsyncSpotify(client_creds=client_creds, max_retries=1)
+
+# only the fields that are used are requested, full playlist items are several KB each (available markets, images,
+# album artists, etc.) and would have to be downloaded and parsed. these match the models in `typings.spotify`
+PLAYLIST_FIELDS = "id,name,public,collaborative,description,href,uri,images(url,width,height),tracks(href,total)"
+PLAYLIST_TRACKS_FIELDS = (
+    "items(track(name,duration_ms,explicit,is_local,artists(name),"
+    "album(album_type,name,total_tracks),external_ids(isrc)))"
+)
 
+# every call to the spotify api goes through this limiter (see `call`), however many requests are fanned out at once.
+# spotify's rate limit is over a rolling 30 second window, and isn't documented, so this stays well below it
+rate_limiter = TokenBucket(rate=10, burst=20)
+MAX_RETRIES = 5
+# used when a 429 response doesn't have a (valid) Retry-After header
+DEFAULT_RETRY_AFTER = 5
+
+
+def retry_after(exc: pyfy.excs.ApiError) -> float:
+    headers = getattr(exc.http_response, "headers", None) or {}
+    try:
+        return max(0, float(headers["Retry-After"]))
+    except (KeyError, TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
 
-async def init() -> None:
+
+async def call(func: t.Callable[..., t.Awaitable[T]], *args: t.Any, **kwargs: t.Any) -> T:
+    """
+    Call the spotify api through the rate limiter.
+    A 429 response pauses every call for its Retry-After, and the call is retried (as are connection errors),
+    so a call only completes once, and progress is only advanced once per call.
+    """
+    for attempt in range(MAX_RETRIES):
+        await rate_limiter.acquire()
+        last_attempt = attempt == MAX_RETRIES - 1
+
+        try:
+            return await func(*args, **kwargs)
+        except pyfy.excs.ApiError as exc:
+            if exc.code != 429 or last_attempt:
+                raise
+
+            seconds = retry_after(exc)
+            if rate_limiter.pause(seconds):
+                log.rate_limited(seconds=seconds)
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+            if last_attempt:
+                raise
+
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+async def init(credentials_path: Path | None = None) -> None:
     if spotify.user_creds:
         return
 
-    spotify_creds = await load_spotify_credentials()
+    spotify_creds = await load_spotify_credentials(credentials_path)
 
     if not spotify_creds:
         return
@@ -63,7 +116,22 @@ async def init() -> None:
     user_creds = spotify._user_json_to_object(spotify_creds)
     spotify.user_creds = user_creds
 
-    await spotify.populate_user_creds()
+    await call(spotify.populate_user_creds)
+
+
+async def use_account(credentials_path: Path | None = None) -> bool:
+    """
+    Switch to the account of another credentials file (or of the default one, if None).
+    Returns whether the account is authorized.
+    """
+    spotify.user_creds = None
+    await init(credentials_path)
+
+    try:
+        await call(spotify.me)
+    except pyfy.excs.SpotifyError:
+        return False
+    return True
 
 
 async def query_spotify(
@@ -71,7 +139,7 @@ async def query_spotify(
 ) -> tuple[tuple[Playlist, ...], tuple[Track, ...]]:
     await init()
 
-    spotify_liked_tracks: list[SpotifyTrack] = []
+    liked_tracks: list[Track] = []
     spotify_basic_playlists: list[BasicSpotifyPlaylist] = []
 
     task_id = progress.add_task(
@@ -87,8 +155,8 @@ async def query_spotify(
             task_description(querying="Spotify", subtype="Liked Songs", color="green"),
             start=False,
         )
-        spotify_liked_user_tracks = await fetch_spotify_user_liked_tracks(task_id=task_id, progress=progress)
-        spotify_liked_tracks.extend(spotify_liked_user_tracks)
+        liked_user_tracks = await fetch_spotify_user_liked_tracks(task_id=task_id, progress=progress)
+        liked_tracks.extend(liked_user_tracks)
 
     if extra_playlist_urls:
         spotify_basic_extra_playlists = await fetch_basic_spotify_playlists(
@@ -101,12 +169,9 @@ async def query_spotify(
         start=False,
     )
 
-    spotify_playlists = await load_basic_playlists(spotify_basic_playlists, task_id=task_id, progress=progress)
-
-    playlists = covert_spotify_playlists_to_playlists(spotify_playlists)
-    liked_tracks = covert_spotify_tracks_to_tracks(spotify_liked_tracks)
+    playlists = await load_basic_playlists(spotify_basic_playlists, task_id=task_id, progress=progress)
 
-    return playlists, liked_tracks
+    return tuple(playlists), tuple(liked_tracks)
 
 
 async def fetch_basic_user_spotify_playlists(
@@ -117,7 +182,7 @@ async def fetch_basic_user_spotify_playlists(
 
     limit = 50
 
-    playlists_resp = await spotify.user_playlists(limit=limit)
+    playlists_resp = await call(spotify.user_playlists, limit=limit)
     playlists_items = playlists_resp["items"]  # type: ignore
 
     total_tracks: int = playlists_resp["total"]  # type: ignore
@@ -128,7 +193,7 @@ async def fetch_basic_user_spotify_playlists(
 
     async def load_user_playlists(offset: int, limit: int) -> SpotifyResponse:
         try:
-            return await spotify.user_playlists(offset=offset, limit=limit)  # type: ignore
+            return await call(spotify.user_playlists, offset=offset, limit=limit)  # type: ignore
         finally:
             progress.update(task_id, advance=1)
 
@@ -177,14 +242,12 @@ async def fetch_basic_spotify_playlist(
     playlist_id = match.group("id") if match else playlist_url
 
     try:
-        spotify_basic_playlist = await spotify.playlist(playlist_id)
+        spotify_basic_playlist = await call(spotify.playlist, playlist_id, fields=PLAYLIST_FIELDS)
         return BasicSpotifyPlaylist(**spotify_basic_playlist)  # type: ignore
     except pyfy.excs.SpotifyError:
-        rich.print(
-            skipping_message(
-                text=f"[blue underline]{playlist_url}[/blue underline]",
-                reason="Invalid playlist link.",
-            )
+        log.skipping(
+            text=f"[blue underline]{playlist_url}[/blue underline]",
+            reason="Invalid playlist link.",
         )
         return None
     finally:
@@ -196,8 +259,8 @@ async def load_basic_playlists(
     *,
     task_id: TaskID,
     progress: Progress,
-) -> list[SpotifyPlaylist]:  # sourcery skip: sum-comprehension
-    playlist_tasks: list[asyncio.Task[SpotifyPlaylist]] = []
+) -> list[Playlist]:  # sourcery skip: sum-comprehension
+    playlist_tasks: list[asyncio.Task[Playlist]] = []
 
     total = 0
     for basic_playlist in basic_spotify_playlists:
@@ -211,8 +274,8 @@ async def load_basic_playlists(
         task = asyncio.create_task(coro)
         playlist_tasks.append(task)
 
-    spotify_playlists: list[SpotifyPlaylist] = await asyncio.gather(*playlist_tasks)
-    return spotify_playlists
+    playlists: list[Playlist] = await asyncio.gather(*playlist_tasks)
+    return playlists
 
 
 async def basic_playlist_to_playlist(
@@ -220,31 +283,24 @@ async def basic_playlist_to_playlist(
     *,
     task_id: TaskID,
     progress: Progress,
-) -> SpotifyPlaylist:
+) -> Playlist:
     await init()
 
-    spotify_tracks = await load_basic_playlist_tracks(basic_playlist, task_id=task_id, progress=progress)
+    tracks = await load_basic_playlist_tracks(basic_playlist, task_id=task_id, progress=progress)
 
-    playlist = SpotifyPlaylist(
-        name=basic_playlist.name,
+    playlist = Playlist(
         id=basic_playlist.id,
-        public=basic_playlist.public,
-        collaborative=basic_playlist.collaborative,
-        description=basic_playlist.description,
-        href=basic_playlist.href,
-        uri=basic_playlist.uri,
-        images=basic_playlist.images,
-        tracks=spotify_tracks,
+        name=basic_playlist.name,
+        cover_image_url=basic_playlist.cover_image_url,
+        tracks=tuple(tracks),
     )
 
-    rich.print(
-        loaded_message(
-            source="Spotify",
-            loaded="Playlist",
-            name=playlist.name,
-            tracks_count=len(spotify_tracks),
-            color="green",
-        )
+    log.loaded(
+        source="Spotify",
+        loaded="Playlist",
+        name=playlist.name,
+        tracks_count=len(tracks),
+        color="green",
     )
 
     return playlist
@@ -255,15 +311,19 @@ async def load_basic_playlist_tracks(
     *,
     task_id: TaskID,
     progress: Progress,
-) -> list[SpotifyTrack]:
+) -> list[Track]:
     await init()
 
     spotify_tracks_items_tasks: list[asyncio.Task[list[dict]]] = []
 
     async def load_playlist_tracks(offset: int, limit: int) -> SpotifyResponse:
         try:
-            return await spotify.playlist_tracks(
-                playlist_id=basic_spotify_playlist.id, offset=offset, limit=limit
+            return await call(
+                spotify.playlist_tracks,
+                playlist_id=basic_spotify_playlist.id,
+                offset=offset,
+                limit=limit,
+                fields=PLAYLIST_TRACKS_FIELDS,
             )  # type: ignore
         finally:
             progress.update(task_id, advance=1)
@@ -283,62 +343,97 @@ async def load_basic_playlist_tracks(
     for spotify_tracks_item in spotify_tracks_items:
         spotify_track_items.extend(spotify_tracks_item["items"])
 
-    spotify_tracks = spotify_track_items_to_spotify_tracks(spotify_track_items)
-    return spotify_tracks
+    return spotify_track_items_to_tracks(spotify_track_items)
 
 
-def filter_spotify_tracks(spotify_tracks: list[SpotifyTrack]) -> list[SpotifyTrack]:
-    def filter_spotify_track(spotify_track: SpotifyTrack) -> bool:
-        return not spotify_track.is_local
-
-    spotify_tracks = [t for t in spotify_tracks if filter_spotify_track(t)]
-
-    return spotify_tracks
+def spotify_track_item_to_track(spotify_track_item: dict[str, t.Any]) -> Track | None:
+    """
+    Extract a track straight from a playlist (or liked songs) item, w/o validating it into a `SpotifyTrack` first,
+    as every item of every playlist goes through here.
+    Returns None for tracks that can't be transferred (local files, and blank names).
+    Falls back to validating the item into a `SpotifyTrack` if it doesn't have the expected shape,
+    to raise a descriptive error.
+    """
+    try:
+        spotify_track = spotify_track_item["track"]
+        if spotify_track["is_local"]:
+            return None
 
+        name: str = spotify_track["name"]
+        album: dict[str, t.Any] = spotify_track["album"]
+        album_name: str = album["name"]
+        artist_names: list[str] = [a["name"] for a in spotify_track["artists"]]
 
-def spotify_track_items_to_spotify_tracks(spotify_track_items: list[dict[str, t.Any]]) -> list[SpotifyTrack]:
-    spotify_tracks: list[SpotifyTrack] = []
-    for spotify_track_item in spotify_track_items:
-        try:
-            track = SpotifyTrack(**spotify_track_item["track"])
         # weird spotify api bug where track, artist, and album name is blank
         # (usually because the track is by 'various artists' the spotify thing)
         # but w/o this information we can't fetch the track so just skip it
-        except pydantic.ValidationError as exc:
-            for error in exc.errors():
-                if error["input"] == "":
-                    continue
-                # as in: '[type] name can't be blank'
-                if "blank" in error["msg"]:
-                    continue
-                raise
-        else:
-            spotify_tracks.append(track)
+        if not name or not album_name or not artist_names or not all(artist_names):
+            return None
+
+        # song is a single and has the single name as the album name,
+        # represent this as None internally because it's not really an album
+        if album["album_type"] == "single" or album["total_tracks"] == 1:
+            album_name = None  # type: ignore[assignment]
+
+        return Track(
+            name=name,
+            duration=spotify_track["duration_ms"] // 1000,
+            artists=tuple(map(Artist, artist_names)),
+            album_name=album_name,
+            is_explicit=spotify_track["explicit"],
+            isrc=(spotify_track.get("external_ids") or {}).get("isrc"),
+        )
+    except (KeyError, TypeError, AttributeError):
+        return validate_spotify_track_item(spotify_track_item)
 
-    spotify_tracks = filter_spotify_tracks(spotify_tracks)
-    return spotify_tracks
+
+def validate_spotify_track_item(spotify_track_item: dict[str, t.Any]) -> Track | None:
+    try:
+        spotify_track = SpotifyTrack(**spotify_track_item["track"])
+    except pydantic.ValidationError as exc:
+        for error in exc.errors():
+            if error["input"] == "":
+                continue
+            # as in: '[type] name can't be blank'
+            if "blank" in error["msg"]:
+                continue
+            raise
+        return None
+
+    if spotify_track.is_local:
+        return None
+    return covert_spotify_track_to_track(spotify_track)
+
+
+def spotify_track_items_to_tracks(spotify_track_items: t.Iterable[dict[str, t.Any]]) -> list[Track]:
+    tracks: list[Track] = []
+    for spotify_track_item in spotify_track_items:
+        track = spotify_track_item_to_track(spotify_track_item)
+        if track is not None:
+            tracks.append(track)
+    return tracks
 
 
 async def fetch_spotify_user_liked_tracks(
     task_id: TaskID,
     progress: Progress,
-) -> list[SpotifyTrack]:
+) -> list[Track]:
     await init()
 
     limit = 50
 
-    liked_tracks_resp = await spotify.user_tracks(limit=limit)
+    liked_tracks_resp = await call(spotify.user_tracks, limit=limit)
     liked_tracks_items = liked_tracks_resp["items"]  # type: ignore
 
     total_tracks: int = liked_tracks_resp["total"]  # type: ignore
-    total = math.ceil(total_tracks // limit)
+    total = math.ceil(total_tracks / limit)
 
     progress.update(task_id, total=total, completed=1)
     progress.start_task(task_id)
 
     async def load_user_tracks(offset: int, limit: int) -> SpotifyResponse:
         try:
-            return await spotify.user_tracks(offset=offset, limit=limit)  # type: ignore
+            return await call(spotify.user_tracks, offset=offset, limit=limit)  # type: ignore
         finally:
             progress.update(task_id, advance=1)
 
@@ -348,31 +443,18 @@ async def fetch_spotify_user_liked_tracks(
         liked_tracks_resp = await load_user_tracks(offset=offset, limit=limit)
         liked_tracks_items.extend(liked_tracks_resp["items"])  # type: ignore
 
-    liked_tracks: list[SpotifyTrack] = spotify_track_items_to_spotify_tracks(liked_tracks_items)
+    liked_tracks: list[Track] = spotify_track_items_to_tracks(liked_tracks_items)
 
-    rich.print(
-        loaded_message(
-            source="Spotify",
-            loaded="Liked Songs",
-            tracks_count=len(liked_tracks),
-            color="green",
-        )
+    log.loaded(
+        source="Spotify",
+        loaded="Liked Songs",
+        tracks_count=len(liked_tracks),
+        color="green",
     )
 
     return liked_tracks
 
 
-def covert_spotify_playlist_to_playlist(spotify_playlist: SpotifyPlaylist) -> Playlist:
-    tracks = covert_spotify_tracks_to_tracks(spotify_playlist.tracks)
-
-    return Playlist(
-        id=spotify_playlist.id,
-        name=spotify_playlist.name,
-        cover_image_url=spotify_playlist.cover_image_url,
-        tracks=tracks,
-    )
-
-
 def covert_spotify_track_to_track(spotify_track: SpotifyTrack) -> Track:
     track = Track(
         name=spotify_track.name,
@@ -380,17 +462,6 @@ def covert_spotify_track_to_track(spotify_track: SpotifyTrack) -> Track:
         artists=tuple(Artist(name=a.name) for a in spotify_track.artists),
         album_name=spotify_track.album_name,
         is_explicit=spotify_track.explicit,
+        isrc=spotify_track.isrc,
     )
     return track
-
-
-def covert_spotify_playlists_to_playlists(
-    spotify_playlists: t.Iterable[SpotifyPlaylist],
-) -> tuple[Playlist, ...]:
-    return tuple(covert_spotify_playlist_to_playlist(p) for p in spotify_playlists)
-
-
-def covert_spotify_tracks_to_tracks(
-    spotify_tracks: t.Iterable[SpotifyTrack],
-) -> tuple[Track, ...]:
-    return tuple(covert_spotify_track_to_track(t) for t in spotify_tracks)
@@ -0,0 +1,127 @@
+"""
+Snapshots of the playlists and liked songs loaded from Spotify,
+so they can be converted again w/o any Spotify API calls (ie. for `transfer --offline`).
+
+A snapshot file is a header followed by a zlib compressed JSON document.
+Artists and tracks are stored once each, in tables, and referenced by their index,
+as the same tracks (and artists) usually show up in several playlists.
+"""
+from __future__ import annotations
+
+import json
+import struct
+import typing as t
+import zlib
+
+import aiofiles
+
+from spotify_to_musi.exceptions import SnapshotFormatError
+from spotify_to_musi.typings.core import Artist, Playlist, Track
+
+if t.TYPE_CHECKING:
+    import os
+
+MAGIC = b"STMSPTFY"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(">8sH")
+
+
+class SpotifySnapshot(t.NamedTuple):
+    playlists: tuple[Playlist, ...]
+    liked_tracks: tuple[Track, ...]
+    # whether the snapshot is of the user's library, which is imported into musi w/ OVERWRITE instead of MERGE
+    transfer_user_library: bool
+
+
+def encode_snapshot(snapshot: SpotifySnapshot) -> bytes:
+    artist_indexes: dict[Artist, int] = {}
+    # keyed by every field, as tracks only compare by name, duration and artists (not by release)
+    track_indexes: dict[tuple[t.Any, ...], int] = {}
+    tracks: list[list[t.Any]] = []
+
+    def track_index(track: Track) -> int:
+        key = tuple(track.as_kwargs().values())
+        index = track_indexes.get(key)
+        if index is not None:
+            return index
+
+        artists = [artist_indexes.setdefault(artist, len(artist_indexes)) for artist in track.artists]
+        tracks.append([track.name, track.duration, artists, track.album_name, track.is_explicit, track.isrc])
+        track_indexes[key] = index = len(tracks) - 1
+        return index
+
+    document = {
+        "user": snapshot.transfer_user_library,
+        "liked": [track_index(track) for track in snapshot.liked_tracks],
+        "playlists": [
+            [p.id, p.name, p.cover_image_url, [track_index(track) for track in p.tracks]] for p in snapshot.playlists
+        ],
+        "tracks": tracks,
+        "artists": [artist.name for artist in artist_indexes],
+    }
+
+    payload = json.dumps(document, separators=(",", ":")).encode()
+    return HEADER.pack(MAGIC, FORMAT_VERSION) + zlib.compress(payload, level=9)
+
+
+def decode_snapshot(data: bytes) -> SpotifySnapshot:
+    if len(data) < HEADER.size:
+        reason = "file is too short"
+        raise SnapshotFormatError(reason)
+
+    magic, version = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        reason = "not a spotify-to-musi snapshot"
+        raise SnapshotFormatError(reason)
+    if version != FORMAT_VERSION:
+        reason = f"unsupported version {version}, expected {FORMAT_VERSION}"
+        raise SnapshotFormatError(reason)
+
+    try:
+        document = json.loads(zlib.decompress(data[HEADER.size :]))
+
+        artists = [Artist(name=name) for name in document["artists"]]
+        tracks = [
+            Track(
+                name=name,
+                duration=duration,
+                artists=tuple(artists[i] for i in artist_indexes),
+                album_name=album_name,
+                is_explicit=is_explicit,
+                isrc=isrc,
+            )
+            for name, duration, artist_indexes, album_name, is_explicit, isrc in document["tracks"]
+        ]
+        playlists = tuple(
+            Playlist(id=id_, name=name, cover_image_url=cover_image_url, tracks=tuple(tracks[i] for i in indexes))
+            for id_, name, cover_image_url, indexes in document["playlists"]
+        )
+        liked_tracks = tuple(tracks[i] for i in document["liked"])
+        transfer_user_library = bool(document["user"])
+    except zlib.error as exc:
+        reason = "corrupt data"
+        raise SnapshotFormatError(reason) from exc
+    except (IndexError, KeyError, TypeError, ValueError) as exc:
+        reason = "invalid snapshot"
+        raise SnapshotFormatError(reason) from exc
+
+    return SpotifySnapshot(playlists, liked_tracks, transfer_user_library)
+
+
+async def save_snapshot(path: str | os.PathLike[str], snapshot: SpotifySnapshot) -> None:
+    async with aiofiles.open(path, "wb") as f:
+        await f.write(encode_snapshot(snapshot))
+
+
+async def load_snapshot(path: str | os.PathLike[str]) -> SpotifySnapshot:
+    """
+    Load a snapshot saved w/ `save_snapshot`.
+    Raises `SnapshotFormatError` if the file can't be read.
+    """
+    try:
+        async with aiofiles.open(path, "rb") as f:
+            data = await f.read()
+    except OSError as exc:
+        raise SnapshotFormatError(str(exc)) from exc
+
+    return decode_snapshot(data)
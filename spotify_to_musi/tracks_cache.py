@@ -1,97 +1,316 @@
+"""
+Cache of tracks that have already been matched to a YouTube track.
+
+Tracks that have been looked up are kept in memory, and are loaded from, fetched from and stored to
+a backend (see `cache_backends`), which is a file on the local disk by default.
+"""
 from __future__ import annotations
 
-import json
+import asyncio
+import re
+import time
 import typing as t
 
-import aiofiles
-import pydantic
-import pydantic.errors
-import pydantic.json
-from cache import AsyncLRU
+from spotify_to_musi.cache_backends import CacheBackend, CacheEntry, FileBackend
+from spotify_to_musi.typings.core import Track
+
+if t.TYPE_CHECKING:
+    from spotify_to_musi.typings.youtube import YouTubeTrack
+
+DEFAULT_MAX_SIZE = 100_000
+# when the cache grows past its max size, it's evicted down to this fraction of it,
+# so that eviction (and rewriting the stored cache) doesn't have to happen on every run after that
+EVICTION_LOW_WATERMARK = 0.9
+# how many seconds apart a cached track's duration can be from a track's to be a near match,
+# and the width of the duration buckets of the near match index
+NEAR_MATCH_DURATION_TOLERANCE = 2
+# remastered releases of a recording, ie. "Song - Remastered 2011", "Song - 2011 Remaster" or "Song (Remastered)"
+REMASTER_REGEX = re.compile(r"\s*(?:[(\[][^)\]]*remaster[^)\]]*[)\]]|\s-\s[^-]*remaster.*$)", re.IGNORECASE)
+
+
+class _Settings:
+    max_size: int | None = DEFAULT_MAX_SIZE
+    max_age: float | None = None
+
+
+# in-memory state of the cache, loaded once and then kept in sync w/ the backend
+_backend: CacheBackend = FileBackend()
+_entries: dict[Track, CacheEntry] | None = None
+# isrc -> tracks, several releases of a recording can be cached
+_isrcs: dict[str, list[Track]] = {}
+# normalized primary artist, title and duration bucket -> tracks
+_near_matches: dict[tuple[str, str, int], list[Track]] = {}
+# tracks whose stored access stamp is stale (see `CacheEntry.touch`), stored again on the next commit
+_stale: dict[Track, CacheEntry] = {}
+_load_lock: asyncio.Lock | None = None
+
 
-from spotify_to_musi.paths import YOUTUBE_DATA_CACHE_PATH
-from spotify_to_musi.typings.core import Artist, Track
-from spotify_to_musi.typings.youtube import YouTubeTrack
+def configure(*, max_size: int | None = DEFAULT_MAX_SIZE, max_age: float | None = None) -> None:
+    """
+    Bound the cache to `max_size` tracks (evicting the least recently used tracks first)
+    and to tracks that were matched less than `max_age` seconds ago. None means unbounded.
+    """
+    _Settings.max_size = max_size
+    _Settings.max_age = max_age
+
+
+def set_backend(backend: CacheBackend | None) -> None:
+    """
+    Store the cache in `backend` instead of the local file cache.
+    Passing None restores the local file cache.
+    """
+    global _backend
+    _backend = backend or FileBackend()
+    unload()
+
+
+def unload() -> None:
+    """
+    Forget the in-memory cache, ie. after changing the data directory.
+    """
+    global _entries, _load_lock
+    _entries = None
+    _isrcs.clear()
+    _near_matches.clear()
+    _stale.clear()
+    _load_lock = None
+
+
+async def close() -> None:
+    await _backend.close()
 
 
 def convert_youtube_track_to_track(youtube_track: YouTubeTrack) -> Track:
     return Track(
         name=youtube_track.name,
         duration=youtube_track.duration,
-        artists=tuple(Artist(name=a.name) for a in youtube_track.artists),
+        artists=youtube_track.artists,
         album_name=youtube_track.album_name,
         is_explicit=bool(youtube_track.is_explicit),
+        isrc=youtube_track.isrc,
     )
 
 
-async def cache_youtube_tracks() -> None:
+def near_match_key(track: Track, duration_bucket: int | None = None) -> tuple[str, str, int]:
+    """
+    The key of a track in the near match index, which ignores casing, spacing and remaster suffixes.
+    """
+    title = " ".join(REMASTER_REGEX.sub("", track.name).casefold().split())
+    artist = " ".join(track.primary_artist.name.casefold().split())
+    if duration_bucket is None:
+        duration_bucket = track.duration // NEAR_MATCH_DURATION_TOLERANCE
+    return artist, title, duration_bucket
+
+
+def _add_entry(entries: dict[Track, CacheEntry], entry: CacheEntry) -> Track:
+    track = convert_youtube_track_to_track(entry.youtube_track)
+    if track not in entries:
+        _near_matches.setdefault(near_match_key(track), []).append(track)
+        if track.isrc:
+            _isrcs.setdefault(track.isrc, []).append(track)
+    entries[track] = entry
+    # a new entry is stored w/ its own access stamp
+    _stale.pop(track, None)
+    return track
+
+
+def _remove_entry(entries: dict[Track, CacheEntry], track: Track) -> None:
+    del entries[track]
+    _stale.pop(track, None)
+    if track.isrc:
+        isrc_tracks = _isrcs[track.isrc]
+        isrc_tracks.remove(track)
+        if not isrc_tracks:
+            del _isrcs[track.isrc]
+
+    key = near_match_key(track)
+    near_tracks = _near_matches[key]
+    near_tracks.remove(track)
+    if not near_tracks:
+        del _near_matches[key]
+
+
+def _near_match(track: Track) -> Track | None:
+    """
+    The cached track that's closest in duration to the track, w/in the tolerance, if any.
+    """
+    artist, title, duration_bucket = near_match_key(track)
+    best: Track | None = None
+    # the tolerance is the width of a bucket, so near matches are in the track's bucket or the ones next to it
+    for bucket in (duration_bucket - 1, duration_bucket, duration_bucket + 1):
+        for near_track in _near_matches.get((artist, title, bucket), ()):
+            difference = abs(near_track.duration - track.duration)
+            if difference <= NEAR_MATCH_DURATION_TOLERANCE and (
+                best is None or difference < abs(best.duration - track.duration)
+            ):
+                best = near_track
+    return best
+
+
+async def load() -> dict[Track, CacheEntry]:
     """
-    Cache tracks to disk.
+    Load the cache from the backend, the first time it's used.
     """
+    global _entries, _load_lock
+
+    if _entries is not None:
+        return _entries
+
+    if _load_lock is None:
+        _load_lock = asyncio.Lock()
 
-    tracks = await load_cached_youtube_tracks()
-    sorted_youtube_tracks = sorted(tracks, key=lambda t: t.primary_artist.name)
+    async with _load_lock:
+        if _entries is not None:
+            return _entries
 
-    youtube_tracks_json = json.dumps(sorted_youtube_tracks, default=pydantic.json.pydantic_encoder)
+        entries: dict[Track, CacheEntry] = {}
+        for entry in await _backend.load():
+            _add_entry(entries, entry)
 
-    async with aiofiles.open(YOUTUBE_DATA_CACHE_PATH, "w") as f:
-        await f.write(youtube_tracks_json)
+        _entries = entries
 
+    return entries
 
-@AsyncLRU(maxsize=None)  # type: ignore
-async def load_cached_youtube_tracks() -> set[YouTubeTrack]:
+
+async def prefetch(tracks: t.Iterable[Track]) -> None:
     """
-    Load cached tracks from disk.
-    Only intended to be used at the start of the program to load the cache,
-    and not after the program has updated the cache file on the disk.
+    Fetch the cached YouTube tracks of all the tracks (ie. of a whole run) that aren't in memory yet in one batch,
+    instead of one request per track.
     """
-    if not YOUTUBE_DATA_CACHE_PATH.is_file():
-        return set()
-    async with aiofiles.open(YOUTUBE_DATA_CACHE_PATH, "r") as f:
-        tracks_text = await f.read()
-        tracks_json = json.loads(tracks_text)
-    try:
-        return {YouTubeTrack(**track) for track in tracks_json}
-    except pydantic.errors.PydanticValueError:
-        YOUTUBE_DATA_CACHE_PATH.unlink()
-        return set()
+    entries = await load()
+    missing = [track for track in tracks if track not in entries and not (track.isrc and track.isrc in _isrcs)]
+
+    if not missing:
+        return
 
+    for entry in await _backend.get_many(missing):
+        _add_entry(entries, entry)
 
-@AsyncLRU(maxsize=None)  # type: ignore
-async def load_cached_tracks() -> set[Track]:
+
+def evict(entries: dict[Track, CacheEntry], now: float) -> int:
     """
-    Load cached YouTube Tracks in the form of a set of Tracks.
+    Evict tracks that are older than the max age,
+    then the least recently used tracks until the cache fits in the max size.
+    Returns the number of evicted tracks.
     """
-    cached_tracks_dict = await load_cached_tracks_dict()
-    return set(cached_tracks_dict.keys())
+    evicted = 0
+
+    if _Settings.max_age is not None:
+        expire_before = now - _Settings.max_age
+        for track in [track for track, entry in entries.items() if entry.cached_at < expire_before]:
+            _remove_entry(entries, track)
+            evicted += 1
 
+    max_size = _Settings.max_size
+    if max_size is not None and len(entries) > max_size:
+        target_size = int(max_size * EVICTION_LOW_WATERMARK)
+        least_recently_used = sorted(entries, key=lambda track: entries[track].accessed_at)
+        for track in least_recently_used[: len(entries) - target_size]:
+            _remove_entry(entries, track)
+            evicted += 1
 
-@AsyncLRU(maxsize=None)  # type: ignore
-async def load_cached_tracks_dict() -> dict[Track, YouTubeTrack]:
+    return evicted
+
+
+async def compact() -> None:
     """
-    Load cached tracks from in the form of a dict
-    with the track as the key and the YouTubeTrack as the value.
+    Rewrite the stored cache w/ only the tracks in memory, dropping replaced and evicted tracks.
     """
-    cached_youtube_tracks = await load_cached_youtube_tracks()
-    return {convert_youtube_track_to_track(yt): yt for yt in cached_youtube_tracks}
+    entries = await load()
+    _stale.clear()
+    await _backend.rewrite(entries)
 
 
 async def update_cached_tracks(youtube_tracks: t.Iterable[YouTubeTrack]) -> None:
     """
-    Update the tracks dict with the newly fetched YouTube tracks.
+    Update the cache with the newly fetched YouTube tracks, and store them.
     """
-    tracks_dict = await load_cached_tracks_dict()
-    cached_tracks = await load_cached_tracks()
-    cached_youtube_tracks = await load_cached_youtube_tracks()
+    entries = await load()
+    now = time.time()
+    changed: list[CacheEntry] = []
 
     for youtube_track in youtube_tracks:
         track = convert_youtube_track_to_track(youtube_track)
+        entry = entries.get(track)
+
+        if entry is not None and entry.youtube_track == youtube_track:
+            continue
+
+        entry = CacheEntry(youtube_track, cached_at=now, accessed_at=now)
+        _add_entry(entries, entry)
+        changed.append(entry)
 
-        tracks_dict[track] = youtube_track
-        cached_tracks.add(track)
-        cached_youtube_tracks.add(youtube_track)
+    await _commit(entries, changed, now)
+
+
+async def merge_entries(imported_entries: t.Iterable[CacheEntry]) -> int:
+    """
+    Merge entries (ie. from another machine's cache) into the cache, and store them.
+    A track that's already cached keeps whichever entry was matched more recently.
+    Returns the number of tracks that were added or replaced.
+    """
+    entries = await load()
+    changed: list[CacheEntry] = []
 
-    await cache_youtube_tracks()
+    for entry in imported_entries:
+        existing_entry = entries.get(convert_youtube_track_to_track(entry.youtube_track))
+
+        if existing_entry is not None and existing_entry.cached_at >= entry.cached_at:
+            continue
+
+        _add_entry(entries, entry)
+        changed.append(entry)
+
+    await _commit(entries, changed, time.time())
+    return len(changed)
+
+
+async def _commit(entries: dict[Track, CacheEntry], changed: list[CacheEntry], now: float) -> None:
+    stale = list(_stale.values())
+    _stale.clear()
+    # shared backends evict on their own, so they store every changed entry, even one that was just evicted from memory
+    if evict(entries, now) and _backend.rewrites_evicted:
+        await _backend.rewrite(entries)
+    else:
+        await _backend.set_many(changed, entries, stale=stale)
+
+
+def _lookup(entries: dict[Track, CacheEntry], track: Track) -> YouTubeTrack | None:
+    entry = entries.get(track)
+
+    near_track = None
+    if entry is None and track.isrc and track.isrc in _isrcs:
+        # the most recently cached release
+        near_track = _isrcs[track.isrc][-1]
+    elif entry is None:
+        near_track = _near_match(track)
+
+    if near_track is not None:
+        entry = entries[near_track]
+        # same recording on another release (single, album, deluxe, remaster, etc.),
+        # re-key it to this release, so it's cached (and matched) by the track itself from now on
+        if entry.touch(time.time()):
+            _stale[near_track] = entry
+        return entry.youtube_track.replace(name=track.name, duration=track.duration, artists=track.artists)
+
+    if entry is None:
+        return None
+
+    if entry.touch(time.time()):
+        _stale[track] = entry
+    return entry.youtube_track
+
+
+async def lookup_youtube_track(track: Track) -> YouTubeTrack | None:
+    """
+    Look up the cached YouTube track for a track.
+    Falls back to the track's isrc, so a recording matched on one release (ie. a single)
+    resolves without searching again when it shows up on another (ie. the album).
+    Then to a near match: a track by the same artist, w/ the same title (give or take casing and a remaster suffix)
+    and about the same duration.
+    """
+    entries = await load()
+    return _lookup(entries, track)
 
 
 async def match_tracks_to_youtube_tracks(
@@ -100,10 +319,11 @@ async def match_tracks_to_youtube_tracks(
     """
     Match the tracks to the cached YouTube tracks.
     """
-    tracks_dict = await load_cached_tracks_dict()
+    entries = await load()
     youtube_tracks: list[YouTubeTrack] = []
     for track in tracks:
-        if track in tracks_dict:
-            youtube_tracks.append(tracks_dict[track])
+        youtube_track = _lookup(entries, track)
+        if youtube_track is not None:
+            youtube_tracks.append(youtube_track)
         # track not found in cache (skipped previously)
     return tuple(youtube_tracks)
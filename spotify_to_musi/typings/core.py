@@ -1,32 +1,174 @@
 from __future__ import annotations
 
+import sys
 import typing as t
-from dataclasses import field
-
-from pydantic.dataclasses import dataclass
+import weakref
 
 from spotify_to_musi.commons import remove_features_from_title, remove_parens
-from spotify_to_musi.exceptions import EmptyTupleError
+from spotify_to_musi.exceptions import EmptyTupleError, FrozenRecordError
+
+# the core models are created (and hashed) once or more per track, so they're compact, slotted, immutable classes
+# w/ a cached hash instead of pydantic dataclasses. pydantic models are only used at the I/O boundaries
+# (spotify/youtube music responses and the musi payload), where data actually needs to be validated.
+
+RecordT = t.TypeVar("RecordT", bound="Record")
+
+
+def _rebuild(cls: type[RecordT], kwargs: dict[str, t.Any]) -> RecordT:
+    return cls(**kwargs)
+
+
+class Record:
+    """
+    Base for the core models.
+    Subclasses list their attributes in `__slots__` and `_fields`,
+    and the ones that make up their identity in `_compare`.
+    """
+
+    __slots__ = ("_hash",)
+
+    _fields: t.ClassVar[tuple[str, ...]] = ()
+    _compare: t.ClassVar[tuple[str, ...]] = ()
+
+    _hash: int
+
+    def _set(self: Record, **attributes: t.Any) -> None:
+        for name, value in attributes.items():
+            object.__setattr__(self, name, value)
+
+    def _key(self: Record) -> tuple[t.Any, ...]:
+        return tuple(getattr(self, name) for name in self._compare)
+
+    def __setattr__(self: Record, name: str, value: t.Any) -> None:
+        raise FrozenRecordError(name)
+
+    def __delattr__(self: Record, name: str) -> None:
+        raise FrozenRecordError(name, deleting=True)
+
+    def __hash__(self: Record) -> int:
+        # computed once on first use, after every subclass has set its attributes
+        try:
+            return self._hash
+        except AttributeError:
+            object.__setattr__(self, "_hash", hash(self._key()))
+            return self._hash
+
+    def __eq__(self: Record, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return hash(self) == hash(other) and self._key() == other._key()  # type: ignore[attr-defined]
+
+    def __repr__(self: Record) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{self.__class__.__name__}({fields})"
+
+    def __reduce__(self: Record) -> tuple[t.Any, ...]:
+        return _rebuild, (self.__class__, self.as_kwargs())
+
+    def as_kwargs(self: Record) -> dict[str, t.Any]:
+        return {name: getattr(self, name) for name in self._fields}
+
+    def replace(self: RecordT, **changes: t.Any) -> RecordT:
+        """
+        Like `dataclasses.replace`, returns a copy w/ the provided attributes changed.
+        """
+        return self.__class__(**{**self.as_kwargs(), **changes})
+
 
+class Artist(Record):
+    """
+    Interned by name, every track by the same artist shares a single Artist.
+    Only while it's in use, so a long running process (ie. `watch`) doesn't keep every artist it ever saw.
+    """
+
+    __slots__ = ("name", "__weakref__")
+    _fields: t.ClassVar[tuple[str, ...]] = ("name",)
+    _compare: t.ClassVar[tuple[str, ...]] = ("name",)
+
+    _interned: t.ClassVar[weakref.WeakValueDictionary[str, Artist]] = weakref.WeakValueDictionary()
 
-@dataclass(frozen=True)
-class Artist:
     name: str
 
+    def __new__(cls: type[Artist], name: str) -> Artist:
+        try:
+            return cls._interned[name]
+        except KeyError:
+            pass
+
+        artist = super().__new__(cls)
+        artist._set(name=sys.intern(name))
+        cls._interned[artist.name] = artist
+        return artist
+
+    def __eq__(self: Artist, other: object) -> bool:
+        # interned, so equal artists are (almost always) the same object
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.name == other.name  # type: ignore[attr-defined]
+
+    __hash__ = Record.__hash__
+
+    @classmethod
+    def from_dict(cls: type[Artist], data: dict[str, t.Any]) -> Artist:
+        return cls(name=data["name"])
+
+    def as_dict(self: Artist) -> dict[str, t.Any]:
+        return {"name": self.name}
+
+
+def artists_from_dicts(artists: t.Iterable[dict[str, t.Any]]) -> tuple[Artist, ...]:
+    return tuple(Artist.from_dict(a) for a in artists)
+
+
+def artists_as_dicts(artists: t.Iterable[Artist]) -> list[dict[str, t.Any]]:
+    return [a.as_dict() for a in artists]
+
+
+class Track(Record):
+    __slots__ = ("name", "duration", "artists", "album_name", "is_explicit", "isrc")
+    _fields: t.ClassVar[tuple[str, ...]] = ("name", "duration", "artists", "album_name", "is_explicit", "isrc")
+    # there can be a song on multiple albums, ie. original, deluxe, etc.
+    # so album_name isn't part of a track's identity
+    _compare: t.ClassVar[tuple[str, ...]] = ("name", "duration", "artists")
 
-@dataclass(frozen=True)
-class Track:
     name: str
     duration: int
     artists: tuple[Artist, ...]
-    # there can be a song on multiple albums, ie. original, deluxe, etc.
-    album_name: t.Optional[str] = field(compare=False)
-    is_explicit: bool = field(compare=False)
-
-    def __post_init__(self: Track) -> None:
-        if not self.artists:
+    album_name: str | None
+    is_explicit: bool
+    # the same recording released on a single, album, deluxe edition, etc. shares an isrc
+    isrc: str | None
+
+    def __init__(
+        self: Track,
+        name: str,
+        duration: int,
+        artists: tuple[Artist, ...],
+        album_name: str | None,
+        is_explicit: bool,
+        isrc: str | None = None,
+    ) -> None:
+        if not artists:
             raise EmptyTupleError("artists")
 
+        self._set(
+            name=name,
+            duration=duration,
+            artists=tuple(artists),
+            album_name=album_name,
+            is_explicit=is_explicit,
+            isrc=isrc,
+        )
+
+    @classmethod
+    def from_dict(cls: type[Track], data: dict[str, t.Any]) -> Track:
+        return cls(**{**data, "artists": artists_from_dicts(data["artists"])})
+
+    def as_dict(self: Track) -> dict[str, t.Any]:
+        return {**self.as_kwargs(), "artists": artists_as_dicts(self.artists)}
+
     @property
     def primary_artist(self: Track) -> Artist:
         return self.artists[0]
@@ -72,9 +214,24 @@ class Track:
         )
 
 
-@dataclass(frozen=True)
-class Playlist:
+class Playlist(Record):
+    __slots__ = ("id", "name", "cover_image_url", "tracks")
+    _fields: t.ClassVar[tuple[str, ...]] = ("id", "name", "cover_image_url", "tracks")
+    _compare: t.ClassVar[tuple[str, ...]] = ("id",)
+
     id: str
-    name: str = field(compare=False)
-    cover_image_url: t.Optional[str] = field(repr=False, compare=False)
-    tracks: tuple[Track, ...] = field(repr=False, compare=False)
+    name: str
+    cover_image_url: str | None
+    tracks: tuple[Track, ...]
+
+    def __init__(
+        self: Playlist,
+        id: str,  # noqa: A002
+        name: str,
+        cover_image_url: str | None,
+        tracks: tuple[Track, ...],
+    ) -> None:
+        self._set(id=id, name=name, cover_image_url=cover_image_url, tracks=tuple(tracks))
+
+    def __repr__(self: Playlist) -> str:
+        return f"{self.__class__.__name__}(id={self.id!r}, name={self.name!r})"
@@ -2,14 +2,9 @@ from __future__ import annotations
 
 import time
 import typing as t
-from dataclasses import field
 
-from pydantic import BaseModel, Field
-from pydantic.dataclasses import dataclass
+from pydantic import BaseModel, ConfigDict, Field
 
-from spotify_to_musi.typings.core import (  # weird pydantic case where this has to be imported # noqa: F401
-    Artist,
-)
 from spotify_to_musi.typings.youtube import YouTubeTrack
 
 if t.TYPE_CHECKING:
@@ -20,17 +15,45 @@ if t.TYPE_CHECKING:
     else:
         from typing import NotRequired
 
+    import uuid
 
-@dataclass(frozen=True)
-class MusiTrack(YouTubeTrack):
-    created_date: float = field(default_factory=time.time)
+    from spotify_to_musi.typings.core import Artist
 
-    def musi_item(self: MusiTrack, index: int) -> MusiItem:
-        return MusiItem(
-            video_id=self.video_id,
-            pos=index,
-            cd=int(self.created_date),
+
+class MusiTrack(YouTubeTrack):
+    __slots__ = ("created_date",)
+    _fields: t.ClassVar[tuple[str, ...]] = (*YouTubeTrack._fields, "created_date")
+    _compare: t.ClassVar[tuple[str, ...]] = (*YouTubeTrack._compare, "created_date")
+
+    created_date: float
+
+    def __init__(
+        self: MusiTrack,
+        name: str,
+        duration: int,
+        artists: tuple[Artist, ...],
+        album_name: str | None,
+        is_explicit: bool | None,
+        youtube_name: str,
+        youtube_duration: int,
+        youtube_artists: tuple[Artist, ...],
+        video_id: str,
+        isrc: str | None = None,
+        created_date: float | None = None,
+    ) -> None:
+        super().__init__(
+            name=name,
+            duration=duration,
+            artists=artists,
+            album_name=album_name,
+            is_explicit=is_explicit,
+            youtube_name=youtube_name,
+            youtube_duration=youtube_duration,
+            youtube_artists=youtube_artists,
+            video_id=video_id,
+            isrc=isrc,
         )
+        self._set(created_date=time.time() if created_date is None else created_date)
 
     def musi_video(self: MusiTrack) -> MusiVideo:
         return MusiVideo(
@@ -48,12 +71,6 @@ class MusiItemDict(t.TypedDict):
     video_id: str
 
 
-class MusiItem(BaseModel):
-    cd: int = Field(default_factory=lambda: int(time.time()))
-    pos: int
-    video_id: str
-
-
 class MusiPlaylistDict(t.TypedDict):
     ot: t.Literal["custom"]
     items: list[MusiItemDict]
@@ -64,6 +81,8 @@ class MusiPlaylistDict(t.TypedDict):
 
 
 class MusiPlaylist(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     name: str
     tracks: tuple[MusiTrack, ...] = Field(exclude=True)
     ciu: t.Optional[str] = Field(alias="cover_image_url")
@@ -71,20 +90,6 @@ class MusiPlaylist(BaseModel):
     ot: t.Literal["custom"] = Field(default="custom")
     type: t.Literal["user"] = Field(default="user")
 
-    def dict(self: MusiPlaylist, **kwargs: t.Any) -> MusiPlaylistDict:  # type: ignore[override]
-        items: list[MusiItemDict] = [track.musi_item(index).dict() for index, track in enumerate(self.tracks)]  # type: ignore
-        super_dict = super().dict(**kwargs)
-        data = {
-            "ot": super_dict["ot"],
-            "items": items,
-            "name": super_dict["name"],
-            "type": super_dict["type"],
-            "date": super_dict["date"],
-        }
-        if self.ciu:
-            data["ciu"] = super_dict["ciu"]
-        return data  # type: ignore
-
 
 class MusiLibraryDict(t.TypedDict):
     ot: t.Literal["custom"]
@@ -94,21 +99,13 @@ class MusiLibraryDict(t.TypedDict):
 
 
 class MusiLibrary(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     tracks: tuple[MusiTrack, ...] = Field(exclude=True)
     ot: t.Literal["custom"] = Field(default="custom")
     name: str = Field(default="My Library")
     date: int = Field(default_factory=lambda: int(time.time()))
 
-    def dict(self: MusiLibrary, **kwargs: t.Any) -> MusiLibraryDict:  # type: ignore[override]
-        items: list[MusiItemDict] = [track.musi_item(index).dict() for index, track in enumerate(self.tracks)]  # type: ignore
-        super_dict = super().dict(**kwargs)
-        return {
-            "ot": super_dict["ot"],
-            "items": items,
-            "name": super_dict["name"],
-            "date": super_dict["date"],
-        }
-
 
 class MusiVideoDict(t.TypedDict):
     created_date: float  # time.time()
@@ -136,3 +133,12 @@ class MusiResponse(BaseModel):
     code: str
     diff: bool
     success: str
+
+
+class MusiBackup(t.NamedTuple):
+    uuid: uuid.UUID
+    # the JSON payload
+    payload: bytes
+    # a hash of the names and cover images of the library and playlists, and of the order of their videos,
+    # which (unlike the videos themselves) aren't part of the uuid
+    layout: str
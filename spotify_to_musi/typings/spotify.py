@@ -49,13 +49,22 @@ class BasicSpotifyPlaylist(BaseModel):
     # 'owner': SpotifyPlaylistOwner  noqa: ERA001
     # 'type': Literalplaylist noqa: ERA001
 
+    @property
+    def cover_image_url(self: BasicSpotifyPlaylist) -> str | None:
+        # sourcery skip: assign-if-exp, reintroduce-else, swap-if-expression
+        if not self.images:
+            return None
+
+        return self.images[0].url
+
+
+# playlist tracks are requested w/ only these fields (see `spotify.PLAYLIST_TRACKS_FIELDS`),
+# so the track models only have the fields that are actually used.
+# liked songs can't be trimmed, and their extra fields are ignored.
+
 
 class SpotifyArtist(BaseModel):
-    href: str
     name: str
-    id: str
-    type: str
-    uri: str
 
     @field_validator("name")
     @classmethod
@@ -65,20 +74,15 @@ class SpotifyArtist(BaseModel):
         return v
 
 
+class SpotifyExternalIds(BaseModel):
+    # International Standard Recording Code, identifies a recording across releases
+    isrc: t.Optional[str] = None
+
+
 class SpotifyAlbum(BaseModel):
     album_type: t.Union[t.Literal["single"], str]  # not sure what other options are
-    artists: list[SpotifyArtist]
-    # 'external_urls': ExternalUrls  noqa: ERA001
-    href: str
-    id: str
-    images: list[SpotifyImage]
-    is_playable: bool
     name: str
-    release_date: str
-    release_date_precision: str
     total_tracks: int
-    type: t.Union[t.Literal["album"], str]  # not sure what other options are
-    uri: str
 
     @field_validator("name")
     @classmethod
@@ -90,24 +94,12 @@ class SpotifyAlbum(BaseModel):
 
 class SpotifyTrack(BaseModel):
     name: str
-    id: str
     duration_ms: int
-    href: str
-    popularity: int
-    # reference: https://hexdocs.pm/spotify_web_api/Spotify.Tracks.html#t:popularity/0
-    # The popularity of the track. The value will be between 0 and 100, with 100 being the most popular. The popularity of a track is a value between 0 and 100, with 100 being the most popular. The popularity is calculated by algorithm and is based, in the most part, on the total number of plays the track has had and how recent those plays are.
     explicit: bool
     is_local: bool = False
     artists: list[SpotifyArtist]
-    # 'available_markets': Union[List, List[str]]   noqa: ERA001
-    # 'track_number': int  noqa: ERA001
-    # 'type': t.Literal['track']  noqa: ERA001
-    # 'uri': str  noqa: ERA001
     album: SpotifyAlbum
-    # 'disc_number': int  noqa: ERA001
-    # 'external_ids': ExternalIds  noqa: ERA001
-    # 'external_urls': ExternalUrls  noqa: ERA001
-    # 'preview_url': Optional[str]  noqa: ERA001
+    external_ids: SpotifyExternalIds = SpotifyExternalIds()
 
     @field_validator("name")
     @classmethod
@@ -120,6 +112,10 @@ class SpotifyTrack(BaseModel):
     def duration(self: SpotifyTrack) -> int:
         return self.duration_ms // 1000
 
+    @property
+    def isrc(self: SpotifyTrack) -> str | None:
+        return self.external_ids.isrc
+
     @property
     def album_name(self: SpotifyTrack) -> str | None:
         # song is a single and has the single name as the album name,
@@ -128,19 +124,3 @@ class SpotifyTrack(BaseModel):
             return None
 
         return self.album.name
-
-
-class SpotifyPlaylist(BasicSpotifyPlaylist):
-    tracks: list[SpotifyTrack]  # type: ignore[assignment]
-
-    @property
-    def cover_image_url(self: SpotifyPlaylist) -> str | None:
-        # sourcery skip: assign-if-exp, reintroduce-else, swap-if-expression
-        if not self.images:
-            return None
-
-        return self.images[0].url
-
-    @property
-    def track_count(self: SpotifyPlaylist) -> int:
-        return len(self.tracks)
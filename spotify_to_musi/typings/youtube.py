@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import typing as t
-from dataclasses import field
 
 from pydantic import BaseModel, field_validator
-from pydantic.dataclasses import dataclass
 
-from spotify_to_musi.typings.core import Artist, Playlist, Track
+from spotify_to_musi.typings.core import (
+    Artist,
+    Playlist,
+    Track,
+    artists_as_dicts,
+    artists_from_dicts,
+)
 
 
 class YouTubeMusicArtist(BaseModel):
@@ -51,15 +55,76 @@ class YouTubeMusicSearch(BaseModel):
     videos: list[YouTubeMusicVideo]
 
 
-@dataclass(frozen=True)
 class YouTubeTrack(Track):
+    __slots__ = ("youtube_name", "youtube_duration", "youtube_artists", "video_id")
+    _fields: t.ClassVar[tuple[str, ...]] = (
+        *Track._fields,
+        "youtube_name",
+        "youtube_duration",
+        "youtube_artists",
+        "video_id",
+    )
+    _compare: t.ClassVar[tuple[str, ...]] = (
+        *Track._compare,
+        "is_explicit",
+        "youtube_name",
+        "youtube_duration",
+        "youtube_artists",
+        "video_id",
+    )
+
     youtube_name: str
     youtube_duration: int
     youtube_artists: tuple[Artist, ...]
-    is_explicit: t.Optional[bool]  # type: ignore[assignment]
+    is_explicit: bool | None  # type: ignore[assignment]
     video_id: str
 
+    def __init__(
+        self: YouTubeTrack,
+        name: str,
+        duration: int,
+        artists: tuple[Artist, ...],
+        album_name: str | None,
+        is_explicit: bool | None,
+        youtube_name: str,
+        youtube_duration: int,
+        youtube_artists: tuple[Artist, ...],
+        video_id: str,
+        isrc: str | None = None,
+    ) -> None:
+        super().__init__(
+            name=name,
+            duration=duration,
+            artists=artists,
+            album_name=album_name,
+            is_explicit=is_explicit,  # type: ignore[arg-type]
+            isrc=isrc,
+        )
+        self._set(
+            youtube_name=youtube_name,
+            youtube_duration=youtube_duration,
+            youtube_artists=tuple(youtube_artists),
+            video_id=video_id,
+        )
+
+    @classmethod
+    def from_dict(cls: type[YouTubeTrack], data: dict[str, t.Any]) -> YouTubeTrack:
+        return cls(
+            **{
+                **data,
+                "artists": artists_from_dicts(data["artists"]),
+                "youtube_artists": artists_from_dicts(data["youtube_artists"]),
+            }
+        )
+
+    def as_dict(self: YouTubeTrack) -> dict[str, t.Any]:
+        return {
+            **super().as_dict(),
+            "youtube_artists": artists_as_dicts(self.youtube_artists),
+        }
+
 
-@dataclass(frozen=True)
 class YouTubePlaylist(Playlist):
-    tracks: tuple[YouTubeTrack, ...] = field(repr=False, compare=False)
+    __slots__ = ()
+
+    tracks: tuple[YouTubeTrack, ...]
@@ -4,14 +4,11 @@ import asyncio
 import typing as t
 
 import httpx
-import rich
 
-from spotify_to_musi import tracks_cache, ytmusic
+from spotify_to_musi import log, offload, tracks_cache, ytmusic
 from spotify_to_musi.commons import (
-    loaded_message,
     remove_features_from_title,
     remove_parens,
-    skipping_message,
     task_description,
 )
 from spotify_to_musi.typings.core import Artist, Playlist, Track
@@ -27,46 +24,121 @@ from spotify_to_musi.typings.youtube import (
 if t.TYPE_CHECKING:
     from rich.progress import Progress, TaskID
 
+MatchKey = tuple[str, int, tuple[str, ...]]
+
+# the lowest score a result needs to be matched to a track, value might need to be tweaked later
+MATCH_THRESHOLD = 1
+
 
 async def query_youtube(
     playlists: tuple[Playlist, ...],
     liked_tracks: tuple[Track, ...],
     progress: Progress,
+    client: httpx.AsyncClient | None = None,
 ) -> tuple[tuple[YouTubePlaylist, ...], tuple[YouTubeTrack, ...]]:
-    await tracks_cache.load_cached_youtube_tracks()
-    await tracks_cache.load_cached_tracks_dict()
-    await tracks_cache.load_cached_tracks()
-
-    deduplicated_tracks: set[Track] = set(liked_tracks)
+    tracks: list[Track] = list(liked_tracks)
     for playlist in playlists:
-        deduplicated_tracks.update(set(playlist.tracks))
+        tracks.extend(playlist.tracks)
+
+    await match_tracks(tracks, progress, client)
+    return await convert_to_youtube(playlists, liked_tracks)
+
 
-    total = len(deduplicated_tracks)
+async def match_tracks(tracks: t.Iterable[Track], progress: Progress, client: httpx.AsyncClient | None = None) -> None:
+    """
+    Match the tracks to YouTube tracks, each distinct track once, and cache the matches.
+    `client` is used to keep connections open between runs, otherwise a client is created for the run.
+    """
+    await tracks_cache.load()
+
+    # in order, so the same track of equivalent ones is searched for on every run
+    deduplicated_tracks = dict.fromkeys(tracks)
+
+    # one batch for the whole run, in case the cache is remote
+    await tracks_cache.prefetch(deduplicated_tracks)
+
+    # equivalent tracks are searched for once, w/ the first of them
+    equivalent_tracks: dict[MatchKey, list[Track]] = {}
+    for track in deduplicated_tracks:
+        equivalent_tracks.setdefault(match_key(track), []).append(track)
+    log.deduplicated(tracks_count=len(deduplicated_tracks), searches_count=len(equivalent_tracks))
+
+    total = len(equivalent_tracks)
     task_id = progress.add_task(task_description(querying="YouTube", color="red"), total=total)
 
-    youtube_tracks = await fetch_youtube_tracks(deduplicated_tracks, progress, task_id)
-    await tracks_cache.update_cached_tracks(youtube_tracks)
+    searched_tracks = [same_tracks[0] for same_tracks in equivalent_tracks.values()]
+    youtube_tracks = await fetch_youtube_tracks(searched_tracks, progress, task_id, client)
+    await tracks_cache.update_cached_tracks(fan_out(youtube_tracks, equivalent_tracks))
+
+
+def match_key(track: Track) -> MatchKey:
+    """
+    Tracks w/ the same key are the same song to search for,
+    they only differ in the casing or spacing of their name and artists (or in fields that aren't part of a track).
+    """
+    name = " ".join(track.name.casefold().split())
+    return name, track.duration, tuple(" ".join(artist.name.casefold().split()) for artist in track.artists)
+
+
+def fan_out(
+    youtube_tracks: t.Iterable[YouTubeTrack], equivalent_tracks: dict[MatchKey, list[Track]]
+) -> list[YouTubeTrack]:
+    """
+    The YouTube tracks of every track, from the ones of the tracks that were searched for.
+    """
+    fanned_out: list[YouTubeTrack] = []
+    for youtube_track in youtube_tracks:
+        _, *other_tracks = equivalent_tracks[match_key(youtube_track)]
+        fanned_out.append(youtube_track)
+        fanned_out.extend(
+            youtube_track.replace(name=track.name, duration=track.duration, artists=track.artists, isrc=track.isrc)
+            for track in other_tracks
+        )
+    return fanned_out
 
+
+async def match_tracks_offline(tracks: t.Iterable[Track]) -> list[Track]:
+    """
+    Match the tracks from the cache only, w/o searching YouTube Music.
+    Returns the distinct tracks that aren't cached, ie. new tracks and tracks that were skipped when searched for.
+    """
+    await tracks_cache.load()
+
+    deduplicated_tracks = dict.fromkeys(tracks)
+    await tracks_cache.prefetch(deduplicated_tracks)
+
+    misses: list[Track] = []
+    for track in deduplicated_tracks:
+        if await tracks_cache.lookup_youtube_track(track) is None:
+            misses.append(track)
+            log.skipping(text=track.colorized_query, reason="Not Cached")
+
+    return misses
+
+
+async def convert_to_youtube(
+    playlists: tuple[Playlist, ...],
+    liked_tracks: tuple[Track, ...],
+) -> tuple[tuple[YouTubePlaylist, ...], tuple[YouTubeTrack, ...]]:
+    """
+    Convert already matched (see `match_tracks`) playlists and liked tracks to their YouTube tracks.
+    """
     youtube_liked_tracks = await convert_tracks_to_youtube_tracks(liked_tracks)
     if youtube_liked_tracks:
-        rich.print(
-            loaded_message(
-                source="YouTube",
-                loaded="Liked Songs",
-                tracks_count=len(youtube_liked_tracks),
-                color="red",
-            )
+        log.loaded(
+            source="YouTube",
+            loaded="Liked Songs",
+            tracks_count=len(youtube_liked_tracks),
+            color="red",
         )
 
     youtube_playlists = await convert_playlists_to_youtube_playlists(playlists)
     for youtube_playlist in youtube_playlists:
-        rich.print(
-            loaded_message(
-                source="YouTube",
-                loaded="Playlist",
-                name=youtube_playlist.name,
-                color="red",
-            )
+        log.loaded(
+            source="YouTube",
+            loaded="Playlist",
+            name=youtube_playlist.name,
+            color="red",
         )
 
     return youtube_playlists, youtube_liked_tracks
@@ -121,44 +193,42 @@ def youtube_music_search_options(
     return options
 
 
-async def convert_track_to_youtube_track(
-    track: Track, client: httpx.AsyncClient, progress: Progress, task_id: TaskID
-) -> YouTubeTrack | None:
-    cached_tracks_dict: dict[Track, YouTubeTrack] = await tracks_cache.load_cached_tracks_dict()
-    cached_tracks: set[Track] = await tracks_cache.load_cached_tracks()
+def best_youtube_music_result(track: Track, content: bytes) -> tuple[YouTubeMusicResult | None, float]:
+    """
+    Parse a raw YouTube Music search response and pick the best scoring result for the track.
+    This is the CPU-bound part of matching a track, so it may be run in another process (see `offload`).
+    """
+    youtube_music_search = ytmusic.parse_search_response(content)
+    options = youtube_music_search_options(track, youtube_music_search)
 
-    def advance() -> None:
-        return progress.advance(task_id, advance=1)
+    if not options:
+        return None, 0
 
-    if track in cached_tracks:
-        advance()
-        return cached_tracks_dict[track]
+    youtube_music_result = options[0]
+    return youtube_music_result, youtube_result_score(youtube_music_result, track)
 
-    youtube_music_search = await ytmusic.search_music(track.query, client=client)
 
-    if not youtube_music_search:
+async def convert_track_to_youtube_track(
+    track: Track, client: httpx.AsyncClient, advance: log.ThrottledAdvance
+) -> YouTubeTrack | None:
+    cached_youtube_track = await tracks_cache.lookup_youtube_track(track)
+    if cached_youtube_track is not None:
         advance()
-        rich.print(skipping_message(text=track.colorized_query, reason="No Results"))
-        return None
+        return cached_youtube_track
 
-    options = youtube_music_search_options(track, youtube_music_search)
+    content = await ytmusic.search_music_raw(track.query, client=client)
+    youtube_music_result, top_score = await offload.run(best_youtube_music_result, track, content)
 
-    if not options:
+    if not youtube_music_result:
         advance()
-        rich.print(skipping_message(text=track.colorized_query, reason="No Results"))
+        log.skipping(text=track.colorized_query, reason="No Results")
         return None
 
-    youtube_music_result = options[0]
-    top_score = youtube_result_score(youtube_music_result, track)
-
-    # value might need to be tweaked later
-    if top_score < 1:
+    if top_score < MATCH_THRESHOLD:
         advance()
-        rich.print(
-            skipping_message(
-                text=track.colorized_query,
-                reason=f"Low Score: [white]{round(top_score, 3)}[/white]",
-            )
+        log.skipping(
+            text=track.colorized_query,
+            reason=f"Low Score: [white]{round(top_score, 3)}[/white]",
         )
         return None
 
@@ -180,6 +250,7 @@ async def convert_track_to_youtube_track(
         youtube_artists=tuple(Artist(name=x.name) for x in youtube_music_result.artists),
         album_name=album_name,
         is_explicit=is_explicit,
+        isrc=track.isrc,
         video_id=youtube_music_result.video_id,
     )
 
@@ -187,19 +258,30 @@ async def convert_track_to_youtube_track(
     return youtube_track
 
 
+def create_search_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=60)
+
+
 async def fetch_youtube_tracks(
-    tracks: t.Iterable[Track], progress: Progress, task_id: TaskID
+    tracks: t.Iterable[Track], progress: Progress, task_id: TaskID, client: httpx.AsyncClient | None = None
 ) -> tuple[YouTubeTrack, ...]:
-    async with httpx.AsyncClient(timeout=60) as client:
-        youtube_tracks_tasks: list[asyncio.Task[YouTubeTrack | None]] = []
+    if client is None:
+        async with create_search_client() as new_client:
+            return await fetch_youtube_tracks(tracks, progress, task_id, new_client)
 
-        for track in tracks:
-            coro = convert_track_to_youtube_track(track=track, client=client, progress=progress, task_id=task_id)
-            task = asyncio.create_task(coro)
-            youtube_tracks_tasks.append(task)
+    youtube_tracks_tasks: list[asyncio.Task[YouTubeTrack | None]] = []
+    advance = log.ThrottledAdvance(progress, task_id)
+
+    for track in tracks:
+        coro = convert_track_to_youtube_track(track=track, client=client, advance=advance)
+        task = asyncio.create_task(coro)
+        youtube_tracks_tasks.append(task)
 
+    try:
         youtube_tracks_or_null: list[YouTubeTrack | None] = await asyncio.gather(*youtube_tracks_tasks)
-        youtube_tracks: tuple[YouTubeTrack, ...] = tuple(x for x in youtube_tracks_or_null if x is not None)
+    finally:
+        advance.flush()
+    youtube_tracks: tuple[YouTubeTrack, ...] = tuple(x for x in youtube_tracks_or_null if x is not None)
 
     return youtube_tracks
 
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import contextlib
+import json
 import time
 import typing as t
 
@@ -117,6 +118,15 @@ async def search_music(
     """
     Search YouTube music for a query.
     """
+    content = await search_music_raw(query, client)
+    return parse_search_response(content)
+
+
+async def search_music_raw(query: str, client: httpx.AsyncClient) -> bytes:
+    """
+    Search YouTube music for a query and return the raw response body,
+    so it can be parsed outside of the event loop.
+    """
 
     body = {"context": YT_MUSIC_CONTEXT, "query": query}
     url = YT_MUSIC_BASE_API + "search"
@@ -127,7 +137,11 @@ async def search_music(
         params=YT_MUSIC_PARAMS,
         headers=YT_MUSIC_HEADERS,
     )
-    data = resp.json()
+    return resp.content
+
+
+def parse_search_response(content: bytes) -> YouTubeMusicSearch | None:
+    data = json.loads(content)
 
     if "error" in data:
         raise YouTubeMusicSearchError(data["error"])
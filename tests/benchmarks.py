@@ -0,0 +1,66 @@
+"""
+Benchmarks that are too slow or too noisy for the test suite, run w/ `python -m tests.benchmarks`.
+The tests only check that the fast paths give the same results as the slow ones.
+"""
+from __future__ import annotations
+
+import contextlib
+import timeit
+import tracemalloc
+
+import pydantic
+
+from spotify_to_musi import musi, spotify
+from spotify_to_musi.typings.spotify import SpotifyTrack
+from tests.spotify_items import playlist_items
+from tests.tracks import make_library
+
+
+def extraction() -> None:
+    items = playlist_items(10_000)
+
+    def extract() -> None:
+        spotify.spotify_track_items_to_tracks(items)
+
+    def validate() -> None:
+        for item in items:
+            with contextlib.suppress(pydantic.ValidationError):
+                spotify.covert_spotify_track_to_track(SpotifyTrack(**item["track"]))
+
+    # best of a few runs, so neither is measured on a cold heap
+    extract_time = min(timeit.repeat(extract, number=1, repeat=3))
+    validate_time = min(timeit.repeat(validate, number=1, repeat=3))
+
+    print(f"10k spotify items: extracted in {extract_time * 1000:.1f}ms, validated in {validate_time * 1000:.1f}ms")
+
+
+def conversion_memory() -> None:
+    playlists, liked_tracks = make_library(100_000, playlist_size=2_000)
+
+    tracemalloc.start()
+    try:
+        # every playlist and the library converted on their own, w/ a copy of a track per occurrence
+        copied = (
+            musi.convert_playlists_to_musi_playlists(playlists),
+            musi.covert_youtube_tracks_to_musi_library(liked_tracks),
+        )
+        _, copied_peak = tracemalloc.get_traced_memory()
+        del copied
+        tracemalloc.reset_peak()
+
+        shared = musi.convert_from_youtube(playlists, liked_tracks)
+        _, shared_peak = tracemalloc.get_traced_memory()
+        del shared
+    finally:
+        tracemalloc.stop()
+
+    print(f"100k tracks to musi: {copied_peak / 2**20:.1f}MiB w/ copies, {shared_peak / 2**20:.1f}MiB shared")
+
+
+def main() -> None:
+    extraction()
+    conversion_memory()
+
+
+if __name__ == "__main__":
+    main()
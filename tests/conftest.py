@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+import typing as t
+
+import pytest
+
+from spotify_to_musi import backup_ledger, paths, tracks_cache
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+
+@pytest.fixture()
+def data_dir(tmp_path: pathlib.Path) -> t.Iterator[pathlib.Path]:
+    paths.set_data_dir(tmp_path)
+    tracks_cache.unload()
+    backup_ledger.unload()
+    try:
+        yield tmp_path
+    finally:
+        tracks_cache.configure()
+        tracks_cache.unload()
+        backup_ledger.unload()
+        paths.set_data_dir(None)
@@ -0,0 +1,46 @@
+"""Builders for synthetic Spotify playlist items, w/ the fields requested by `spotify.PLAYLIST_TRACKS_FIELDS`."""
+from __future__ import annotations
+
+import typing as t
+
+
+def playlist_item(
+    index: int,
+    *,
+    artists: tuple[str, ...] | None = None,
+    album: str | None = None,
+    is_local: bool = False,
+) -> dict[str, t.Any]:
+    return {
+        "track": {
+            "name": f"Track {index}",
+            "duration_ms": 180_000 + index * 1000,
+            "explicit": index % 2 == 0,
+            "is_local": is_local,
+            "artists": [{"name": name} for name in (artists or (f"Artist {index % 100}",))],
+            "album": {
+                "album_type": "album" if album else "single",
+                "name": album or f"Track {index}",
+                "total_tracks": 12 if album else 1,
+            },
+            "external_ids": {"isrc": f"XX00000{index:05}"},
+        }
+    }
+
+
+def playlist_items(count: int) -> list[dict[str, t.Any]]:
+    """
+    A playlist's items, w/ a mix of singles, album tracks, features, and the odd blank and local track.
+    """
+    items: list[dict[str, t.Any]] = []
+    for index in range(count):
+        if index % 500 == 499:
+            # 'various artists' tracks, where spotify's api leaves the names blank
+            items.append(playlist_item(index, artists=("",), album=""))
+        elif index % 1000 == 998:
+            items.append(playlist_item(index, is_local=True))
+        elif index % 10 == 0:
+            items.append(playlist_item(index, artists=(f"Artist {index % 100}", "Featured Artist")))
+        else:
+            items.append(playlist_item(index, album="Album" if index % 3 else None))
+    return items
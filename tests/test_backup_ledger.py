@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import typing as t
+
+import httpx
+import pytest
+
+from spotify_to_musi import backup_ledger, musi
+from spotify_to_musi.typings.youtube import YouTubePlaylist
+from tests.tracks import make_track, youtube_track
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+
+class FakeMusi:
+    """Stands in for the Musi backup API, w/ a new code per upload."""
+
+    def __init__(self: FakeMusi) -> None:
+        self.uploads = 0
+        self.client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+
+    def handle(self: FakeMusi, request: httpx.Request) -> httpx.Response:
+        self.uploads += 1
+        return httpx.Response(200, json={"code": f"code{self.uploads}", "diff": True, "success": "Success"})
+
+    async def upload(self: FakeMusi, playlist_name: str = "Playlist", *, force: bool = False) -> str:
+        # converted again for every upload, like a new run would, so the dates change
+        tracks = tuple(youtube_track(make_track(index), f"video{index}") for index in range(3))
+        playlist = YouTubePlaylist(id="playlist", name=playlist_name, cover_image_url=None, tracks=tracks)
+        musi_playlists, musi_library = musi.convert_from_youtube((playlist,), tracks[:1])
+
+        musi_response = await musi.upload_to_musi(musi_playlists, musi_library, self.client, force=force)
+        return musi_response.code
+
+
+@pytest.mark.asyncio
+async def test_reuses_unchanged_uploads(data_dir: pathlib.Path) -> None:
+    fake_musi = FakeMusi()
+
+    assert await fake_musi.upload() == "code1"
+    assert await fake_musi.upload() == "code1"
+    assert fake_musi.uploads == 1
+
+    # the playlist's name isn't part of the uuid, but it's part of the backup
+    assert await fake_musi.upload("Renamed Playlist") == "code2"
+    assert await fake_musi.upload(force=True) == "code3"
+    assert fake_musi.uploads == 3
+
+    # the ledger is kept in the data directory, and the latest upload of a backup wins
+    backup_ledger.unload()
+    assert await fake_musi.upload() == "code3"
+    assert await fake_musi.upload("Renamed Playlist") == "code2"
+    assert fake_musi.uploads == 3
+
+
+@pytest.mark.asyncio
+async def test_skips_unreadable_lines(data_dir: pathlib.Path) -> None:
+    fake_musi = FakeMusi()
+    assert await fake_musi.upload() == "code1"
+
+    ledger_path = data_dir / "musi-backups.jsonl"
+    ledger_path.write_text("not json\n" + ledger_path.read_text() + '{"uuid": "truncated"\n')
+    backup_ledger.unload()
+
+    assert await fake_musi.upload() == "code1"
+    assert fake_musi.uploads == 1
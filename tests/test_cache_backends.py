@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import subprocess
+import sys
+import typing as t
+
+import pytest
+
+from spotify_to_musi import cache_export, tracks_cache
+from spotify_to_musi.cache_backends import KeyValueBackend, backend_from_url
+from spotify_to_musi.exceptions import RemoteCacheError
+from spotify_to_musi.kv_client import MemoryKeyValueStore, RedisClient
+from tests.tracks import make_track, youtube_track
+
+if t.TYPE_CHECKING:
+    import pathlib
+    from collections.abc import Iterator
+
+
+@pytest.fixture()
+def store() -> Iterator[MemoryKeyValueStore]:
+    kv_store = MemoryKeyValueStore()
+    tracks_cache.set_backend(KeyValueBackend(kv_store))
+    try:
+        yield kv_store
+    finally:
+        tracks_cache.set_backend(None)
+
+
+def switch_worker(kv_store: MemoryKeyValueStore) -> None:
+    # a fresh process on another machine, sharing the same store
+    tracks_cache.set_backend(KeyValueBackend(kv_store))
+
+
+@pytest.mark.asyncio
+async def test_shared_between_workers(store: MemoryKeyValueStore) -> None:
+    tracks = [make_track(i) for i in range(50)]
+    await tracks_cache.update_cached_tracks([youtube_track(track, f"video{i}") for i, track in enumerate(tracks)])
+    assert store.requests == 1
+
+    switch_worker(store)
+    store.requests = 0
+
+    await tracks_cache.prefetch(tracks)
+    matched = await tracks_cache.match_tracks_to_youtube_tracks(tracks)
+
+    assert [yt.video_id for yt in matched] == [f"video{i}" for i in range(50)]
+    # the whole run is fetched in one batch
+    assert store.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_remote_isrc_lookup(store: MemoryKeyValueStore) -> None:
+    single = make_track(1)
+    await tracks_cache.update_cached_tracks([youtube_track(single, "video")])
+
+    switch_worker(store)
+    album_version = single.replace(name=f"{single.name} (Remastered)", album_name="Album")
+    await tracks_cache.prefetch([album_version])
+
+    found = await tracks_cache.lookup_youtube_track(album_version)
+    assert found is not None
+    assert found.video_id == "video"
+
+
+@pytest.mark.asyncio
+async def test_prefetch_skips_tracks_in_memory(store: MemoryKeyValueStore) -> None:
+    track = make_track(1)
+    await tracks_cache.update_cached_tracks([youtube_track(track, "video")])
+    store.requests = 0
+
+    await tracks_cache.prefetch([track])
+
+    assert store.requests == 0
+
+
+@pytest.mark.asyncio
+async def test_evicted_matches_are_stored(store: MemoryKeyValueStore) -> None:
+    tracks_cache.configure(max_size=5)
+    try:
+        tracks = [make_track(i) for i in range(10)]
+        await tracks_cache.update_cached_tracks([youtube_track(track, f"video{i}") for i, track in enumerate(tracks)])
+        assert len(await tracks_cache.load()) < 10
+
+        # eviction only bounds what a worker keeps in memory, the shared store evicts on its own
+        switch_worker(store)
+        await tracks_cache.prefetch(tracks)
+        matched = await tracks_cache.match_tracks_to_youtube_tracks(tracks)
+        assert [yt.video_id for yt in matched] == [f"video{i}" for i in range(10)]
+    finally:
+        tracks_cache.configure()
+
+
+class FakeRedisServer:
+    """Just enough of a redis server to test the client against, w/ MGET and MSET."""
+
+    def __init__(self: FakeRedisServer) -> None:
+        self.data: dict[bytes, bytes] = {}
+
+    async def read_command(self: FakeRedisServer, reader: asyncio.StreamReader) -> list[bytes]:
+        count = int((await reader.readline())[1:-2])
+        args: list[bytes] = []
+        for _ in range(count):
+            length = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(length + 2))[:-2])
+        return args
+
+    async def handle(self: FakeRedisServer, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while not reader.at_eof():
+            try:
+                command, *args = await self.read_command(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                break
+
+            if command == b"MSET":
+                for index in range(0, len(args), 2):
+                    self.data[args[index]] = args[index + 1]
+                writer.write(b"+OK\r\n")
+            elif command == b"MGET":
+                writer.write(b"*%d\r\n" % len(args))
+                for key in args:
+                    value = self.data.get(key)
+                    writer.write(b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value))
+            else:
+                writer.write(b"-ERR unknown command\r\n")
+            await writer.drain()
+
+        writer.close()
+
+
+@pytest.mark.asyncio
+async def test_redis_client() -> None:
+    fake_server = FakeRedisServer()
+    server = await asyncio.start_server(fake_server.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    client = RedisClient(host="127.0.0.1", port=port)
+    try:
+        await client.mset({"a": b"1", "b": b"\r\n binary \x00"})
+        assert await client.mget(["a", "missing", "b"]) == [b"1", None, b"\r\n binary \x00"]
+    finally:
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_redis_client_timeout() -> None:
+    async def never_reply(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(never_reply, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+
+    client = RedisClient(host="127.0.0.1", port=port, timeout=0.05)
+    try:
+        with pytest.raises(RemoteCacheError, match="no reply"):
+            await client.mget(["a"])
+    finally:
+        await client.close()
+        server.close()
+        await server.wait_closed()
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("data_dir")
+async def test_unreachable_cache_url() -> None:
+    tracks_cache.set_backend(backend_from_url(f"redis://127.0.0.1:{unused_port()}"))
+    try:
+        with pytest.raises(RemoteCacheError, match="can't reach"):
+            await tracks_cache.update_cached_tracks([youtube_track(make_track(1), "video1")])
+    finally:
+        tracks_cache.set_backend(None)
+
+
+@pytest.mark.asyncio
+async def test_unreachable_cache_url_fails_the_command(data_dir: pathlib.Path) -> None:
+    await tracks_cache.update_cached_tracks([youtube_track(make_track(1), "video1")])
+    export_path = data_dir / "cache.stm"
+    await cache_export.export_cache(export_path)
+
+    command = [
+        sys.executable,
+        "-m",
+        "spotify_to_musi",
+        "--data-dir",
+        str(data_dir),
+        "--cache-url",
+        f"redis://127.0.0.1:{unused_port()}",
+        "cache",
+        "import",
+        str(export_path),
+    ]
+    proc = subprocess.run(command, capture_output=True, text=True, check=True)  # noqa: S603
+
+    assert "Failed to import cache." in proc.stdout
+    assert "Traceback" not in proc.stdout + proc.stderr
+
+
+def test_backend_from_url() -> None:
+    auth = "hunter2"
+    backend = backend_from_url(f"redis://:{auth}@cache.internal:6380/2")
+
+    assert isinstance(backend, KeyValueBackend)
+    assert isinstance(backend.client, RedisClient)
+    assert (backend.client.host, backend.client.port, backend.client.db) == ("cache.internal", 6380, 2)
+    assert backend.client.password == auth
+
+    with pytest.raises(ValueError, match="Unsupported cache url"):
+        backend_from_url("ftp://cache.internal")
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import typing as t
+import zlib
+
+import pytest
+
+from spotify_to_musi import cache_export, paths, tracks_cache
+from spotify_to_musi.exceptions import CacheFormatError
+from tests.tracks import make_track, youtube_track
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+pytestmark = pytest.mark.usefixtures("data_dir")
+
+
+def switch_data_dir(path: pathlib.Path) -> None:
+    paths.set_data_dir(path)
+    tracks_cache.unload()
+
+
+@pytest.mark.asyncio
+async def test_export_import_round_trip(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # more than one frame
+    monkeypatch.setattr(cache_export, "FRAME_SIZE", 7)
+    tracks = [make_track(i) for i in range(20)]
+    await tracks_cache.update_cached_tracks([youtube_track(track, f"video{i}") for i, track in enumerate(tracks)])
+
+    export_path = tmp_path / "cache.stm"
+    assert await cache_export.export_cache(export_path) == 20
+
+    switch_data_dir(tmp_path / "other-worker")
+    await tracks_cache.update_cached_tracks([youtube_track(tracks[0], "video0")])
+
+    merges = 0
+    merge_entries = tracks_cache.merge_entries
+
+    async def count_merges(entries: t.Iterable[tracks_cache.CacheEntry]) -> int:
+        nonlocal merges
+        merges += 1
+        return await merge_entries(entries)
+
+    monkeypatch.setattr(tracks_cache, "merge_entries", count_merges)
+    assert await cache_export.import_cache(export_path) == (20, 19)
+    # every frame is merged (and stored) at once
+    assert merges == 1
+
+    # persisted by appending to the journal, not rewriting it
+    tracks_cache.unload()
+    matched = await tracks_cache.match_tracks_to_youtube_tracks(tracks)
+    assert [yt.video_id for yt in matched] == [f"video{i}" for i in range(20)]
+
+
+@pytest.mark.asyncio
+async def test_import_keeps_newer_matches(tmp_path: pathlib.Path) -> None:
+    track = make_track(1)
+    await tracks_cache.update_cached_tracks([youtube_track(track, "old")])
+
+    export_path = tmp_path / "cache.stm"
+    await cache_export.export_cache(export_path)
+
+    await tracks_cache.update_cached_tracks([youtube_track(track, "new")])
+
+    assert await cache_export.import_cache(export_path) == (1, 0)
+    found = await tracks_cache.lookup_youtube_track(track)
+    assert found is not None
+    assert found.video_id == "new"
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_invalid_files(tmp_path: pathlib.Path) -> None:
+    not_an_export = tmp_path / "cache.json"
+    not_an_export.write_text("[]")
+
+    with pytest.raises(CacheFormatError):
+        await cache_export.import_cache(not_an_export)
+
+    await tracks_cache.update_cached_tracks([youtube_track(make_track(1), "video")])
+    truncated = tmp_path / "truncated.stm"
+    await cache_export.export_cache(truncated)
+    truncated.write_bytes(truncated.read_bytes()[:-4])
+
+    with pytest.raises(CacheFormatError):
+        await cache_export.import_cache(truncated)
+
+    corrupt_frame = tmp_path / "corrupt.stm"
+    frame = b"not json"
+    corrupt_frame.write_bytes(
+        cache_export.HEADER.pack(cache_export.MAGIC, cache_export.FORMAT_VERSION)
+        + zlib.compress(cache_export.FRAME_LENGTH.pack(len(frame)) + frame)
+    )
+
+    with pytest.raises(CacheFormatError, match="corrupt frame"):
+        await cache_export.import_cache(corrupt_frame)
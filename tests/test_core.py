@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import gc
+import pickle
+import tracemalloc
+
+import pytest
+
+from spotify_to_musi.typings.core import Artist, Track
+
+# bytes per track (w/ two artists, including the track's name) for a 100k track library.
+# frozen pydantic dataclasses took ~940 bytes per track, the slotted core models take ~230.
+TRACK_MEMORY_BUDGET = 400
+LIBRARY_SIZE = 100_000
+
+
+def make_track(index: int) -> Track:
+    return Track(
+        name=f"Track {index}",
+        duration=120 + index % 180,
+        artists=(Artist(name=f"Artist {index % 5_000}"), Artist(name=f"Artist {index * 7 % 5_000}")),
+        album_name=None,
+        is_explicit=index % 2 == 0,
+        isrc=None,
+    )
+
+
+def test_track_identity() -> None:
+    track = make_track(1)
+    same_track_on_album = track.replace(album_name="Album", isrc="USUM71805631")
+
+    assert track == same_track_on_album
+    assert hash(track) == hash(same_track_on_album)
+    assert track != track.replace(duration=track.duration + 1)
+    assert pickle.loads(pickle.dumps(track)) == track  # noqa: S301
+
+
+def test_artists_are_interned() -> None:
+    assert Artist(name="Baby Keem") is Artist(name="Baby Keem")
+    assert pickle.loads(pickle.dumps(Artist(name="Baby Keem"))) is Artist(name="Baby Keem")  # noqa: S301
+
+
+def test_unused_artists_are_released() -> None:
+    artist = Artist(name="Once In A Watch")
+    assert "Once In A Watch" in Artist._interned
+
+    del artist
+    gc.collect()
+    assert "Once In A Watch" not in Artist._interned
+
+
+def test_track_is_immutable() -> None:
+    track = make_track(1)
+
+    with pytest.raises(AttributeError):
+        track.name = "Another Track"  # type: ignore[misc]
+
+
+def test_track_memory() -> None:
+    tracemalloc.start()
+    try:
+        tracks = [make_track(index) for index in range(LIBRARY_SIZE)]
+        memory, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert memory / len(tracks) < TRACK_MEMORY_BUDGET
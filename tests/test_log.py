@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import typing as t
+
+import pytest
+from rich.progress import Progress
+
+from spotify_to_musi import log
+
+if t.TYPE_CHECKING:
+    from pathlib import Path
+
+
+@pytest.fixture(autouse=True)
+def reset_log() -> t.Iterator[None]:
+    yield
+    log.configure()
+
+
+def test_jsonl(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    log_path = tmp_path / "log.jsonl"
+    log.configure(log_format="jsonl", log_path=log_path)
+
+    log.loaded(source="Spotify", loaded="Playlist", color="green", name="[white]Mix[/white]", tracks_count=3)
+    log.skipping(text="[white]Song[/white]", reason="[yellow1]Low Score: 0.4[/yellow1]")
+    log.close()
+
+    events = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [event["event"] for event in events] == ["loaded", "skipped"]
+    assert events[0]["name"] == "Mix"
+    assert events[0]["tracks_count"] == 3
+    assert events[1]["text"] == "Song"
+    assert events[1]["reason"] == "Low Score: 0.4"
+    # nothing is printed w/ rich
+    assert capsys.readouterr().out == ""
+
+
+def test_quiet_summary(capsys: pytest.CaptureFixture[str]) -> None:
+    log.configure(quiet=True)
+
+    for score in (0.1, 0.2, 0.3):
+        log.skipping(text="Song", reason=f"Low Score: {score}")
+    log.skipping(text="Song", reason="Not found.")
+    log.deduplicated(tracks_count=10, searches_count=7)
+    assert capsys.readouterr().out == ""
+
+    log.print_summary()
+    out = capsys.readouterr().out
+    assert "SKIPPED: 3 [Low Score]" in out
+    assert "SKIPPED: 1 [Not found.]" in out
+    assert "DEDUPLICATED: 3 YouTube searches saved" in out
+    # the counters are reset for the next run
+    assert not log.skipped
+
+
+def test_throttled_advance() -> None:
+    with Progress(disable=True) as progress:
+        task_id = progress.add_task("tracks", total=1000)
+        advance = log.ThrottledAdvance(progress, task_id, interval=60)
+
+        for _ in range(1000):
+            advance()
+        assert progress.tasks[0].completed == 0
+
+        advance.flush()
+        assert progress.tasks[0].completed == 1000
+
+
+def test_run_messages(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    log_path = tmp_path / "log.jsonl"
+    log.configure(log_format="jsonl", log_path=log_path)
+
+    log.rate_limited(seconds=1.5)
+    log.note(event="next_sync", text="Next sync at [white]12:00[/white].", at=0)
+    log.error(text="Sync failed.")
+    log.close()
+
+    events = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [event["event"] for event in events] == ["rate_limited", "next_sync", "error"]
+    assert events[0]["seconds"] == 1.5
+    assert events[1]["text"] == "Next sync at 12:00."
+    assert events[2]["text"] == "Sync failed."
+    assert capsys.readouterr().out == ""
+
+
+def test_quiet_only_prints_errors(capsys: pytest.CaptureFixture[str]) -> None:
+    log.configure(quiet=True)
+
+    log.rate_limited(seconds=1)
+    log.note(event="unchanged", text="No changes since the last upload.")
+    assert capsys.readouterr().out == ""
+
+    log.error(text="Sync failed.")
+    assert capsys.readouterr().out == "ERROR: Sync failed.\n"
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import typing as t
+
+import httpx
+import pytest
+
+from spotify_to_musi import main, musi, spotify, youtube
+from spotify_to_musi.exceptions import ManifestError
+from spotify_to_musi.manifest import TransferJob, load_manifest
+from spotify_to_musi.typings.core import Playlist
+from spotify_to_musi.typings.musi import MusiResponse
+from tests.tracks import make_track
+from tests.ytmusic_responses import FakeResult, search_response
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+    from spotify_to_musi.typings.core import Track
+    from spotify_to_musi.typings.musi import MusiPlaylist
+
+MANIFEST = """
+[[jobs]]
+name = "alice"
+user = true
+spotify_credentials = "alice/spotify-credentials.json"
+
+[[jobs]]
+name = "workout mixes"
+playlists = ["https://open.spotify.com/playlist/37i9dQZF1DX76Wlfdnj7AP", "37i9dQZF1DXdxcBWuJkbcy"]
+"""
+
+
+def write_manifest(tmp_path: pathlib.Path, text: str) -> pathlib.Path:
+    path = tmp_path / "jobs.toml"
+    path.write_text(text)
+    return path
+
+
+def test_load_manifest(tmp_path: pathlib.Path) -> None:
+    alice, mixes = load_manifest(write_manifest(tmp_path, MANIFEST))
+
+    assert alice.name == "alice"
+    assert alice.user
+    assert alice.playlists == []
+    # relative to the manifest, not the working directory
+    assert alice.spotify_credentials == tmp_path / "alice" / "spotify-credentials.json"
+
+    assert not mixes.user
+    assert len(mixes.playlists) == 2
+    assert mixes.spotify_credentials is None
+
+
+@pytest.mark.parametrize(
+    ("text", "reason"),
+    [
+        ("[[jobs]\nname = ", "Invalid manifest"),
+        ('[[jobs]]\nname = "empty"', "no playlist"),
+        ('[[jobs]]\nname = "a"\nuser = true\n[[jobs]]\nname = "a"\nuser = true', "unique"),
+        ("[[jobs]]\nuser = true", "jobs.0.name"),
+    ],
+)
+def test_invalid_manifest(tmp_path: pathlib.Path, text: str, reason: str) -> None:
+    with pytest.raises(ManifestError, match=reason):
+        load_manifest(write_manifest(tmp_path, text))
+
+
+def fake_transfer(monkeypatch: pytest.MonkeyPatch, job_tracks: dict[str, list[Track]]) -> list[str]:
+    """
+    Stands in for Spotify and YouTube Music, w/ a playlist per job. Returns the searches, as they're made.
+    """
+    tracks = {track.query: track for job in job_tracks.values() for track in job}
+    queries: list[str] = []
+
+    async def use_account(*args: t.Any) -> bool:
+        return True
+
+    async def query_spotify(
+        transfer_user_library: bool, extra_playlist_urls: list[str], *args: t.Any
+    ) -> tuple[tuple[Playlist, ...], tuple[()]]:
+        name = extra_playlist_urls[0]
+        return (Playlist(id=name, name=name, cover_image_url=None, tracks=tuple(job_tracks[name])),), ()
+
+    def search(request: httpx.Request) -> httpx.Response:
+        query = json.loads(request.content)["query"]
+        queries.append(query)
+        track = tracks[query]
+        duration = f"{track.duration // 60}:{track.duration % 60:02}"
+        result = FakeResult(track.name, (track.primary_artist.name,), duration, f"video-{track.name}")
+        return httpx.Response(200, json=search_response([result]))
+
+    monkeypatch.setattr(spotify, "use_account", use_account)
+    monkeypatch.setattr(spotify, "query_spotify", query_spotify)
+    monkeypatch.setattr(
+        youtube, "create_search_client", lambda: httpx.AsyncClient(transport=httpx.MockTransport(search))
+    )
+    return queries
+
+
+@pytest.mark.asyncio
+async def test_transfer_jobs_search_shared_tracks_once(
+    data_dir: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    tracks = [make_track(index) for index in range(3)]
+    # the second track is in both jobs
+    job_tracks = {"alice": tracks[:2], "bob": tracks[1:]}
+    queries = fake_transfer(monkeypatch, job_tracks)
+    uploads: dict[str, list[str]] = {}
+
+    async def upload_to_musi(musi_playlists: tuple[MusiPlaylist, ...], *args: t.Any, **kwargs: t.Any) -> MusiResponse:
+        uploads[musi_playlists[0].name] = [track.video_id for track in musi_playlists[0].tracks]
+        return MusiResponse(code=f"code{len(uploads)}", diff=False, success="Success")
+
+    monkeypatch.setattr(musi, "upload_to_musi", upload_to_musi)
+
+    await main.transfer_jobs([TransferJob(name=name, playlists=[name]) for name in job_tracks])
+
+    assert sorted(queries) == sorted(track.query for track in tracks)
+    assert uploads == {
+        "alice": ["video-Track 0", "video-Track 1"],
+        "bob": ["video-Track 1", "video-Track 2"],
+    }
+
+
+@pytest.mark.asyncio
+async def test_transfer_jobs_bound_uploads(data_dir: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    job_tracks = {f"job{index}": [make_track(index)] for index in range(6)}
+    fake_transfer(monkeypatch, job_tracks)
+    uploading = 0
+    max_uploading = 0
+
+    async def upload_to_musi(*args: t.Any, **kwargs: t.Any) -> MusiResponse:
+        nonlocal uploading, max_uploading
+        uploading += 1
+        max_uploading = max(max_uploading, uploading)
+        await asyncio.sleep(0.01)
+        uploading -= 1
+        return MusiResponse(code="code", diff=False, success="Success")
+
+    monkeypatch.setattr(musi, "upload_to_musi", upload_to_musi)
+
+    jobs = [TransferJob(name=name, playlists=[name]) for name in job_tracks]
+    await main.transfer_jobs(jobs, max_concurrent_uploads=2)
+
+    assert max_uploading == 2
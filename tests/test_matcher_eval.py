@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+import typing as t
+
+import httpx
+import pytest
+
+from spotify_to_musi import matcher_eval
+from spotify_to_musi.exceptions import CorpusFormatError
+from spotify_to_musi.typings.core import Artist, Track
+from tests.ytmusic_responses import FakeResult, search_response
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+TRACK = Track(
+    name="Back 2 Da Basic",
+    duration=159,
+    artists=(Artist(name="Summrs"),),
+    album_name="Back 2 Da Basic",
+    is_explicit=True,
+)
+SONG = FakeResult("Back 2 Da Basic", ("Summrs",), "2:39", "song", album="Back 2 Da Basic", is_explicit=True)
+COVER = FakeResult("Back 2 Da Basic (Cover)", ("Someone",), "3:30", "cover")
+
+
+def write_corpus(path: pathlib.Path, lines: t.Iterable[dict[str, t.Any]]) -> None:
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines))
+
+
+def corpus_line(expected_video_ids: list[str], results: list[FakeResult] | None) -> dict[str, t.Any]:
+    line: dict[str, t.Any] = {"track": TRACK.as_dict(), "expected_video_ids": expected_video_ids}
+    if results is not None:
+        line["response"] = search_response(results)
+    return line
+
+
+@pytest.mark.asyncio
+async def test_evaluate(tmp_path: pathlib.Path) -> None:
+    corpus_path = tmp_path / "corpus.jsonl"
+    write_corpus(
+        corpus_path,
+        [
+            corpus_line(["song"], [COVER, SONG]),
+            # the right song wasn't a result, the cover is too poor a match to be picked
+            corpus_line([], [COVER]),
+            corpus_line(["other"], [COVER, SONG]),
+            corpus_line(["cover"], [COVER]),
+        ],
+    )
+
+    report = matcher_eval.evaluate(await matcher_eval.load_corpus(corpus_path), repeat=3)
+
+    assert [result.outcome for result in report.results] == ["matched", "skipped", "mismatched", "missed"]
+    assert report.accuracy == 0.5
+    assert report.results_scored == 6
+    assert report.tracks_per_second > 0
+
+    buckets = {(bucket.low, bucket.high): (bucket.correct, bucket.incorrect) for bucket in report.buckets}
+    assert sum(correct + incorrect for correct, incorrect in buckets.values()) == 4
+    # the song's top score is the most there is
+    assert buckets[2, None] == (1, 1)
+
+
+def test_score_buckets() -> None:
+    case = matcher_eval.EvalCase(TRACK, ("song",), None)
+    results = [matcher_eval.result_of(case, "song", score) for score in (0.95, 1, 1.05)]
+
+    buckets = {(bucket.low, bucket.high): bucket.correct for bucket in matcher_eval.score_buckets(results)}
+
+    # a score of exactly the threshold is matched, so it's bucketed above it
+    assert buckets[0.9, 1] == 1
+    assert buckets[1, 1.1] == 2
+
+
+@pytest.mark.asyncio
+async def test_records_responses(tmp_path: pathlib.Path) -> None:
+    corpus_path = tmp_path / "corpus.jsonl"
+    write_corpus(corpus_path, [corpus_line(["song"], None), corpus_line(["cover"], [COVER])])
+    cases = await matcher_eval.load_corpus(corpus_path)
+
+    with pytest.raises(CorpusFormatError, match="no recorded response"):
+        matcher_eval.evaluate(cases)
+
+    searches: list[str] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        searches.append(json.loads(request.content)["query"])
+        return httpx.Response(200, json=search_response([SONG]))
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+        assert await matcher_eval.record_responses(cases, client) == 1
+    await matcher_eval.save_corpus(corpus_path, cases)
+
+    assert searches == [TRACK.query]
+    report = matcher_eval.evaluate(await matcher_eval.load_corpus(corpus_path))
+    assert [result.outcome for result in report.results] == ["matched", "missed"]
+
+
+@pytest.mark.asyncio
+async def test_load_corpus_errors(tmp_path: pathlib.Path) -> None:
+    corpus_path = tmp_path / "corpus.jsonl"
+    corpus_path.write_text(json.dumps(corpus_line(["song"], [SONG])) + "\n\n" + '{"track": {}}\n')
+
+    with pytest.raises(CorpusFormatError, match="line 3"):
+        await matcher_eval.load_corpus(corpus_path)
+
+    with pytest.raises(CorpusFormatError):
+        await matcher_eval.load_corpus(tmp_path / "missing.jsonl")
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import tracemalloc
+import typing as t
+import uuid
+
+import httpx
+import pytest
+
+from spotify_to_musi import musi
+from spotify_to_musi.typings.core import Artist, Track
+from spotify_to_musi.typings.musi import MusiLibrary, MusiTrack, MusiVideo
+from spotify_to_musi.typings.youtube import YouTubePlaylist
+from tests.tracks import make_library, youtube_track
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+# peak bytes per liked track (each in a playlist as well) while converting a 5k track library to musi.
+# sharing a musi track between the library and the playlists takes ~300, a copy per occurrence ~360
+# (which is checked on its own, as the sizes of objects vary between python versions).
+CONVERSION_MEMORY_BUDGET = 400
+CONVERSION_LIBRARY_SIZE = 5_000
+
+
+def test_convert_shares_tracks() -> None:
+    playlists, liked_tracks = make_library(10, playlist_size=5)
+
+    musi_playlists, musi_library = musi.convert_from_youtube(playlists, liked_tracks)
+
+    assert [track.video_id for track in musi_library.tracks] == [track.video_id for track in liked_tracks]
+    assert musi_playlists[1].tracks[0] is musi_library.tracks[5]
+
+
+def test_build_backup() -> None:
+    playlists, liked_tracks = make_library(10, playlist_size=5)
+    musi_playlists, musi_library = musi.convert_from_youtube(playlists, liked_tracks)
+
+    musi_uuid, payload, _ = musi.build_backup(musi_playlists, musi_library)
+
+    # the uuid is of every occurrence of a track, in the library and then in the playlists
+    musi_videos = [track.musi_video() for track in musi_library.tracks]
+    for musi_playlist in musi_playlists:
+        musi_videos.extend(track.musi_video() for track in musi_playlist.tracks)
+    assert musi_uuid == musi.generate_musi_uuid(musi_videos)
+
+    data = json.loads(payload)
+    assert len(data["playlist_items"]) == 10
+    assert [item["video_id"] for item in data["playlists"][1]["items"]] == [
+        f"video{index:07}" for index in range(5, 10)
+    ]
+
+    boundary, content = musi.encode_backup(musi_uuid, payload)
+    assert payload in content
+    assert content.endswith(f"--{boundary}--\n".encode())
+
+
+def test_payload_matches_json() -> None:
+    artists = (Artist(name="Ártist"),)
+    track, other_track = (
+        youtube_track(Track(name=name, duration=180, artists=artists, album_name=None, is_explicit=False), "video")
+        for name in ("Tráck", 'Other "Track"')
+    )
+    playlists = (
+        YouTubePlaylist(
+            id="1", name="Playlist", cover_image_url="https://i.scdn.co/image/1", tracks=(other_track, track)
+        ),
+        YouTubePlaylist(id="2", name="Plâylist", cover_image_url=None, tracks=(track,)),
+    )
+    musi_playlists, musi_library = musi.convert_from_youtube(playlists, (track,))
+    musi_track, musi_other_track = musi_library.tracks[0], musi_playlists[0].tracks[0]
+
+    payload = musi.build_backup(musi_playlists, musi_library).payload
+
+    def items(*musi_tracks: MusiTrack) -> list[dict[str, t.Any]]:
+        return [
+            {"cd": int(musi_track.created_date), "pos": index, "video_id": musi_track.video_id}
+            for index, musi_track in enumerate(musi_tracks)
+        ]
+
+    expected = {
+        "library": {"ot": "custom", "items": items(musi_track), "name": "My Library", "date": musi_library.date},
+        # a video is listed once, even for different tracks
+        "playlist_items": [musi_track.musi_video().dict()],
+        "playlists": [
+            {
+                "ot": "custom",
+                "items": items(musi_other_track, musi_track),
+                "name": "Playlist",
+                "type": "user",
+                "date": musi_playlists[0].date,
+                "ciu": "https://i.scdn.co/image/1",
+            },
+            {
+                "ot": "custom",
+                "items": items(musi_track),
+                "name": "Plâylist",
+                "type": "user",
+                "date": musi_playlists[1].date,
+            },
+        ],
+    }
+    assert payload == json.dumps(expected).encode()
+
+
+def test_uuid_matches_json_hash() -> None:
+    musi_videos = [
+        MusiVideo(video_id=f"video{index}", video_name=f'Tráck "{index}"', video_creator=creator, video_duration=index)
+        for index, creator in enumerate(["B", "A", "B", "Ä", "A", "B"])
+    ]
+    musi_videos.append(musi_videos[0])
+
+    # hashing the whole JSON list of the videos, sorted by creator
+    musi_video_dicts = [musi_video.dict(exclude={"created_date": True}) for musi_video in musi_videos]
+    musi_video_dicts.sort(key=lambda item: item["video_creator"])
+    md5_hash = hashlib.md5(json.dumps(musi_video_dicts).encode())  # noqa: S324
+
+    assert musi.generate_musi_uuid(musi_videos) == uuid.uuid3(uuid.NAMESPACE_OID, md5_hash.hexdigest())
+    assert musi.generate_musi_uuid([]) == uuid.uuid3(uuid.NAMESPACE_OID, hashlib.md5(b"[]").hexdigest())  # noqa: S324
+
+
+def test_shard_backup() -> None:
+    playlists, liked_tracks = make_library(10, playlist_size=2)
+    musi_playlists, musi_library = musi.convert_from_youtube(playlists, liked_tracks[:4])
+    playlist_size = musi.estimate_tracks_size(musi_playlists[0].tracks)
+
+    shards = musi.shard_backup(musi_playlists, musi_library, max_size=4 * playlist_size)
+
+    # the library is as large as 2 playlists, and only in the first backup
+    assert [[p.name for p in shard_playlists] for shard_playlists, _ in shards] == [
+        ["Playlist 0", "Playlist 2"],
+        ["Playlist 4", "Playlist 6", "Playlist 8"],
+    ]
+    assert [len(shard_library.tracks) for _, shard_library in shards] == [4, 0]
+
+    # a playlist that's over the budget gets a backup of its own
+    shards = musi.shard_backup(musi_playlists, MusiLibrary(tracks=()), max_size=playlist_size // 2)
+    assert [len(shard_playlists) for shard_playlists, _ in shards] == [1] * 5
+
+
+@pytest.mark.asyncio
+async def test_upload_shards(data_dir: pathlib.Path) -> None:
+    uploading = 0
+    max_uploading = 0
+    uploads: list[str] = []
+
+    async def handle(request: httpx.Request) -> httpx.Response:
+        nonlocal uploading, max_uploading
+        uploading += 1
+        max_uploading = max(max_uploading, uploading)
+        await asyncio.sleep(0.01)
+        uploading -= 1
+
+        uploads.append(f"code{len(uploads)}")
+        return httpx.Response(200, json={"code": uploads[-1], "diff": True, "success": "Success"})
+
+    playlists, _ = make_library(10, playlist_size=1)
+    musi_playlists, musi_library = musi.convert_from_youtube(playlists, ())
+    shards = [((musi_playlist,), musi_library) for musi_playlist in musi_playlists]
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+        backups = await musi.upload_shards(shards, client, max_concurrent_uploads=3)
+
+    assert max_uploading == 3
+    assert sorted(backup.code for backup in backups) == sorted(uploads)
+
+
+def test_conversion_memory() -> None:
+    playlists, liked_tracks = make_library(CONVERSION_LIBRARY_SIZE, playlist_size=1_000)
+
+    tracemalloc.start()
+    try:
+        shared = musi.convert_from_youtube(playlists, liked_tracks)
+        _, shared_peak = tracemalloc.get_traced_memory()
+        del shared
+        tracemalloc.reset_peak()
+
+        copied = (
+            musi.convert_playlists_to_musi_playlists(playlists),
+            musi.covert_youtube_tracks_to_musi_library(liked_tracks),
+        )
+        _, copied_peak = tracemalloc.get_traced_memory()
+        del copied
+    finally:
+        tracemalloc.stop()
+
+    assert shared_peak / CONVERSION_LIBRARY_SIZE < CONVERSION_MEMORY_BUDGET
+    assert shared_peak < copied_peak
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+import typing as t
+
+import httpx
+import pytest
+
+from spotify_to_musi import musi, musi_archive
+from spotify_to_musi.exceptions import ArchiveError
+from spotify_to_musi.typings.youtube import YouTubePlaylist
+from tests.tracks import make_track, youtube_track
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+    from spotify_to_musi.typings.musi import MusiLibrary, MusiPlaylist
+
+
+def convert(playlist_sizes: dict[str, int]) -> tuple[tuple[MusiPlaylist, ...], MusiLibrary]:
+    """
+    Playlists w/ the first tracks of the library (w/ new dates, like every run).
+    """
+    tracks = tuple(youtube_track(make_track(index), f"video{index}") for index in range(max(playlist_sizes.values())))
+    playlists = tuple(
+        YouTubePlaylist(id=name, name=name, cover_image_url=f"https://i.scdn.co/image/{name}", tracks=tracks[:size])
+        for name, size in playlist_sizes.items()
+    )
+    return musi.convert_from_youtube(playlists, tracks[:2])
+
+
+async def archive(playlist_sizes: dict[str, int]) -> str:
+    musi_playlists, musi_library = convert(playlist_sizes)
+    backup = musi.build_backup(musi_playlists, musi_library)
+    return await musi_archive.archive_backup(musi_playlists, musi_library, backup)
+
+
+def count_objects(data_dir: pathlib.Path) -> int:
+    return sum(1 for path in (data_dir / "musi-archive" / "objects").glob("*/*") if path.is_file())
+
+
+@pytest.mark.asyncio
+async def test_deduplicates_playlists(data_dir: pathlib.Path) -> None:
+    backup_id = await archive({"A": 3, "B": 4})
+    assert await archive({"A": 3, "B": 4}) == backup_id
+    # the library, and the 2 playlists
+    assert count_objects(data_dir) == 3
+
+    changed_backup_id = await archive({"A": 3, "B": 5, "C": 1})
+    assert changed_backup_id != backup_id
+    # only the changed playlist and the new one are stored
+    assert count_objects(data_dir) == 5
+
+    assert [b.id for b in await musi_archive.list_backups()] == [backup_id, changed_backup_id]
+    assert musi_archive.diff_backups(
+        await musi_archive.find_backup(backup_id), await musi_archive.find_backup(changed_backup_id[:8])
+    ) == musi_archive.BackupDiff(added=("C",), removed=(), changed=("B",), library_changed=False)
+
+
+@pytest.mark.asyncio
+async def test_restores_backup(data_dir: pathlib.Path) -> None:
+    musi_playlists, musi_library = convert({"A": 3, "B": 4})
+    backup = musi.build_backup(musi_playlists, musi_library)
+    backup_id = await musi_archive.archive_backup(musi_playlists, musi_library, backup)
+
+    restored_playlists, restored_library = await musi_archive.restore_backup(await musi_archive.find_backup(backup_id))
+    restored_backup = musi.build_backup(restored_playlists, restored_library)
+
+    assert restored_backup.uuid == backup.uuid
+    assert restored_backup.layout == backup.layout
+    assert [p.ciu for p in restored_playlists] == ["https://i.scdn.co/image/A", "https://i.scdn.co/image/B"]
+
+
+@pytest.mark.asyncio
+async def test_find_backup_errors(data_dir: pathlib.Path) -> None:
+    with pytest.raises(ArchiveError, match="no backup id"):
+        await musi_archive.find_backup("abcdef")
+
+    backup_id = await archive({"A": 1})
+    with pytest.raises(ArchiveError, match="at least"):
+        await musi_archive.find_backup(backup_id[:2])
+
+    object_path = next(path for path in (data_dir / "musi-archive" / "objects").glob("*/*"))
+    object_path.write_bytes(b"corrupt")
+    with pytest.raises(ArchiveError, match="missing or corrupt"):
+        await musi_archive.restore_backup(await musi_archive.find_backup(backup_id))
+
+
+@pytest.mark.asyncio
+async def test_archives_uploaded_backups(data_dir: pathlib.Path) -> None:
+    musi_playlists, musi_library = convert({"A": 2})
+    responses = [
+        httpx.Response(502, text="Bad Gateway"),
+        httpx.Response(200, json={"code": "code", "diff": True, "success": "Success"}),
+    ]
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+        with pytest.raises(json.JSONDecodeError):
+            await musi.upload_to_musi(musi_playlists, musi_library, client)
+        assert await musi_archive.list_backups() == []
+
+        await musi.upload_to_musi(musi_playlists, musi_library, client)
+        assert len(await musi_archive.list_backups()) == 1
+
+        # a reused code is of an uploaded backup as well
+        await musi.upload_to_musi(musi_playlists, musi_library, client)
+        assert len(await musi_archive.list_backups()) == 1
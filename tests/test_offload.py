@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import pytest
+
+from spotify_to_musi import offload
+from spotify_to_musi.typings.core import Artist, Track
+from spotify_to_musi.youtube import best_youtube_music_result
+from tests.ytmusic_responses import FakeResult, search_response_bytes
+
+TRACK = Track(
+    name="ORANGE SODA",
+    artists=(Artist(name="Baby Keem"),),
+    duration=129,
+    album_name="DIE FOR MY BITCH",
+    is_explicit=True,
+)
+
+RESPONSE = search_response_bytes(
+    [
+        FakeResult("ORANGE SODA (Official Video)", ("Baby Keem",), "2:31", "video", views="10M"),
+        FakeResult("ORANGE SODA", ("Baby Keem",), "2:09", "song", album="DIE FOR MY BITCH", is_explicit=True),
+        FakeResult("Orange Juice", ("Someone Else",), "3:09", "other", album="Fruit"),
+    ]
+)
+
+
+def test_best_youtube_music_result() -> None:
+    result, score = best_youtube_music_result(TRACK, RESPONSE)
+
+    assert result is not None
+    assert result.video_id == "song"
+    assert score >= 1
+
+
+def test_best_youtube_music_result_no_results() -> None:
+    assert best_youtube_music_result(TRACK, search_response_bytes([])) == (None, 0)
+
+
+@pytest.mark.asyncio
+async def test_offloaded_matches_inline() -> None:
+    inline = await offload.run(best_youtube_music_result, TRACK, RESPONSE)
+
+    with offload.executor(2):
+        offloaded = await offload.run(best_youtube_music_result, TRACK, RESPONSE)
+
+    assert offloaded == inline
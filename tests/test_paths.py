@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import typing as t
+
+import pytest
+
+from spotify_to_musi import paths
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+
+@pytest.fixture(autouse=True)
+def reset_data_dir() -> t.Iterator[None]:
+    paths.set_data_dir(None)
+    yield
+    paths.set_data_dir(None)
+
+
+def test_data_dir_precedence(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.delenv(paths.DATA_DIR_ENV_VAR, raising=False)
+    assert paths.stm_path() == paths._app_data() / "spotify-to-musi"
+
+    # the environment variable over the default
+    monkeypatch.setenv(paths.DATA_DIR_ENV_VAR, str(tmp_path / "env"))
+    paths.set_data_dir(None)
+    assert paths.stm_path() == tmp_path / "env"
+
+    # --data-dir over the environment variable
+    paths.set_data_dir(tmp_path / "flag")
+    assert paths.stm_path() == tmp_path / "flag"
+    assert paths.youtube_data_cache_path() == tmp_path / "flag" / "youtube-data-cache.jsonl"
+
+
+def test_data_dir_is_created_once(tmp_path: pathlib.Path) -> None:
+    data_dir = tmp_path / "data"
+    paths.set_data_dir(data_dir)
+
+    assert paths.stm_path().is_dir()
+
+    # resolved once, not created again on every path
+    data_dir.rmdir()
+    assert paths.musi_ledger_path() == data_dir / "musi-backups.jsonl"
+    assert not data_dir.exists()
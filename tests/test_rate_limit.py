@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import types
+import typing as t
+
+import pyfy.excs
+import pytest
+
+from spotify_to_musi import spotify
+from spotify_to_musi.rate_limit import TokenBucket
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_rate() -> None:
+    bucket = TokenBucket(rate=200, burst=5)
+    start = time.monotonic()
+
+    await asyncio.gather(*(bucket.acquire() for _ in range(25)))
+
+    # the burst is free, the other 20 calls are spaced out at the rate
+    assert time.monotonic() - start >= 20 / 200 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_pause() -> None:
+    bucket = TokenBucket(rate=1000, burst=10)
+    waiting = [asyncio.create_task(bucket.acquire()) for _ in range(50)]
+    await asyncio.sleep(0)
+
+    start = time.monotonic()
+    assert bucket.pause(0.1)
+    # overlapping pauses don't start a new one
+    assert not bucket.pause(0.05)
+
+    await asyncio.gather(*waiting)
+    assert time.monotonic() - start >= 0.1 * 0.9
+
+
+def rate_limited(retry_after: str) -> pyfy.excs.ApiError:
+    response = types.SimpleNamespace(status_code=429, headers={"Retry-After": retry_after})
+    return pyfy.excs.ApiError(msg="rate limited", http_response=response, http_request=types.SimpleNamespace())
+
+
+@pytest.mark.asyncio
+async def test_call_retries_after_429(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(spotify, "rate_limiter", TokenBucket(rate=1000, burst=10))
+    calls = 0
+
+    async def playlist_tracks(playlist_id: str) -> dict[str, t.Any]:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise rate_limited("0.05")
+        return {"items": [playlist_id]}
+
+    start = time.monotonic()
+    assert await spotify.call(playlist_tracks, playlist_id="id") == {"items": ["id"]}
+
+    assert calls == 2
+    assert time.monotonic() - start >= 0.05 * 0.9
+
+
+@pytest.mark.asyncio
+async def test_call_gives_up(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(spotify, "rate_limiter", TokenBucket(rate=1000, burst=10))
+
+    async def me() -> t.NoReturn:
+        raise rate_limited("0")
+
+    with pytest.raises(pyfy.excs.ApiError):
+        await spotify.call(me)
+
+
+def test_retry_after() -> None:
+    assert spotify.retry_after(rate_limited("3")) == 3
+    assert spotify.retry_after(rate_limited("soon")) == spotify.DEFAULT_RETRY_AFTER
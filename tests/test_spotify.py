@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import pydantic
+import pytest
+
+from spotify_to_musi import spotify
+from spotify_to_musi.typings.core import Artist
+from tests.spotify_items import playlist_item, playlist_items
+
+
+def test_convert_playlist_items() -> None:
+    album_track, single = spotify.spotify_track_items_to_tracks(
+        [playlist_item(1, album="Album", artists=("Artist", "Featured Artist")), playlist_item(2)]
+    )
+
+    assert album_track.name == "Track 1"
+    assert album_track.duration == 181
+    assert album_track.artists == (Artist(name="Artist"), Artist(name="Featured Artist"))
+    assert album_track.album_name == "Album"
+    assert not album_track.is_explicit
+    assert album_track.isrc == "XX0000000001"
+    # singles aren't really albums
+    assert single.album_name is None
+    assert single.is_explicit
+
+
+def test_skips_blank_and_local_tracks() -> None:
+    items = [playlist_item(1), playlist_item(2, artists=("",), album=""), playlist_item(3, is_local=True)]
+
+    tracks = spotify.spotify_track_items_to_tracks(items)
+
+    assert [track.name for track in tracks] == ["Track 1"]
+
+
+def test_unexpected_items_are_validated() -> None:
+    item = playlist_item(1)
+    del item["track"]["duration_ms"]
+
+    with pytest.raises(pydantic.ValidationError, match="duration_ms"):
+        spotify.spotify_track_items_to_tracks([item])
+
+
+def test_matches_models() -> None:
+    items = playlist_items(1_000)
+
+    tracks = spotify.spotify_track_items_to_tracks(items)
+    validated_tracks = [spotify.validate_spotify_track_item(item) for item in items]
+
+    # 2 blank tracks, 1 local track
+    assert len(tracks) == 997
+    assert [track.as_kwargs() for track in tracks] == [
+        track.as_kwargs() for track in validated_tracks if track is not None
+    ]
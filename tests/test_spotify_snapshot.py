@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+import typing as t
+
+import pytest
+
+from spotify_to_musi import main, musi, paths, spotify, tracks_cache, youtube
+from spotify_to_musi.exceptions import SnapshotFormatError
+from spotify_to_musi.spotify_snapshot import (
+    SpotifySnapshot,
+    decode_snapshot,
+    encode_snapshot,
+    load_snapshot,
+    save_snapshot,
+)
+from spotify_to_musi.typings.core import Playlist
+from spotify_to_musi.typings.musi import MusiResponse
+from tests.tracks import make_track, youtube_track
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+pytestmark = pytest.mark.usefixtures("data_dir")
+
+
+def make_snapshot() -> SpotifySnapshot:
+    tracks = [make_track(i) for i in range(5)]
+    # the same track, on another release
+    album_version = tracks[0].replace(album_name="Album", isrc="XX0000099999")
+
+    playlists = (
+        Playlist(id="a", name="A", cover_image_url="https://i.scdn.co/image/a", tracks=tuple(tracks[:3])),
+        Playlist(id="b", name="B", cover_image_url=None, tracks=(album_version, *tracks[2:])),
+    )
+    return SpotifySnapshot(playlists, liked_tracks=(tracks[4], tracks[1]), transfer_user_library=True)
+
+
+def test_round_trip() -> None:
+    snapshot = make_snapshot()
+    loaded = decode_snapshot(encode_snapshot(snapshot))
+
+    assert loaded == snapshot
+    for index, playlist in enumerate(snapshot.playlists):
+        loaded_playlist = loaded.playlists[index]
+        assert loaded_playlist.name == playlist.name
+        assert loaded_playlist.cover_image_url == playlist.cover_image_url
+        # releases aren't part of a track's identity, so compare them separately
+        assert [tr.as_kwargs() for tr in loaded_playlist.tracks] == [tr.as_kwargs() for tr in playlist.tracks]
+
+
+@pytest.mark.parametrize("data", [b"", b"STMSPTFY\x00\x02", b"STMSPTFY\x00\x01garbage", b"NOTASNAP\x00\x01"])
+def test_invalid_snapshot(data: bytes) -> None:
+    with pytest.raises(SnapshotFormatError):
+        decode_snapshot(data)
+
+
+@pytest.mark.asyncio
+async def test_transfer_offline(data_dir: pathlib.Path) -> None:
+    snapshot = make_snapshot()
+    await save_snapshot(paths.spotify_snapshot_path(), snapshot)
+    assert await load_snapshot(paths.spotify_snapshot_path()) == snapshot
+
+    # all but the last track were matched before
+    tracks = [make_track(i) for i in range(4)]
+    await tracks_cache.update_cached_tracks([youtube_track(track, f"video{i}") for i, track in enumerate(tracks)])
+    tracks_cache.unload()
+
+    await main.transfer_offline()
+
+    backup = json.loads(paths.offline_backup_path().read_text())
+    playlist_items = {item["video_id"] for item in backup["data"]["playlist_items"]}
+    assert playlist_items == {"video0", "video1", "video2", "video3"}
+
+
+@pytest.mark.asyncio
+async def test_transfer_from_snapshot(data_dir: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    snapshot = make_snapshot()
+    snapshot_path = data_dir / "saved.snapshot"
+    await save_snapshot(snapshot_path, snapshot)
+
+    async def query_spotify(*args: t.Any) -> t.NoReturn:
+        pytest.fail("spotify was queried")
+
+    async def query_youtube(*args: t.Any) -> tuple[tuple[()], tuple[()]]:
+        return (), ()
+
+    async def upload_to_musi(*args: t.Any, **kwargs: t.Any) -> MusiResponse:
+        return MusiResponse(code="code", diff=False, success="Success")
+
+    monkeypatch.setattr(spotify, "query_spotify", query_spotify)
+    monkeypatch.setattr(youtube, "query_youtube", query_youtube)
+    monkeypatch.setattr(musi, "upload_to_musi", upload_to_musi)
+
+    copy_path = data_dir / "copy.snapshot"
+    await main.transfer_spotify_to_musi(
+        transfer_user_library=False,
+        extra_playlist_urls=[],
+        from_spotify_snapshot=snapshot_path,
+        save_spotify_snapshot=copy_path,
+    )
+
+    assert await load_snapshot(copy_path) == snapshot
+    # only saved for --offline when asked to
+    assert not paths.spotify_snapshot_path().exists()
+
+    await main.transfer_spotify_to_musi(
+        transfer_user_library=False, extra_playlist_urls=[], from_spotify_snapshot=snapshot_path, save_for_offline=True
+    )
+    assert await load_snapshot(paths.spotify_snapshot_path()) == snapshot
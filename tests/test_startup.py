@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+# cumulative import time budget for the CLI entrypoint, in microseconds (as reported by `-X importtime`).
+# importing the whole dependency tree eagerly takes ~1s, a lazy `__main__` takes well under 100ms.
+IMPORT_TIME_BUDGET_US = 300_000
+
+# modules which are only needed by some subcommands and must not be imported just to build the CLI
+HEAVY_MODULES = ("sanic", "pyfy", "httpx", "pydantic", "aiofiles")
+
+
+def _import_time_us(module: str) -> int:
+    command = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    proc = subprocess.run(command, capture_output=True, text=True, check=True)  # noqa: S603
+    for line in proc.stderr.splitlines():
+        _, _, cumulative, name = (part.strip() for part in line.replace(":", "|", 1).split("|"))
+        if name == module:
+            return int(cumulative)
+    pytest.fail(f"{module!r} not found in import time output")
+
+
+def test_cli_import_is_lazy() -> None:
+    code = f"import sys, spotify_to_musi.__main__; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)  # noqa: S603
+
+    assert proc.stdout.strip() == ""
+
+
+def test_cli_import_time() -> None:
+    # best of a few runs to smooth out a cold disk cache
+    import_time = min(_import_time_us("spotify_to_musi.__main__") for _ in range(3))
+
+    assert import_time < IMPORT_TIME_BUDGET_US
@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import json
+import time
+import typing as t
+
+import pytest
+
+from spotify_to_musi import cache_backends, tracks_cache
+from spotify_to_musi.typings.core import Artist, Track
+from tests.tracks import make_track, youtube_track
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+
+pytestmark = pytest.mark.usefixtures("data_dir")
+
+
+@pytest.mark.asyncio
+async def test_lookup_by_isrc_across_releases() -> None:
+    single = Track(
+        name="Ghost Town",
+        duration=271,
+        artists=(Artist(name="Kanye West"), Artist(name="PARTYNEXTDOOR")),
+        album_name=None,
+        is_explicit=True,
+        isrc="USUM71805631",
+    )
+    deluxe = Track(
+        name="Ghost Town (feat. PARTYNEXTDOOR)",
+        duration=272,
+        artists=single.artists,
+        album_name="ye (Deluxe)",
+        is_explicit=True,
+        isrc="USUM71805631",
+    )
+    await tracks_cache.update_cached_tracks([youtube_track(single, "qAsHVwl-MU4")])
+
+    found = await tracks_cache.lookup_youtube_track(deluxe)
+
+    assert found is not None
+    assert found.video_id == "qAsHVwl-MU4"
+    # re-keyed to the release that was looked up
+    assert tracks_cache.convert_youtube_track_to_track(found) == deluxe
+
+
+@pytest.mark.asyncio
+async def test_lookup_unknown_isrc_misses() -> None:
+    track = Track(
+        name="Unreleased",
+        duration=100,
+        artists=(Artist(name="Nobody"),),
+        album_name=None,
+        is_explicit=False,
+        isrc="XX0000000000",
+    )
+
+    assert await tracks_cache.lookup_youtube_track(track) is None
+
+
+@pytest.mark.asyncio
+async def test_lookup_near_match() -> None:
+    artists = (Artist(name="The Beatles"),)
+    original = Track(name="Let It Be", duration=243, artists=artists, album_name="Let It Be", is_explicit=False)
+    await tracks_cache.update_cached_tracks([youtube_track(original, "QDYfEBY9NM4")])
+
+    remaster = original.replace(name="Let It Be - Remastered 2009", duration=244, album_name="Let It Be (Remastered)")
+    found = await tracks_cache.lookup_youtube_track(remaster)
+
+    assert found is not None
+    assert found.video_id == "QDYfEBY9NM4"
+    assert tracks_cache.convert_youtube_track_to_track(found) == remaster
+
+    assert await tracks_cache.lookup_youtube_track(original.replace(name="let it be  (2009 Remaster)")) is not None
+    # too far off in duration, or another version of the song
+    assert await tracks_cache.lookup_youtube_track(original.replace(duration=246)) is None
+    assert await tracks_cache.lookup_youtube_track(original.replace(name="Let It Be - Live")) is None
+    assert await tracks_cache.lookup_youtube_track(original.replace(artists=(Artist(name="Aretha"),))) is None
+
+
+@pytest.mark.asyncio
+async def test_near_match_index_follows_evictions() -> None:
+    tracks_cache.configure(max_size=1)
+    track = make_track(1)
+    await tracks_cache.update_cached_tracks([youtube_track(track, "video1")])
+    await tracks_cache.update_cached_tracks([youtube_track(make_track(2), "video2")])
+
+    assert await tracks_cache.lookup_youtube_track(track.replace(duration=track.duration + 1, isrc=None)) is None
+
+
+@pytest.mark.asyncio
+async def test_cache_persists_across_loads() -> None:
+    tracks = [make_track(i) for i in range(3)]
+    await tracks_cache.update_cached_tracks([youtube_track(track, f"video{i}") for i, track in enumerate(tracks)])
+
+    tracks_cache.unload()
+    matched = await tracks_cache.match_tracks_to_youtube_tracks(tracks)
+
+    assert [yt.video_id for yt in matched] == ["video0", "video1", "video2"]
+
+
+@pytest.mark.asyncio
+async def test_legacy_cache_is_migrated(data_dir: pathlib.Path) -> None:
+    track = make_track(1)
+    legacy_entry = youtube_track(track, "video").as_dict()
+    del legacy_entry["isrc"]
+    (data_dir / "youtube-data-cache.json").write_text(json.dumps([legacy_entry]))
+
+    found = await tracks_cache.lookup_youtube_track(track)
+
+    assert found is not None
+    assert found.video_id == "video"
+    assert not (data_dir / "youtube-data-cache.json").exists()
+    assert len((data_dir / "youtube-data-cache.jsonl").read_text().splitlines()) == 1
+
+
+@pytest.mark.asyncio
+async def test_legacy_cache_is_merged_into_journal(data_dir: pathlib.Path) -> None:
+    legacy_track, journal_track = make_track(1), make_track(2)
+    legacy_entries = [youtube_track(legacy_track, "legacy").as_dict(), youtube_track(journal_track, "old").as_dict()]
+    (data_dir / "youtube-data-cache.json").write_text(json.dumps(legacy_entries))
+    (data_dir / "youtube-data-cache.jsonl").write_text(
+        json.dumps(youtube_track(journal_track, "new").as_dict()) + "\n"
+    )
+
+    legacy_found = await tracks_cache.lookup_youtube_track(legacy_track)
+    journal_found = await tracks_cache.lookup_youtube_track(journal_track)
+
+    assert legacy_found is not None
+    assert legacy_found.video_id == "legacy"
+    # the journal is newer than the legacy cache
+    assert journal_found is not None
+    assert journal_found.video_id == "new"
+    assert not (data_dir / "youtube-data-cache.json").exists()
+    assert len((data_dir / "youtube-data-cache.jsonl").read_text().splitlines()) == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_access_stamps_are_stored(data_dir: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    journal_path = data_dir / "youtube-data-cache.jsonl"
+    track = make_track(1)
+    monkeypatch.setattr(time, "time", lambda: 1_000.0)
+    await tracks_cache.update_cached_tracks([youtube_track(track, "video1"), youtube_track(make_track(2), "video2")])
+
+    # looked up again the same day, the stored stamp is recent enough
+    monkeypatch.setattr(time, "time", lambda: 2_000.0)
+    await tracks_cache.lookup_youtube_track(track)
+    await tracks_cache.update_cached_tracks([])
+    assert len(journal_path.read_text().splitlines()) == 2
+
+    monkeypatch.setattr(time, "time", lambda: 1_000.0 + cache_backends.ACCESS_STAMP_RESOLUTION)
+    await tracks_cache.lookup_youtube_track(track)
+    await tracks_cache.update_cached_tracks([])
+    await tracks_cache.update_cached_tracks([])
+
+    lines = journal_path.read_text().splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[-1])["accessed_at"] == 1_000.0 + cache_backends.ACCESS_STAMP_RESOLUTION
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_tracks_are_evicted(monkeypatch: pytest.MonkeyPatch) -> None:
+    tracks_cache.configure(max_size=10)
+    tracks = [make_track(i) for i in range(10)]
+
+    for i, track in enumerate(tracks):
+        monkeypatch.setattr(time, "time", lambda i=i: 1_000.0 + i)
+        await tracks_cache.update_cached_tracks([youtube_track(track, f"video{i}")])
+
+    # touch the oldest track, so it's the most recently used
+    monkeypatch.setattr(time, "time", lambda: 2_000.0)
+    assert await tracks_cache.lookup_youtube_track(tracks[0]) is not None
+
+    await tracks_cache.update_cached_tracks([youtube_track(make_track(10), "video10")])
+    entries = await tracks_cache.load()
+
+    # evicted down to the low watermark, least recently used first
+    assert len(entries) == 9
+    assert tracks[0] in entries
+    assert tracks[1] not in entries
+    assert tracks[2] not in entries
+
+    tracks_cache.unload()
+    assert len(await tracks_cache.load()) == 9
+
+
+@pytest.mark.asyncio
+async def test_old_tracks_expire(monkeypatch: pytest.MonkeyPatch) -> None:
+    tracks_cache.configure(max_age=60)
+
+    monkeypatch.setattr(time, "time", lambda: 1_000.0)
+    await tracks_cache.update_cached_tracks([youtube_track(make_track(1), "video1")])
+
+    monkeypatch.setattr(time, "time", lambda: 1_100.0)
+    await tracks_cache.update_cached_tracks([youtube_track(make_track(2), "video2")])
+
+    assert await tracks_cache.lookup_youtube_track(make_track(1)) is None
+    assert await tracks_cache.lookup_youtube_track(make_track(2)) is not None
+
+
+@pytest.mark.asyncio
+async def test_isrc_index_follows_evictions(monkeypatch: pytest.MonkeyPatch) -> None:
+    tracks_cache.configure(max_age=60)
+    kept = make_track(1)
+    evicted = kept.replace(name="Track 1 (Remastered 2011)", duration=kept.duration + 5)
+
+    monkeypatch.setattr(time, "time", lambda: 1_050.0)
+    await tracks_cache.update_cached_tracks([youtube_track(kept, "video1")])
+    # cached after, but matched earlier, so it expires first
+    monkeypatch.setattr(time, "time", lambda: 1_000.0)
+    await tracks_cache.update_cached_tracks([youtube_track(evicted, "video1-remaster")])
+
+    monkeypatch.setattr(time, "time", lambda: 1_100.0)
+    await tracks_cache.update_cached_tracks([youtube_track(make_track(2), "video2")])
+
+    # another release of the recording still resolves to the release that's left
+    found = await tracks_cache.lookup_youtube_track(kept.replace(name="Track 1 (Deluxe)", duration=kept.duration + 10))
+    assert found is not None
+    assert found.video_id == "video1"
+
+
+@pytest.mark.asyncio
+async def test_journal_is_compacted(data_dir: pathlib.Path) -> None:
+    track = make_track(1)
+
+    for i in range(5):
+        await tracks_cache.update_cached_tracks([youtube_track(track, f"video{i}")])
+
+    lines = (data_dir / "youtube-data-cache.jsonl").read_text().splitlines()
+    assert len(lines) < 5
+
+    await tracks_cache.compact()
+
+    lines = (data_dir / "youtube-data-cache.jsonl").read_text().splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0])["video_id"] == "video4"
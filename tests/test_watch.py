@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import typing as t
+
+import httpx
+import pytest
+
+from spotify_to_musi import main, musi, spotify, youtube
+from spotify_to_musi.exceptions import YouTubeMusicSearchError
+from spotify_to_musi.typings.core import Playlist
+from spotify_to_musi.typings.musi import MusiResponse
+from spotify_to_musi.typings.youtube import YouTubePlaylist
+from tests.tracks import make_track, youtube_track
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+    from spotify_to_musi.typings.core import Track
+
+
+class FakeLibrary:
+    """Stands in for Spotify and YouTube, w/ a single playlist whose tracks can change between syncs."""
+
+    def __init__(self: FakeLibrary, monkeypatch: pytest.MonkeyPatch) -> None:
+        self.tracks: list[Track] = [make_track(1), make_track(2)]
+        self.uploads = 0
+
+        monkeypatch.setattr(spotify, "query_spotify", self.query_spotify)
+        monkeypatch.setattr(youtube, "query_youtube", self.query_youtube)
+        monkeypatch.setattr(musi, "upload_to_musi", self.upload_to_musi)
+
+    async def query_spotify(self: FakeLibrary, *args: t.Any) -> tuple[tuple[Playlist, ...], tuple[Track, ...]]:
+        return (Playlist(id="playlist", name="Playlist", cover_image_url=None, tracks=tuple(self.tracks)),), ()
+
+    async def query_youtube(
+        self: FakeLibrary, playlists: tuple[Playlist, ...], *args: t.Any
+    ) -> tuple[tuple[YouTubePlaylist, ...], tuple[()]]:
+        youtube_playlists = tuple(
+            YouTubePlaylist(
+                id=p.id,
+                name=p.name,
+                cover_image_url=None,
+                tracks=tuple(youtube_track(track, f"video-{track.name}") for track in p.tracks),
+            )
+            for p in playlists
+        )
+        return youtube_playlists, ()
+
+    async def upload_to_musi(self: FakeLibrary, *args: t.Any, **kwargs: t.Any) -> MusiResponse:
+        self.uploads += 1
+        return MusiResponse(code=f"code{self.uploads}", diff=False, success="Success")
+
+
+@pytest.mark.asyncio
+async def test_uploads_only_changes(monkeypatch: pytest.MonkeyPatch) -> None:
+    library = FakeLibrary(monkeypatch)
+
+    async def sync(last_snapshot: main.Snapshot | None) -> main.Snapshot:
+        async with httpx.AsyncClient() as client:
+            return await main.sync_spotify_to_musi(
+                transfer_user_library=False, extra_playlist_urls=[], client=client, last_snapshot=last_snapshot
+            )
+
+    snapshot = await sync(None)
+    assert library.uploads == 1
+
+    snapshot = await sync(snapshot)
+    assert library.uploads == 1
+
+    library.tracks.append(make_track(3))
+    snapshot = await sync(snapshot)
+    assert library.uploads == 2
+
+    # same video ids in another order
+    library.tracks.reverse()
+    await sync(snapshot)
+    assert library.uploads == 2
+
+
+class StopWatching(BaseException):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_watch_survives_a_failed_sync(monkeypatch: pytest.MonkeyPatch, data_dir: pathlib.Path) -> None:
+    library = FakeLibrary(monkeypatch)
+    searches = 0
+    query_youtube = library.query_youtube
+
+    async def flaky_query_youtube(*args: t.Any) -> tuple[tuple[YouTubePlaylist, ...], tuple[()]]:
+        nonlocal searches
+        searches += 1
+        if searches == 1:
+            reason = "Internal Server Error"
+            raise YouTubeMusicSearchError(reason)
+        return await query_youtube(*args)
+
+    async def upload_to_musi(*args: t.Any, **kwargs: t.Any) -> MusiResponse:
+        # the sync after the failed one got through, that's all this test is after
+        raise StopWatching
+
+    monkeypatch.setattr(youtube, "query_youtube", flaky_query_youtube)
+    monkeypatch.setattr(musi, "upload_to_musi", upload_to_musi)
+
+    with pytest.raises(StopWatching):
+        await main.watch_spotify_to_musi(transfer_user_library=False, extra_playlist_urls=[], interval=0)
+
+    assert searches == 2
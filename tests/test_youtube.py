@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+import typing as t
+
+import httpx
+import pytest
+from rich.progress import Progress
+
+from spotify_to_musi import log, tracks_cache, youtube
+from spotify_to_musi.typings.core import Artist, Track
+from tests.ytmusic_responses import FakeResult, search_response
+
+if t.TYPE_CHECKING:
+    import pathlib
+
+TRACK = Track(
+    name="ORANGE SODA",
+    artists=(Artist(name="Baby Keem"),),
+    duration=129,
+    album_name="DIE FOR MY BITCH",
+    is_explicit=True,
+)
+SONG = FakeResult("ORANGE SODA", ("Baby Keem",), "2:09", "song", album="DIE FOR MY BITCH", is_explicit=True)
+
+
+@pytest.fixture(autouse=True)
+def reset_log() -> t.Iterator[None]:
+    log.configure(quiet=True)
+    yield
+    log.configure()
+
+
+def test_match_key() -> None:
+    variant = TRACK.replace(name="Orange  Soda", artists=(Artist(name="BABY KEEM"),), album_name=None, isrc="X")
+
+    assert youtube.match_key(variant) == youtube.match_key(TRACK)
+    assert youtube.match_key(TRACK.replace(duration=130)) != youtube.match_key(TRACK)
+    assert youtube.match_key(TRACK.replace(name="ORANGE SODA (Live)")) != youtube.match_key(TRACK)
+
+
+@pytest.mark.asyncio
+async def test_equivalent_tracks_are_searched_once(data_dir: pathlib.Path) -> None:
+    queries: list[str] = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        queries.append(json.loads(request.content)["query"])
+        return httpx.Response(200, json=search_response([SONG]))
+
+    variants = [TRACK, TRACK.replace(name="Orange Soda"), TRACK.replace(artists=(Artist(name="baby keem"),))]
+    other = TRACK.replace(name="family ties", duration=252)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as client:
+        with Progress(disable=True) as progress:
+            await youtube.match_tracks([*variants, TRACK, other], progress, client)
+
+    # the first of the equivalent tracks is searched for
+    assert sorted(queries) == sorted([TRACK.query, other.query])
+    assert log.searches_saved["YouTube"] == 2
+
+    # every variant is cached as itself
+    entries = await tracks_cache.load()
+    assert [entries[variant].youtube_track.video_id for variant in variants] == ["song"] * 3
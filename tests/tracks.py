@@ -0,0 +1,62 @@
+"""Builders for core tracks used across tests (and benchmarks)."""
+from __future__ import annotations
+
+from spotify_to_musi.typings.core import Artist, Track
+from spotify_to_musi.typings.youtube import YouTubePlaylist, YouTubeTrack
+
+
+def make_track(index: int) -> Track:
+    return Track(
+        name=f"Track {index}",
+        duration=120 + index,
+        artists=(Artist(name=f"Artist {index}"),),
+        album_name=None,
+        is_explicit=False,
+        isrc=f"XX00000{index:05}",
+    )
+
+
+def youtube_track(track: Track, video_id: str) -> YouTubeTrack:
+    return YouTubeTrack(
+        name=track.name,
+        duration=track.duration,
+        artists=track.artists,
+        album_name=track.album_name,
+        is_explicit=track.is_explicit,
+        isrc=track.isrc,
+        youtube_name=track.name,
+        youtube_duration=track.duration,
+        youtube_artists=track.artists,
+        video_id=video_id,
+    )
+
+
+def make_library(count: int, playlist_size: int) -> tuple[tuple[YouTubePlaylist, ...], tuple[YouTubeTrack, ...]]:
+    """
+    `count` liked tracks, which are all in a playlist as well.
+    """
+    # by a realistic number of artists, as tracks by the same artist share an interned one
+    artists = [(Artist(name=f"Artist {index}"),) for index in range(1_000)]
+    liked_tracks = tuple(
+        youtube_track(
+            Track(
+                name=f"Track {index}",
+                duration=120 + index % 180,
+                artists=artists[index % 1_000],
+                album_name=None,
+                is_explicit=False,
+            ),
+            f"video{index:07}",
+        )
+        for index in range(count)
+    )
+    playlists = tuple(
+        YouTubePlaylist(
+            id=f"playlist{start}",
+            name=f"Playlist {start}",
+            cover_image_url=None,
+            tracks=liked_tracks[start : start + playlist_size],
+        )
+        for start in range(0, count, playlist_size)
+    )
+    return playlists, liked_tracks
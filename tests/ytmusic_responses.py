@@ -0,0 +1,55 @@
+"""Builders for minimal, synthetic YouTube Music search responses (as returned by the `search` endpoint)."""
+from __future__ import annotations
+
+import json
+import typing as t
+
+
+class FakeResult(t.NamedTuple):
+    title: str
+    artists: tuple[str, ...]
+    duration: str  # ie. '2:39'
+    video_id: str
+    album: str | None = None  # None -> video
+    views: str = "1.2M"
+    is_explicit: bool = False
+
+
+def _list_item(result: FakeResult) -> dict[str, t.Any]:
+    runs: list[dict[str, t.Any]] = [{"text": "Song" if result.album else "Video"}]
+    for artist in result.artists:
+        runs.extend(({"text": " • "}, {"text": artist, "navigationEndpoint": {}}))
+    runs.extend(({"text": " • "}, {"text": result.album or f"{result.views} views"}))
+    runs.extend(({"text": " • "}, {"text": result.duration}))
+
+    long_key = "musicResponsiveListItemFlexColumnRenderer"
+    item: dict[str, t.Any] = {
+        "flexColumns": [
+            {long_key: {"text": {"runs": [{"text": result.title}]}}},
+            {long_key: {"text": {"runs": runs}}},
+        ],
+        "playlistItemData": {"videoId": result.video_id},
+    }
+    if result.is_explicit:
+        label = {"accessibilityData": {"accessibilityData": {"label": "Explicit"}}}
+        item["badges"] = [{"musicInlineBadgeRenderer": label}]
+    return item
+
+
+def _shelf(title: str, results: t.Iterable[FakeResult]) -> dict[str, t.Any]:
+    contents = [{"musicResponsiveListItemRenderer": _list_item(r)} for r in results]
+    return {"musicShelfRenderer": {"title": {"runs": [{"text": title}]}, "contents": contents}}
+
+
+def search_response(results: t.Iterable[FakeResult]) -> dict[str, t.Any]:
+    results = list(results)
+    shelves = [
+        _shelf("Songs", [r for r in results if r.album]),
+        _shelf("Videos", [r for r in results if not r.album]),
+    ]
+    tab = {"tabRenderer": {"content": {"sectionListRenderer": {"contents": shelves}}}}
+    return {"contents": {"tabbedSearchResultsRenderer": {"tabs": [tab]}}}
+
+
+def search_response_bytes(results: t.Iterable[FakeResult]) -> bytes:
+    return json.dumps(search_response(results)).encode()